@@ -0,0 +1,48 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response
+
+from app.core.database import engine, replica_engine
+from app.core.neo4j_db import get_neo4j_driver
+from app.core.pool_metrics import neo4j_pool_snapshot, sql_pool_snapshot
+from app.core.query_stats import ORDERINGS, query_stats
+from app.core.request_timing import load_profile
+from app.core.security import require_admin
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/pools", summary="Connection Pools", description="Live utilization, wait counts and wait time of the PostgreSQL and Neo4j connection pools.")
+async def get_pools(driver = Depends(get_neo4j_driver)):
+    return {
+        "postgres": sql_pool_snapshot(engine),
+        "postgres_replica": sql_pool_snapshot(replica_engine),
+        "neo4j": neo4j_pool_snapshot(driver),
+    }
+
+@router.get("/profiles/{profile_id}", summary="Request Profile", description="Render the sampling profile of a request sent by an admin with `X-Profile: 1`; its id is in the response's `X-Profile-Id` header.")
+async def get_profile(profile_id: str, format: str = Query("html", pattern="^(html|text|speedscope)$")):
+    from pyinstrument.renderers import ConsoleRenderer, HTMLRenderer, SpeedscopeRenderer
+    session = load_profile(profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        return PlainTextResponse(ConsoleRenderer(unicode=True, color=False).render(session))
+    if format == "speedscope":
+        return Response(SpeedscopeRenderer().render(session), media_type="application/json")
+    return HTMLResponse(HTMLRenderer().render(session))
+
+@router.get("/queries", summary="Top Statements", description="SQL and Cypher statements of this worker grouped by fingerprint (literals and dataset ids stripped), ordered by total time or another statistic.")
+async def get_top_queries(
+    limit: int = Query(20, ge=1, le=1000),
+    order_by: str = Query("total_seconds", pattern=f"^({'|'.join(ORDERINGS)})$"),
+    query_type: Optional[str] = Query(None, pattern="^(sql|cypher)$"),
+):
+    return {
+        "slow_threshold_seconds": query_stats.slow_threshold_seconds,
+        "statements": query_stats.top(limit, order_by, query_type),
+    }
+
+@router.delete("/queries", status_code=status.HTTP_204_NO_CONTENT, summary="Reset Statement Statistics")
+async def reset_top_queries():
+    query_stats.reset()
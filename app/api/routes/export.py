@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.core.dependencies import get_valid_session
 from app.core.neo4j_db import get_neo4j_driver
 from app.core.security import get_current_user_id
@@ -19,6 +19,7 @@ router = APIRouter()
 async def export_session(
     session: Session = Depends(get_valid_session),
     db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
     driver = Depends(get_neo4j_driver)
 ):
     files = {}
@@ -27,7 +28,8 @@ async def export_session(
     result = await db.execute(select(TabularDataset).where(TabularDataset.session_id == session.id))
     tabular_datasets = result.scalars().all()
     
-    t_service = TabularService(db)
+    # Row dumps are the bulk of the export; they may come from the replica
+    t_service = TabularService(read_db)
     for tds in tabular_datasets:
         data = await t_service.query_rows(tds.id, limit=100000) # Cap for safety
         csv_content = ExportService.tabular_to_csv(data)
@@ -41,10 +43,9 @@ async def export_session(
     g_service = GraphService(driver)
     for gds in graph_datasets:
         nodes = await g_service.get_nodes(gds.id, limit=10000)
-        # Getting all edges is tricky without bulk export. 
-        # For prototype, we skip full edge dump to avoid timeout, or do basic neighborhood of fetched nodes.
-        # Let's dump the nodes we found.
-        json_content = ExportService.graph_to_json(nodes, [])
+        # Edges reference nodes by stable key so the dump can be re-loaded via /edges/batch
+        edges = await g_service.get_edges(gds.id, limit=10000)
+        json_content = ExportService.graph_to_json(nodes, edges)
         files[f"{gds.name}.json"] = json_content
 
     zip_bytes = ExportService.create_zip(files)
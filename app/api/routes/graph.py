@@ -1,23 +1,29 @@
+import logging
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.database import get_db
-from app.core.dependencies import get_valid_session, get_valid_graph_dataset
+from app.core.dependencies import get_valid_session, get_valid_graph_dataset, invalidate_dataset_ownership, bulk_load_slot
 from app.core.neo4j_db import get_neo4j_driver
 from app.core.security import get_current_user_id
+from app.core.serialization import ResultJSONResponse
 from app.models.session import Session
 from app.models.graph import GraphDataset
-from app.models.graph_schemas import GraphDatasetCreate, GraphDatasetResponse, NodeCreate, EdgeCreate
+from app.models.graph_schemas import GraphDatasetCreate, GraphDatasetResponse, GraphSchemaResponse, GraphStatsResponse, SubgraphCreate, SubgraphResponse, NodeCreate, EdgeCreate, EdgeBatchCreate, AnalyticsRequest
 from app.services.graph_service import GraphService
+from app.services.result_cache import bump_write_version, dataset_write_version
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 @router.post("/{session_id}/datasets/graph", response_model=GraphDatasetResponse, summary="Create Graph Dataset", description="Initialize a new empty graph dataset.")
 async def create_graph_dataset(
     dataset_in: GraphDatasetCreate,
     session: Session = Depends(get_valid_session),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    driver = Depends(get_neo4j_driver)
 ):
     new_dataset = GraphDataset(
         session_id=session.id,
@@ -26,28 +32,148 @@ async def create_graph_dataset(
     db.add(new_dataset)
     await db.commit()
     await db.refresh(new_dataset)
+
+    # Create the node key constraint plus declared constraints and indexes
+    service = GraphService(driver)
+    try:
+        await service.create_schema(
+            new_dataset.id,
+            dataset_in.key_properties,
+            dataset_in.indexed_properties,
+            dataset_in.text_indexed_properties
+        )
+    except Exception as e:
+        # Remove the row first so a failing cleanup cannot leave the dataset registered
+        await db.delete(new_dataset)
+        await db.commit()
+        try:
+            await service.drop_schema(new_dataset.id)
+        except Exception:
+            logger.exception("Could not drop the partial schema of graph dataset %s", new_dataset.id)
+        raise HTTPException(status_code=400, detail=f"Failed to create graph schema: {str(e)}")
+
     return new_dataset
 
+@router.delete("/{session_id}/datasets/graph/{dataset_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete Graph Dataset", description="Delete a graph dataset with all its nodes, relationships, indexes and constraints.")
+async def delete_graph_dataset(
+    dataset: GraphDataset = Depends(get_valid_graph_dataset),
+    db: AsyncSession = Depends(get_db),
+    driver = Depends(get_neo4j_driver)
+):
+    service = GraphService(driver)
+    await service.delete_dataset(dataset.id, batch_size=settings.GRAPH_TRANSACTION_BATCH_SIZE)
+    invalidate_dataset_ownership(dataset.id)
+    await db.delete(dataset)
+    await db.commit()
+
+@router.get("/{session_id}/datasets/graph/{dataset_id}/indexes", response_model=GraphSchemaResponse, summary="List Graph Indexes", description="List constraints and indexes of the dataset with their state and population progress.")
+async def list_graph_indexes(
+    dataset: GraphDataset = Depends(get_valid_graph_dataset),
+    driver = Depends(get_neo4j_driver)
+):
+    service = GraphService(driver)
+    return await service.get_schema(dataset.id)
+
+@router.get("/{session_id}/datasets/graph/{dataset_id}/stats", response_model=GraphStatsResponse, summary="Graph Statistics", description="Node counts per label, relationship counts per type, property coverage and a sampled degree distribution, cached for a short time.")
+async def get_graph_stats(
+    refresh: bool = Query(False, description="Bypass the cached statistics"),
+    dataset: GraphDataset = Depends(get_valid_graph_dataset),
+    db: AsyncSession = Depends(get_db),
+    driver = Depends(get_neo4j_driver)
+):
+    service = GraphService(driver)
+    return await service.get_stats(
+        dataset.id,
+        sample_size=settings.GRAPH_STATS_SAMPLE_SIZE,
+        refresh=refresh,
+        version=await dataset_write_version(db, dataset),
+    )
+
+@router.post("/{session_id}/datasets/graph/{dataset_id}/subgraph", status_code=201, dependencies=[Depends(bulk_load_slot)], response_model=SubgraphResponse, summary="Extract Subgraph", description="Copy the subgraph induced by a node filter, a key list or seed keys plus hop radius into a new graph dataset, entirely inside Neo4j.")
+async def extract_subgraph(
+    subgraph: SubgraphCreate,
+    dataset: GraphDataset = Depends(get_valid_graph_dataset),
+    db: AsyncSession = Depends(get_db),
+    driver = Depends(get_neo4j_driver)
+):
+    new_dataset = GraphDataset(
+        session_id=dataset.session_id,
+        name=subgraph.name
+    )
+    db.add(new_dataset)
+    await db.commit()
+    await db.refresh(new_dataset)
+
+    service = GraphService(driver)
+    try:
+        counts = await service.extract_subgraph(
+            dataset.id,
+            new_dataset.id,
+            node_filter=subgraph.node_filter,
+            label=subgraph.label,
+            node_keys=subgraph.node_keys,
+            seed_keys=subgraph.seed_keys,
+            radius=subgraph.radius,
+            batch_size=settings.GRAPH_TRANSACTION_BATCH_SIZE
+        )
+    except Exception as e:
+        # Remove the row first so a failing cleanup cannot leave the dataset registered
+        await db.delete(new_dataset)
+        await db.commit()
+        try:
+            await service.delete_dataset(new_dataset.id, batch_size=settings.GRAPH_TRANSACTION_BATCH_SIZE)
+        except Exception:
+            logger.exception("Could not delete the partial subgraph of graph dataset %s", new_dataset.id)
+        raise HTTPException(status_code=400, detail=f"Failed to extract subgraph: {str(e)}")
+
+    return {**GraphDatasetResponse.model_validate(new_dataset).model_dump(), **counts}
+
 @router.post("/{session_id}/datasets/graph/{dataset_id}/nodes", summary="Create Node", description="Add a new node to the graph.")
 async def create_node(
     node: NodeCreate,
     dataset: GraphDataset = Depends(get_valid_graph_dataset),
+    db: AsyncSession = Depends(get_db),
     driver = Depends(get_neo4j_driver)
 ):
     service = GraphService(driver)
-    return await service.create_node(dataset.id, node.label, node.properties)
+    created = await service.create_node(dataset.id, node.label, node.properties, key=node.key)
+    await bump_write_version(db, dataset)
+    return ResultJSONResponse(created)
 
 @router.post("/{session_id}/datasets/graph/{dataset_id}/edges", summary="Create Edge", description="Create a relationship between two nodes.")
 async def create_edge(
     edge: EdgeCreate,
     dataset: GraphDataset = Depends(get_valid_graph_dataset),
+    db: AsyncSession = Depends(get_db),
     driver = Depends(get_neo4j_driver)
 ):
     service = GraphService(driver)
-    res = await service.create_relationship(dataset.id, edge.from_node_id, edge.to_node_id, edge.type, edge.properties)
+    res = await service.create_relationship(dataset.id, edge.from_ref, edge.to_ref, edge.type, edge.properties)
     if not res:
         raise HTTPException(status_code=400, detail="Could not create edge. Check node IDs.")
-    return res
+    await bump_write_version(db, dataset)
+    return ResultJSONResponse(res)
+
+@router.post("/{session_id}/datasets/graph/{dataset_id}/edges/batch", status_code=201, dependencies=[Depends(bulk_load_slot)], summary="Create Edges in Bulk", description="Create many relationships whose endpoints are referenced by node keys.")
+async def create_edges_batch(
+    payload: EdgeBatchCreate,
+    dataset: GraphDataset = Depends(get_valid_graph_dataset),
+    db: AsyncSession = Depends(get_db),
+    driver = Depends(get_neo4j_driver)
+):
+    service = GraphService(driver)
+    try:
+        created = await service.create_relationships_by_key(
+            dataset.id,
+            [edge.model_dump() for edge in payload.edges],
+            key_property=payload.key_property,
+            batch_size=settings.GRAPH_TRANSACTION_BATCH_SIZE
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if created:
+        await bump_write_version(db, dataset)
+    return {"status": "success", "count": created, "requested": len(payload.edges)}
 
 @router.get("/{session_id}/datasets/graph/{dataset_id}/nodes", summary="List Nodes", description="Retrieve nodes from the graph, optionally filtered by label.")
 async def list_nodes(
@@ -57,7 +183,7 @@ async def list_nodes(
     driver = Depends(get_neo4j_driver)
 ):
     service = GraphService(driver)
-    return await service.get_nodes(dataset.id, label, limit)
+    return ResultJSONResponse(await service.get_nodes(dataset.id, label, limit))
 
 @router.get("/{session_id}/datasets/graph/{dataset_id}/nodes/{node_id}/neighbors")
 async def get_neighbors(
@@ -66,17 +192,67 @@ async def get_neighbors(
     driver = Depends(get_neo4j_driver)
 ):
     service = GraphService(driver)
-    return await service.get_neighbors(dataset.id, node_id)
+    return ResultJSONResponse(await service.get_neighbors(dataset.id, node_id))
+
+@router.get("/{session_id}/datasets/graph/{dataset_id}/nodes/by-key/{node_key}/neighbors", summary="Get Neighbors by Key", description="Retrieve the neighbors of a node addressed by its stable key.")
+async def get_neighbors_by_key(
+    node_key: str,
+    dataset: GraphDataset = Depends(get_valid_graph_dataset),
+    driver = Depends(get_neo4j_driver)
+):
+    service = GraphService(driver)
+    return ResultJSONResponse(await service.get_neighbors(dataset.id, node_key))
 
 @router.post("/{session_id}/datasets/graph/{dataset_id}/algorithms/shortest_path", summary="Find Shortest Path", description="Calculate the shortest path between two nodes using Neo4j algorithms.")
 async def shortest_path(
-    from_id: int,
-    to_id: int,
+    from_id: Optional[int] = None,
+    to_id: Optional[int] = None,
+    from_key: Optional[str] = None,
+    to_key: Optional[str] = None,
+    in_memory: bool = Query(False, description="Compute a minimum-hop path on the cached in-memory projection and return node ids only"),
     dataset: GraphDataset = Depends(get_valid_graph_dataset),
+    db: AsyncSession = Depends(get_db),
     driver = Depends(get_neo4j_driver)
 ):
-    service = GraphService(driver)
-    path = await service.shortest_path(dataset.id, from_id, to_id)
+    from_ref = from_key if from_key is not None else from_id
+    to_ref = to_key if to_key is not None else to_id
+    if from_ref is None or to_ref is None:
+        raise HTTPException(status_code=400, detail="Provide from_key/to_key or from_id/to_id.")
+    if in_memory:
+        if from_key is not None or to_key is not None:
+            raise HTTPException(status_code=400, detail="in_memory paths address nodes by from_id/to_id.")
+        # numpy-backed and only needed for in-process analytics, so imported on first use
+        from app.services.graph_analytics import GraphAnalyticsService
+        version = await dataset_write_version(db, dataset)
+        path = await GraphAnalyticsService(driver).shortest_path(dataset.id, from_ref, to_ref, version=version)
+    else:
+        path = await GraphService(driver).shortest_path(dataset.id, from_ref, to_ref)
     if not path:
         raise HTTPException(status_code=404, detail="No path found.")
-    return path
+    return ResultJSONResponse(path)
+
+@router.post("/{session_id}/datasets/graph/{dataset_id}/analytics/{algorithm}", summary="Run Graph Analytics", description="Run pagerank, connected_components, bfs, degree_centrality or triangle_count in-process on a compact projection of the graph.")
+async def run_analytics(
+    algorithm: str,
+    request: Optional[AnalyticsRequest] = None,
+    dataset: GraphDataset = Depends(get_valid_graph_dataset),
+    db: AsyncSession = Depends(get_db),
+    driver = Depends(get_neo4j_driver)
+):
+    from app.services.graph_analytics import GraphAnalyticsService
+    request = request or AnalyticsRequest()
+    service = GraphAnalyticsService(driver)
+    try:
+        result = await service.run(
+            dataset.id,
+            algorithm,
+            request.model_dump(exclude={"write_property", "limit"}),
+            write_property=request.write_property,
+            limit=request.limit,
+            version=await dataset_write_version(db, dataset),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result["written"]:
+        await bump_write_version(db, dataset)
+    return ResultJSONResponse(result)
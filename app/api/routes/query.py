@@ -1,61 +1,364 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
-from typing import Dict, Any, Optional
-from pydantic import BaseModel
+from typing import Dict, Any, List, Optional
+from pydantic import BaseModel, Field
 
-from app.core.database import get_db
-from app.core.dependencies import get_valid_session
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.dependencies import get_valid_session, query_slot
 from app.core.neo4j_db import get_neo4j_driver
 from app.core.security import get_current_user_id
+from app.core.serialization import ResultJSONResponse, dumps
 from app.models.session import Session
+from app.services.federated_query import JOIN_TYPES, federated_join
+from app.services.query_analysis import is_read_only, may_write
+from app.services.query_jobs import FINISHED_STATUSES, query_jobs
+from app.services.query_service import (
+    ERROR_PREFIXES, QueryBatch, QueryCancelled, QueryService, Rows, STREAM_FORMATS, STREAM_MEDIA_TYPES, Statement,
+    TooManyRows, encode_rows, resolve_row_limit, resolve_timeout, run_until_disconnected
+)
+from app.services.result_cache import result_cache, cache_key, session_data_version, bump_session_write_versions
 
 router = APIRouter()
 
+QUERY_TYPES = ("sql", "cypher")
+# nginx's "client closed request"; nobody is listening for it, but it shows up in access logs
+CLIENT_CLOSED_REQUEST = 499
+
 class QueryRequest(BaseModel):
     query: str
     type: str # "sql" or "cypher"
     params: Dict[str, Any] = {}
+    format: str = Field("json", description="json, or ndjson/csv to stream rows as they are read")
+    max_rows: Optional[int] = Field(None, ge=1, description="Row cap (bounded by QUERY_MAX_ROWS, or QUERY_STREAM_MAX_ROWS when streaming)")
+    timeout_seconds: Optional[float] = Field(None, gt=0, description="Statement timeout (bounded by the API key's limit)")
+    profile: bool = Field(False, description="Return the execution plan and a network/execution/serialization timing breakdown instead of rows; changes are rolled back")
+    cache: bool = Field(False, description="Serve and store the result in the result cache if the statement is provably read-only")
+    run_async: bool = Field(False, alias="async", description="Run as a background job and return its id immediately")
+
+    class Config:
+        populate_by_name = True
 
-@router.post("/{session_id}/query")
+@router.post("/{session_id}/query", dependencies=[Depends(query_slot)])
 async def execute_query(
     request: QueryRequest,
+    http_request: Request,
     session: Session = Depends(get_valid_session),
+    user_id: str = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
     driver = Depends(get_neo4j_driver)
 ):
-    if request.type.lower() == "sql":
-        try:
-            # Execute raw SQL
-            # Security Note: This allows full access to the Postgres DB as the app user.
-            # In a real PROD env, we'd restrict this user permissions or parse the SQL to whitelist tables.
-            # For this task, we assume "Power User" access as requested.
-            result = await db.execute(text(request.query), request.params)
-            
-            # Helper to serialize rows
-            if result.returns_rows:
-                rows = [dict(row._mapping) for row in result]
-                return {"status": "success", "data": rows, "count": len(rows)}
-            else:
-                await db.commit()
-                return {"status": "success", "rowcount": result.rowcount}
-                
-        except Exception as e:
+    query_type = request.type.lower()
+    if query_type not in QUERY_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid query type. Must be 'sql' or 'cypher'.")
+    read_only = is_read_only(query_type, request.query)
+    writes = may_write(query_type, request.query)
+    # Provably read-only SQL tolerates replication lag
+    service = QueryService(read_db if query_type == "sql" and read_only else db, driver)
+    timeout = resolve_timeout(request.timeout_seconds, user_id)
+
+    if request.run_async:
+        job = query_jobs.submit(
+            service.db, driver, user_id, session.id, query_type, request.query, request.params, writes,
+            max_rows=resolve_row_limit(request.max_rows, stream=True),
+            timeout=resolve_timeout(request.timeout_seconds, user_id, job=True)
+        )
+        return JSONResponse(status_code=202, content=job_view(job))
+    if request.profile:
+        return await profile_query(request, service, http_request, timeout)
+    if request.format != "json":
+        return await stream_query(request, service, session, writes, timeout)
+
+    max_rows = resolve_row_limit(request.max_rows, stream=False)
+    key = None
+    if request.cache and read_only:
+        data_version = await session_data_version(db, session.id)
+        key = cache_key(session.id, query_type, request.query, request.params, data_version, max_rows)
+        cached = result_cache.get(key)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json", headers={"X-Query-Cache": "hit"})
+
+    # Security Note: This allows full access to the Postgres DB as the app user.
+    # In a real PROD env, we'd restrict this user permissions or parse the SQL to whitelist tables.
+    # For this task, we assume "Power User" access as requested.
+    try:
+        payload = await service.run_until_disconnected(
+            service.execute(query_type, request.query, request.params, max_rows, timeout),
+            http_request.is_disconnected
+        )
+    except QueryCancelled:
+        if query_type == "sql":
+            await service.db.rollback()
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except Exception as e:
+        if query_type == "sql":
+            await service.db.rollback()
+        raise HTTPException(status_code=400, detail=f"{ERROR_PREFIXES[query_type]} Error: {str(e)}")
+
+    if writes:
+        await bump_session_write_versions(db, session.id)
+    if key is None:
+        return ResultJSONResponse(payload)
+    body = dumps(payload)
+    stored = result_cache.set(key, body)
+    return Response(content=body, media_type="application/json", headers={"X-Query-Cache": "miss" if stored else "bypass"})
+
+
+async def profile_query(request: QueryRequest, service: QueryService, http_request: Request, timeout: float):
+    query_type = request.type.lower()
+    if request.format != "json":
+        raise HTTPException(status_code=400, detail="Profiling returns JSON; it cannot be combined with a streaming format.")
+    max_rows = resolve_row_limit(request.max_rows, stream=False)
+    try:
+        return await service.run_until_disconnected(
+            service.profile(query_type, request.query, request.params, max_rows, timeout),
+            http_request.is_disconnected
+        )
+    except QueryCancelled:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except Exception as e:
+        if query_type == "sql":
+            await service.db.rollback()
+        raise HTTPException(status_code=400, detail=f"{ERROR_PREFIXES[query_type]} Error: {str(e)}")
+
+
+async def commit_when_closed(rows: Rows, db: AsyncSession, session_id: str) -> Rows:
+    """
+    Pass streamed rows through and, once the cursor is closed, commit the write
+    and bump the session's write versions. Committing earlier would end the
+    transaction that holds the server-side cursor.
+    """
+    failed = False
+    try:
+        async for row in rows:
+            yield row
+    except Exception:
+        failed = True
+        raise
+    finally:
+        await rows.aclose()
+        if failed:
             await db.rollback()
-            raise HTTPException(status_code=400, detail=f"SQL Error: {str(e)}")
-
-    elif request.type.lower() == "cypher":
-        try:
-            async with driver.session() as session:
-                result = await session.run(request.query, request.params)
-                # Serialize generic Cypher result is complex (Nodes, Relationships, Paths, primitive types)
-                # We do a best-effort simple recursive serializer
-                data = []
-                async for record in result:
-                    data.append(record.data())
-                return {"status": "success", "data": data, "count": len(data)}
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Cypher Error: {str(e)}")
-
-    else:
-         raise HTTPException(status_code=400, detail="Invalid query type. Must be 'sql' or 'cypher'.")
+        else:
+            await bump_session_write_versions(db, session_id)
+
+
+async def stream_query(request: QueryRequest, service: QueryService, session: Session, writes: bool, timeout: float) -> StreamingResponse:
+    """Start the query, then stream its rows; errors before the first row still map to 400."""
+    query_type = request.type.lower()
+    if request.format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be 'json' or one of {', '.join(STREAM_FORMATS)}.")
+
+    try:
+        columns, rows = await service.open_stream(query_type, request.query, request.params, timeout)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        if query_type == "sql":
+            await service.db.rollback()
+        raise HTTPException(status_code=400, detail=f"{ERROR_PREFIXES[query_type]} Error: {str(e)}")
+
+    if writes:
+        rows = commit_when_closed(rows, service.db, session.id)
+    max_rows = resolve_row_limit(request.max_rows, stream=True)
+    return StreamingResponse(
+        encode_rows(columns, rows, request.format, max_rows, settings.QUERY_STREAM_MAX_BYTES),
+        media_type=STREAM_MEDIA_TYPES[request.format],
+        headers={
+            "X-Query-Max-Rows": str(max_rows),
+            "X-Query-Max-Bytes": str(settings.QUERY_STREAM_MAX_BYTES),
+        }
+    )
+
+
+class BatchStatement(BaseModel):
+    query: str
+    type: str # "sql" or "cypher"
+    params: Dict[str, Any] = {}
+    dependent: bool = Field(False, description="Run in order with the other dependent statements, in one transaction")
+
+class BatchQueryRequest(BaseModel):
+    statements: List[BatchStatement] = Field(..., min_length=1)
+    max_rows: Optional[int] = Field(None, ge=1, description="Row cap per statement (bounded by QUERY_MAX_ROWS)")
+    timeout_seconds: Optional[float] = Field(None, gt=0, description="Timeout per statement (bounded by the API key's limit)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "statements": [
+                    {"type": "sql", "query": "SELECT count(*) FROM \"dataset_...\""},
+                    {"type": "cypher", "query": "MATCH (n) RETURN count(n) AS nodes"},
+                    {"type": "sql", "query": "UPDATE \"dataset_...\" SET score = 0", "dependent": True},
+                    {"type": "sql", "query": "SELECT sum(score) FROM \"dataset_...\"", "dependent": True}
+                ]
+            }
+        }
+
+@router.post("/{session_id}/query/batch", dependencies=[Depends(query_slot)])
+async def execute_batch(
+    request: BatchQueryRequest,
+    http_request: Request,
+    session: Session = Depends(get_valid_session),
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
+    driver = Depends(get_neo4j_driver)
+):
+    """Run several statements in one request; results come back in the order they were sent."""
+    if len(request.statements) > settings.QUERY_BATCH_MAX_STATEMENTS:
+        raise HTTPException(status_code=400, detail=f"A batch holds at most {settings.QUERY_BATCH_MAX_STATEMENTS} statements.")
+    statements = [
+        Statement(statement.type.lower(), statement.query, statement.params, statement.dependent)
+        for statement in request.statements
+    ]
+    if any(statement.query_type not in QUERY_TYPES for statement in statements):
+        raise HTTPException(status_code=400, detail="Invalid query type. Must be 'sql' or 'cypher'.")
+
+    # The dependent group may roll back, which expires loaded ORM objects
+    session_id = session.id
+    batch = QueryBatch(db, driver, read_db=read_db)
+    try:
+        results = await run_until_disconnected(
+            batch.run(statements, resolve_row_limit(request.max_rows, stream=False), resolve_timeout(request.timeout_seconds, user_id)),
+            http_request.is_disconnected,
+            batch.cancel
+        )
+    except QueryCancelled:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+    if any(may_write(statement.query_type, statement.query) for statement in statements):
+        await bump_session_write_versions(db, session_id)
+    return ResultJSONResponse({"status": "success", "results": results, "count": len(results)})
+
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    view = {key: value for key, value in job.items() if key != "pages"}
+    view["page_count"] = len(job["pages"])
+    return view
+
+def get_session_job(session: Session, job_id: str) -> Dict[str, Any]:
+    job = query_jobs.get(job_id)
+    if job is None or job["session_id"] != session.id:
+        raise HTTPException(status_code=404, detail="Query job not found or expired")
+    return job
+
+@router.get("/{session_id}/query/jobs/{job_id}")
+async def get_query_job(job_id: str, session: Session = Depends(get_valid_session)):
+    return job_view(get_session_job(session, job_id))
+
+@router.get("/{session_id}/query/jobs/{job_id}/results")
+async def get_query_job_results(
+    job_id: str,
+    page: int = Query(0, ge=0),
+    format: str = Query("json", description="json for one page, or ndjson to stream all rows"),
+    session: Session = Depends(get_valid_session)
+):
+    """
+    Read a job's spooled results. Pages are available as soon as they are
+    written, so a running job can already be paged through.
+    """
+    job = get_session_job(session, job_id)
+    if format == "ndjson":
+        if job["status"] != "succeeded":
+            raise HTTPException(status_code=409, detail=f"Query job is {job['status']}")
+        return StreamingResponse(query_jobs.iter_results(job), media_type=STREAM_MEDIA_TYPES["ndjson"])
+    if format != "json":
+        raise HTTPException(status_code=400, detail="Invalid format. Must be 'json' or 'ndjson'.")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=409, detail=f"Query job failed: {job['error']}")
+    page_count = len(job["pages"])
+    if page >= page_count and not (page == 0 and job["status"] == "succeeded"):
+        raise HTTPException(status_code=404, detail=f"Page {page} is not available ({page_count} written so far)")
+    data = await asyncio.to_thread(query_jobs.read_page, job, page) if page_count else []
+    has_next = page + 1 < page_count or job["status"] not in FINISHED_STATUSES
+    return {
+        "status": job["status"],
+        "columns": job["columns"],
+        "data": data,
+        "page": page,
+        "page_count": page_count,
+        "next_page": page + 1 if has_next else None,
+    }
+
+@router.delete("/{session_id}/query/jobs/{job_id}", status_code=204)
+async def delete_query_job(job_id: str, session: Session = Depends(get_valid_session)):
+    """Cancel the job if it is still running and delete its results."""
+    get_session_job(session, job_id)
+    await query_jobs.cancel(job_id)
+
+
+class FederatedSide(BaseModel):
+    query: str
+    params: Dict[str, Any] = {}
+    key: str = Field(..., description="Column of this statement's result to join on")
+
+class FederatedQueryRequest(BaseModel):
+    sql: FederatedSide
+    cypher: FederatedSide
+    how: str = Field("inner", description="inner, left (keep all SQL rows), right (keep all Cypher rows) or outer")
+    format: str = Field("ndjson", description="ndjson or csv")
+    max_rows: Optional[int] = Field(None, ge=1, description="Cap on joined rows (bounded by QUERY_STREAM_MAX_ROWS)")
+    timeout_seconds: Optional[float] = Field(None, gt=0, description="Timeout per statement (bounded by the API key's limit)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "sql": {"query": "SELECT customer_id, revenue FROM \"dataset_...\"", "key": "customer_id"},
+                "cypher": {"query": "MATCH (c:Customer) RETURN c._key AS customer_id, size([(c)--() | 1]) AS degree", "key": "customer_id"},
+                "how": "left"
+            }
+        }
+
+@router.post("/{session_id}/query/federated", dependencies=[Depends(query_slot)])
+async def execute_federated_query(
+    request: FederatedQueryRequest,
+    http_request: Request,
+    session: Session = Depends(get_valid_session),
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
+    driver = Depends(get_neo4j_driver)
+):
+    """
+    Run one SQL and one Cypher statement concurrently, join their results on
+    the declared keys and stream the joined rows. Both statements are rolled
+    back, so nothing they change is kept.
+    """
+    if request.format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of {', '.join(STREAM_FORMATS)}.")
+    if request.how not in JOIN_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid join type. Must be one of {', '.join(JOIN_TYPES)}.")
+    service = QueryService(read_db if is_read_only("sql", request.sql.query) else db, driver)
+    try:
+        columns, rows = await service.run_until_disconnected(
+            federated_join(
+                service,
+                request.sql.query, request.sql.params,
+                request.cypher.query, request.cypher.params,
+                request.sql.key, request.cypher.key,
+                request.how,
+                resolve_timeout(request.timeout_seconds, user_id)
+            ),
+            http_request.is_disconnected
+        )
+    except QueryCancelled:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except TooManyRows as e:
+        # Both inputs are held in memory for the join; narrow the statements instead
+        raise HTTPException(status_code=413, detail=f"Federated query input too large: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Federated query error: {str(e)}")
+
+    max_rows = resolve_row_limit(request.max_rows, stream=True)
+    return StreamingResponse(
+        encode_rows(columns, rows, request.format, max_rows, settings.QUERY_STREAM_MAX_BYTES),
+        media_type=STREAM_MEDIA_TYPES[request.format],
+        headers={
+            "X-Query-Max-Rows": str(max_rows),
+            "X-Query-Max-Bytes": str(settings.QUERY_STREAM_MAX_BYTES),
+        }
+    )
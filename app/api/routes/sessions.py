@@ -4,18 +4,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 from sqlalchemy.orm import selectinload
 
-from app.core.database import get_db, init_db
-from app.core.dependencies import get_valid_session
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.dependencies import get_valid_session, invalidate_session_ownership
+from app.core.neo4j_db import get_neo4j_driver
 from app.core.security import get_current_user_id
 from app.models.session import Session
+from app.models.graph import GraphDataset
 from app.models.schemas import SessionCreate, SessionResponse
+from app.services.graph_service import GraphService
 
 router = APIRouter()
 
-@router.on_event("startup")
-async def on_startup():
-    await init_db()
-
 @router.post("/", response_model=SessionResponse, status_code=status.HTTP_201_CREATED, summary="Create a new Session", description="Create a new isolated session for managing data.")
 async def create_session(
     session_in: SessionCreate,
@@ -64,7 +64,15 @@ async def get_session(
 @router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete Session", description="Permanently delete a session and all its associated data.")
 async def delete_session(
     session: Session = Depends(get_valid_session),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    driver = Depends(get_neo4j_driver)
 ):
+    # Graph data lives in Neo4j and is not covered by the ORM cascade
+    result = await db.execute(select(GraphDataset.id).where(GraphDataset.session_id == session.id))
+    service = GraphService(driver)
+    for dataset_id in result.scalars().all():
+        await service.delete_dataset(dataset_id, batch_size=settings.GRAPH_TRANSACTION_BATCH_SIZE)
+
+    invalidate_session_ownership(session.id)
     await db.delete(session)
     await db.commit()
@@ -1,13 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.core.dependencies import get_valid_session, get_valid_tabular_dataset
+from app.core.database import get_db, get_read_db
+from app.core.dependencies import get_valid_session, get_valid_tabular_dataset, bulk_load_slot
 from app.core.security import get_current_user_id
+from app.core.serialization import ResultJSONResponse
 from app.models.session import Session
 from app.models.tabular import TabularDataset
 from app.models.tabular_schemas import TabularDatasetCreate, TabularDatasetResponse, RowInsert
 from app.services.tabular_service import TabularService
+from app.services.result_cache import bump_write_version
 from typing import Optional, List
 
 router = APIRouter()
@@ -39,7 +41,7 @@ async def create_tabular_dataset(
 
     return new_dataset
 
-@router.post("/{session_id}/datasets/tabular/{dataset_id}/records", status_code=201, summary="Insert Records", description="Insert multiple rows into a tabular dataset.")
+@router.post("/{session_id}/datasets/tabular/{dataset_id}/records", status_code=201, dependencies=[Depends(bulk_load_slot)], summary="Insert Records", description="Insert multiple rows into a tabular dataset.")
 async def insert_records(
     payload: RowInsert,
     dataset: TabularDataset = Depends(get_valid_tabular_dataset),
@@ -50,6 +52,7 @@ async def insert_records(
         await service.insert_rows(dataset.id, payload.rows)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    await bump_write_version(db, dataset)
     
     return {"status": "success", "count": len(payload.rows)}
 
@@ -60,7 +63,7 @@ async def query_records(
     sort: Optional[str] = None,
     select: Optional[str] = None,
     dataset: TabularDataset = Depends(get_valid_tabular_dataset),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     service = TabularService(db)
     select_cols = select.split(",") if select else None
@@ -69,6 +72,6 @@ async def query_records(
     
     try:
         rows = await service.query_rows(dataset.id, limit, offset, sort=sort, select_cols=select_cols)
-        return {"data": rows, "count": len(rows)}
+        return ResultJSONResponse({"data": rows, "count": len(rows)})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,83 @@
+"""
+Command line maintenance tasks.
+
+    python -m app.cli migrate-graph-storage --to property
+    python -m app.cli migrate-graph-storage --to label
+    python -m app.cli backfill-node-keys
+"""
+import argparse
+import asyncio
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.neo4j_db import init_neo4j, close_neo4j, get_neo4j_driver
+from app.models.graph import GraphDataset
+from app.services.graph_service import GraphService, STORAGE_MODES
+
+
+async def migrate_graph_storage(target_mode: str, batch_size: int):
+    # The API reads every dataset in the one GRAPH_STORAGE_MODE, so all datasets move together
+    source_mode = "label" if target_mode == "property" else "property"
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(GraphDataset.id))
+        dataset_ids = result.scalars().all()
+
+    await init_neo4j()
+    try:
+        service = GraphService(get_neo4j_driver(), storage_mode=source_mode)
+        for i, dataset_id in enumerate(dataset_ids, start=1):
+            await service.migrate_storage(dataset_id, target_mode, batch_size=batch_size)
+            print(f"[{i}/{len(dataset_ids)}] {dataset_id}: {source_mode} -> {target_mode}")
+    finally:
+        await close_neo4j()
+
+    if settings.GRAPH_STORAGE_MODE != target_mode:
+        print(f"Done. Set GRAPH_STORAGE_MODE={target_mode} and restart the API.")
+
+
+async def backfill_node_keys(dataset_ids: Optional[List[str]], batch_size: int):
+    if not dataset_ids:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(GraphDataset.id))
+            dataset_ids = result.scalars().all()
+
+    await init_neo4j()
+    try:
+        service = GraphService(get_neo4j_driver())
+        for i, dataset_id in enumerate(dataset_ids, start=1):
+            await service.backfill_node_keys(dataset_id, batch_size=batch_size)
+            print(f"[{i}/{len(dataset_ids)}] {dataset_id}: node keys backfilled")
+    finally:
+        await close_neo4j()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subcommands.add_parser(
+        "migrate-graph-storage",
+        help="Move all graph datasets between per-dataset labels and the shared-label storage mode (idempotent, rerun after an interruption)",
+    )
+    migrate.add_argument("--to", dest="target_mode", choices=STORAGE_MODES, required=True)
+    migrate.add_argument("--batch-size", type=int, default=settings.GRAPH_TRANSACTION_BATCH_SIZE)
+
+    backfill = subcommands.add_parser(
+        "backfill-node-keys",
+        help="Give nodes of datasets created before stable node keys a _key and add the key constraint",
+    )
+    backfill.add_argument("--dataset-id", dest="dataset_ids", action="append", help="Only backfill this dataset (repeatable)")
+    backfill.add_argument("--batch-size", type=int, default=settings.GRAPH_TRANSACTION_BATCH_SIZE)
+
+    args = parser.parse_args(argv)
+    if args.command == "migrate-graph-storage":
+        asyncio.run(migrate_graph_storage(args.target_mode, args.batch_size))
+    elif args.command == "backfill-node-keys":
+        asyncio.run(backfill_node_keys(args.dataset_ids, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Small in-process caches shared by services.
+"""
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Bounded mapping whose entries expire ``ttl_seconds`` after being set."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ByteLRUCache:
+    """
+    LRU cache of ``bytes`` values bounded by their total size, with a TTL per
+    entry. With ``spill_dir`` set, entries evicted from memory are written to
+    disk (bounded by ``spill_max_bytes``) and promoted back on their next hit.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl_seconds: float,
+        max_entry_bytes: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        spill_max_bytes: int = 0,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_entry_bytes = max_entry_bytes or max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_bytes = 0
+        self._spilled: "OrderedDict[str, tuple]" = OrderedDict()
+        self._spilled_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.monotonic()
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+            self._drop_memory(key)
+        entry = self._spilled.get(key)
+        if entry is not None:
+            expires_at, size, path = entry
+            value = self._read_spilled(path) if expires_at > now else None
+            self._drop_spilled(key)
+            if value is not None:
+                self.hits += 1
+                self._store(key, value, expires_at)
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> bool:
+        """Cache ``value``; returns False if it is larger than ``max_entry_bytes``."""
+        self.invalidate(key)
+        if len(value) > self.max_entry_bytes:
+            return False
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._store(key, value, time.monotonic() + ttl)
+        return True
+
+    def invalidate(self, key: str) -> None:
+        self._drop_memory(key)
+        self._drop_spilled(key)
+
+    def clear(self) -> None:
+        for key in list(self._spilled):
+            self._drop_spilled(key)
+        self._memory.clear()
+        self._memory_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._memory),
+            "bytes": self._memory_bytes,
+            "spilled_entries": len(self._spilled),
+            "spilled_bytes": self._spilled_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _store(self, key: str, value: bytes, expires_at: float) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory_bytes += len(value)
+        while self._memory_bytes > self.max_bytes:
+            evicted_key, (evicted_expires_at, evicted_value) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted_value)
+            self._spill(evicted_key, evicted_value, evicted_expires_at)
+
+    def _drop_memory(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[1])
+
+    def _spill(self, key: str, value: bytes, expires_at: float) -> None:
+        if not self.spill_dir or len(value) > self.spill_max_bytes or expires_at <= time.monotonic():
+            return
+        path = os.path.join(self.spill_dir, hashlib.sha256(key.encode()).hexdigest())
+        try:
+            with open(path, "wb") as f:
+                f.write(value)
+        except OSError:
+            return
+        self._spilled[key] = (expires_at, len(value), path)
+        self._spilled_bytes += len(value)
+        while self._spilled_bytes > self.spill_max_bytes:
+            self._drop_spilled(next(iter(self._spilled)))
+
+    def _drop_spilled(self, key: str) -> None:
+        entry = self._spilled.pop(key, None)
+        if entry is None:
+            return
+        self._spilled_bytes -= entry[1]
+        try:
+            os.remove(entry[2])
+        except OSError:
+            pass
+
+    @staticmethod
+    def _read_spilled(path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import AnyHttpUrl, PostgresDsn
 
@@ -8,6 +8,41 @@ class Settings(BaseSettings):
     
     # Security
     ALLOWED_KEYS: List[str] = [] # If empty, any formatted key is allowed.
+    ADMIN_KEYS: List[str] = [] # Keys allowed to call /admin endpoints; if empty, nobody is.
+    OWNERSHIP_CACHE_TTL_SECONDS: int = 30 # How long a verified session/dataset owner is trusted without a query
+    OWNERSHIP_CACHE_MAX_ENTRIES: int = 10000
+
+    # Request timing and profiling
+    SERVER_TIMING_ENABLED: bool = True # Send the per-phase Server-Timing header
+    PROFILE_DIR: str = "/tmp/diaas-profiles" # Profiles of admin requests sent with "X-Profile: 1"
+    PROFILE_TTL_SECONDS: int = 3600
+    PROFILE_INTERVAL_SECONDS: float = 0.001 # Sampling interval of the profiler
+
+    # Slow query log and statement statistics
+    SLOW_QUERY_THRESHOLD_SECONDS: Optional[float] = 1.0 # Log SQL/Cypher statements at least this slow; None disables
+    QUERY_STATS_MAX_FINGERPRINTS: int = 2000 # Distinct statements tracked per worker
+
+    # Per-key limits, enforced per worker; null means unlimited
+    RATE_LIMIT_TIERS: Dict[str, Dict[str, Optional[float]]] = {
+        "default": {
+            "requests_per_second": 50,
+            "burst": 100,
+            "concurrent_queries": 4, # /query, /query/batch and /query/federated
+            "concurrent_query_jobs": 4, # Async /query jobs, running or queued
+            "concurrent_bulk_loads": 2, # Record inserts, edge batches and subgraph extraction
+            "ingest_bytes_per_second": 20 * 1024 * 1024, # Request bodies of bulk loads
+        },
+    }
+    RATE_LIMIT_KEY_TIERS: Dict[str, str] = {} # API key -> tier name, e.g. {"etl-key": "bulk"}
+    RATE_LIMIT_MAX_KEYS: int = 100_000 # Keys with rate state kept per worker
+    RATE_LIMIT_RETRY_AFTER_SECONDS: float = 1.0 # Retry-After when all concurrency slots are taken
+
+    # Production server (python -m app.server)
+    SERVER_BIND: str = "0.0.0.0:8000"
+    WEB_CONCURRENCY: Optional[int] = None # Worker processes; None means one per CPU available to the container
+    SERVER_DRAIN_SECONDS: int = 25 # How long shutdown waits for in-flight requests and streamed responses
+    SERVER_WORKER_TIMEOUT_SECONDS: int = 120 # Workers whose event loop is blocked for longer are restarted
+    PROMETHEUS_MULTIPROC_DIR: str = "/tmp/diaas-metrics" # Metric samples shared between workers
     
     # Database
     POSTGRES_USER: str = "postgres"
@@ -15,15 +50,79 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = "postgres"
     POSTGRES_DB: str = "datainfra"
     POSTGRES_PORT: int = 5432
+    POSTGRES_POOL_SIZE: int = 5
+    POSTGRES_MAX_OVERFLOW: int = 10
+    POSTGRES_POOL_TIMEOUT_SECONDS: float = 30.0 # How long a checkout waits for a free connection
+    POSTGRES_POOL_RECYCLE_SECONDS: int = 1800 # -1 keeps connections forever
+    POSTGRES_POOL_PRE_PING: bool = True
+    DB_INIT_ON_STARTUP: bool = True # Create missing tables and columns in the lifespan; python -m app.server does it once before forking
     
+    # Optional read replica for tabular reads and read-only SQL; unset routes everything to the primary
+    POSTGRES_REPLICA_HOST: Optional[str] = None
+    POSTGRES_REPLICA_PORT: Optional[int] = None # Defaults to POSTGRES_PORT
+    REPLICA_MAX_LAG_SECONDS: Optional[float] = None # Fall back to the primary while the replica lags more
+    REPLICA_CHECK_INTERVAL_SECONDS: float = 5.0
+
     NEO4J_URI: str = "bolt://neo4j:7687"
     NEO4J_USER: str = "neo4j"
     NEO4J_PASSWORD: str = "password"
+    NEO4J_DATABASE: Optional[str] = None # Naming the database skips home-database resolution per session
+    NEO4J_TRANSACTION_TIMEOUT_SECONDS: float = 30.0
+    NEO4J_MAX_TRANSACTION_RETRY_TIME: float = 15.0 # Retry budget for transient errors in managed transactions
+    NEO4J_MAX_CONNECTION_POOL_SIZE: int = 100 # Per server address
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT_SECONDS: float = 60.0
+    NEO4J_MAX_CONNECTION_LIFETIME_SECONDS: float = 3600.0
+    NEO4J_LIVENESS_CHECK_TIMEOUT_SECONDS: Optional[float] = None # Ping connections idle longer than this before reuse
+
+    # Graph datasets
+    GRAPH_STORAGE_MODE: str = "label" # "label" (Graph_<id> label per dataset) or "property" (shared label + dataset_id)
+    GRAPH_TRANSACTION_BATCH_SIZE: int = 10000
+    GRAPH_STATS_CACHE_TTL_SECONDS: int = 60
+    GRAPH_STATS_SAMPLE_SIZE: int = 1000
+
+    # Graph analytics
+    ANALYTICS_WRITE_BATCH_SIZE: int = 10000
+    PROJECTION_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    PROJECTION_CACHE_TTL_SECONDS: Optional[float] = 600 # Bounds staleness from graph writes that bypass the API
+
+    # Query endpoint
+    QUERY_TIMEOUT_SECONDS: float = 30.0
+    QUERY_TIMEOUT_OVERRIDES: Dict[str, float] = {} # API key -> timeout cap, e.g. {"batch-key": 600}
+    QUERY_MAX_ROWS: int = 100_000
+    QUERY_DISCONNECT_POLL_SECONDS: float = 0.5
+    QUERY_BATCH_MAX_STATEMENTS: int = 100
+    QUERY_BATCH_CONCURRENCY: int = 4 # Below the SQL pool size so single queries are not starved
+    QUERY_STREAM_MAX_ROWS: int = 1_000_000
+    QUERY_STREAM_MAX_BYTES: int = 512 * 1024 * 1024
+    QUERY_STREAM_FETCH_SIZE: int = 1000
+    FEDERATED_MAX_INPUT_ROWS: int = 1_000_000 # Per side of a federated join
+
+    # Async query jobs
+    QUERY_JOB_DIR: str = "/tmp/diaas-query-jobs" # Share it between workers so any of them can serve results
+    QUERY_JOB_TTL_SECONDS: int = 3600
+    QUERY_JOB_TIMEOUT_SECONDS: float = 3600.0
+    QUERY_JOB_TIMEOUT_OVERRIDES: Dict[str, float] = {} # API key -> job timeout cap; never below its QUERY_TIMEOUT_OVERRIDES entry
+    QUERY_JOB_PAGE_ROWS: int = 1000
+    QUERY_JOB_MAX_RUNNING: int = 4
+
+    # Query result cache (opt-in per request)
+    QUERY_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    QUERY_CACHE_MAX_ENTRY_BYTES: int = 4 * 1024 * 1024
+    QUERY_CACHE_TTL_SECONDS: int = 30
+    QUERY_CACHE_SPILL_DIR: Optional[str] = None # Spill entries evicted from memory to this directory
+    QUERY_CACHE_SPILL_MAX_BYTES: int = 1024 * 1024 * 1024
 
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
         return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def SQLALCHEMY_REPLICA_URI(self) -> Optional[str]:
+        if not self.POSTGRES_REPLICA_HOST:
+            return None
+        port = self.POSTGRES_REPLICA_PORT or self.POSTGRES_PORT
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_REPLICA_HOST}:{port}/{self.POSTGRES_DB}"
+
     class Config:
         env_file = ".env"
         case_sensitive = True
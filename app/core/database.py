@@ -1,10 +1,41 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import time
+from typing import Optional
+
+from fastapi import Depends
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.schema import CreateColumn
 from app.core.config import settings
 
-engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, echo=False)
+from app.core.metrics import instrument_engine
+from app.core.pool_metrics import InstrumentedAsyncPool
+
+POOL_OPTIONS = dict(
+    poolclass=InstrumentedAsyncPool,
+    pool_size=settings.POSTGRES_POOL_SIZE,
+    max_overflow=settings.POSTGRES_MAX_OVERFLOW,
+    pool_timeout=settings.POSTGRES_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.POSTGRES_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.POSTGRES_POOL_PRE_PING,
+)
+
+engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, echo=False, **POOL_OPTIONS)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
+replica_engine = create_async_engine(settings.SQLALCHEMY_REPLICA_URI, echo=False, **POOL_OPTIONS) if settings.SQLALCHEMY_REPLICA_URI else None
+ReplicaSessionLocal = async_sessionmaker(replica_engine, expire_on_commit=False) if replica_engine else None
+
+instrument_engine(engine, "primary")
+if replica_engine is not None:
+    instrument_engine(replica_engine, "replica")
+
+# Seconds since the last replayed transaction, or 0 when the replica has replayed everything it received
+REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
 class Base(DeclarativeBase):
     pass
 
@@ -12,7 +43,83 @@ async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
 
+class ReplicaMonitor:
+    """
+    Decides whether reads may go to the replica. The replica is probed at most
+    every REPLICA_CHECK_INTERVAL_SECONDS; it is skipped while it is unreachable
+    or lags more than REPLICA_MAX_LAG_SECONDS.
+    """
+
+    def __init__(self, replica: Optional[AsyncEngine], max_lag_seconds: Optional[float], check_interval: float):
+        self.replica = replica
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.available = replica is not None
+        self.lag_seconds: Optional[float] = None
+        self._checked_at = float("-inf")
+
+    async def usable(self) -> bool:
+        if self.replica is None:
+            return False
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._checked_at = time.monotonic()
+            await self.check()
+        return self.available
+
+    async def check(self) -> None:
+        try:
+            async with self.replica.connect() as conn:
+                self.lag_seconds = float((await conn.execute(REPLICA_LAG_SQL)).scalar() or 0)
+        except Exception:
+            self.available = False
+            return
+        self.available = self.max_lag_seconds is None or self.lag_seconds <= self.max_lag_seconds
+
+replica_monitor = ReplicaMonitor(replica_engine, settings.REPLICA_MAX_LAG_SECONDS, settings.REPLICA_CHECK_INTERVAL_SECONDS)
+
+async def get_read_db(db: AsyncSession = Depends(get_db)):
+    """Session for reads that tolerate replication lag: the replica when it is healthy, else the primary."""
+    if not await replica_monitor.usable():
+        yield db
+        return
+    async with ReplicaSessionLocal() as session:
+        yield session
+
+def _add_missing_columns(connection) -> None:
+    """
+    create_all only creates missing tables; add the columns models gained since
+    to existing ones. New columns need a server default (or to be nullable) to
+    be added to tables with rows.
+    """
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                definition = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {definition}"))
+
 async def init_db():
     # Helper to init tables if needed
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+
+async def close_db():
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+def reset_after_fork():
+    """
+    Give a forked worker pools of its own. The engines are created when the
+    application is imported, which the server does once before forking; pooled
+    connections of the parent are left alone (``close=False``) and new ones are
+    opened on the worker's event loop.
+    """
+    engine.sync_engine.dispose(close=False)
+    if replica_engine is not None:
+        replica_engine.sync_engine.dispose(close=False)
@@ -1,18 +1,65 @@
 """
 Reusable FastAPI dependencies for authorization and validation.
+
+Each check is a single query: the dataset variants join the dataset to its
+session and filter on the owner. Successful checks are cached per
+(user, session, dataset) for OWNERSHIP_CACHE_TTL_SECONDS; a cache hit attaches
+the cached row to the request's database session without a round trip.
+Deleting a session or dataset through the API invalidates its entries, but
+only in the worker that served the DELETE. Mutating requests therefore always
+check the database, so a deleted session or dataset can never be written
+through another worker; reads there see the deletion once entries expire.
 """
-from fastapi import Depends, HTTPException, Path
+from typing import Any, Dict, Optional, Type
+
+from fastapi import Depends, HTTPException, Path, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import and_, inspect, select
+from sqlalchemy.orm import make_transient_to_detached
 
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.rate_limit import rate_limiter
+from app.core.request_timing import measure
 from app.core.security import get_current_user_id
 from app.models.session import Session
 from app.models.tabular import TabularDataset
 from app.models.graph import GraphDataset
 
+# (model name, user_id, session_id, dataset_id) -> column values of the verified row
+ownership_cache = TTLCache(settings.OWNERSHIP_CACHE_TTL_SECONDS, max_entries=settings.OWNERSHIP_CACHE_MAX_ENTRIES)
+# Only requests with these methods are authorized from the cache
+CACHED_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def invalidate_session_ownership(session_id: str) -> None:
+    """Forget the session and all of its datasets."""
+    ownership_cache.invalidate_where(lambda key: key[2] == session_id)
+
+
+def invalidate_dataset_ownership(dataset_id: str) -> None:
+    ownership_cache.invalidate_where(lambda key: key[3] == dataset_id)
+
+
+def _column_values(instance: Any) -> Dict[str, Any]:
+    return {attr.key: getattr(instance, attr.key) for attr in inspect(type(instance)).column_attrs}
+
+
+async def _cached(db: AsyncSession, model: Type, key: tuple, request: Optional[Request]) -> Optional[Any]:
+    """The cached row as a persistent instance of ``db``, or None on a miss or a mutating request."""
+    if request is not None and request.method not in CACHED_METHODS:
+        return None
+    values = ownership_cache.get(key)
+    if values is None:
+        return None
+    instance = model(**values)
+    make_transient_to_detached(instance)
+    return await db.merge(instance, load=False)
+
 
 async def get_valid_session(
+    request: Request = None,
     session_id: str = Path(..., description="Session ID"),
     user_id: str = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db)
@@ -21,13 +68,45 @@ async def get_valid_session(
     Dependency to verify that the session exists and belongs to the current user.
     Automatically injected into route handlers.
     """
-    session = await db.get(Session, session_id)
-    if not session or session.user_id != user_id:
+    key = ("Session", user_id, session_id, None)
+    with measure("ownership"):
+        session = await _cached(db, Session, key, request)
+        if session is not None:
+            return session
+        result = await db.execute(select(Session).where(Session.id == session_id, Session.user_id == user_id))
+        session = result.scalar_one_or_none()
+    if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+    ownership_cache.set(key, _column_values(session))
     return session
 
 
+async def _get_valid_dataset(
+    model: Type, label: str, session_id: str, dataset_id: str, user_id: str, db: AsyncSession, request: Optional[Request]
+) -> Any:
+    key = (model.__name__, user_id, session_id, dataset_id)
+    with measure("ownership"):
+        dataset = await _cached(db, model, key, request)
+        if dataset is not None:
+            return dataset
+        # The outer join tells a missing session apart from a missing dataset in one round trip
+        result = await db.execute(
+            select(Session.id, model)
+            .outerjoin(model, and_(model.session_id == Session.id, model.id == dataset_id))
+            .where(Session.id == session_id, Session.user_id == user_id)
+        )
+        row = result.first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    dataset = row[1]
+    if dataset is None:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    ownership_cache.set(key, _column_values(dataset))
+    return dataset
+
+
 async def get_valid_tabular_dataset(
+    request: Request = None,
     session_id: str = Path(..., description="Session ID"),
     dataset_id: str = Path(..., description="Dataset ID"),
     user_id: str = Depends(get_current_user_id),
@@ -37,25 +116,11 @@ async def get_valid_tabular_dataset(
     Dependency to verify that the tabular dataset exists and belongs to the user's session.
     Also validates session ownership.
     """
-    # First verify session
-    session = await db.get(Session, session_id)
-    if not session or session.user_id != user_id:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Then verify dataset
-    result = await db.execute(
-        select(TabularDataset).where(
-            TabularDataset.id == dataset_id,
-            TabularDataset.session_id == session_id
-        )
-    )
-    dataset = result.scalar_one_or_none()
-    if not dataset:
-        raise HTTPException(status_code=404, detail="Tabular dataset not found")
-    return dataset
+    return await _get_valid_dataset(TabularDataset, "Tabular dataset", session_id, dataset_id, user_id, db, request)
 
 
 async def get_valid_graph_dataset(
+    request: Request = None,
     session_id: str = Path(..., description="Session ID"),
     dataset_id: str = Path(..., description="Dataset ID"),
     user_id: str = Depends(get_current_user_id),
@@ -65,19 +130,30 @@ async def get_valid_graph_dataset(
     Dependency to verify that the graph dataset exists and belongs to the user's session.
     Also validates session ownership.
     """
-    # First verify session
-    session = await db.get(Session, session_id)
-    if not session or session.user_id != user_id:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Then verify dataset
-    result = await db.execute(
-        select(GraphDataset).where(
-            GraphDataset.id == dataset_id,
-            GraphDataset.session_id == session_id
-        )
-    )
-    dataset = result.scalar_one_or_none()
-    if not dataset:
-        raise HTTPException(status_code=404, detail="Graph dataset not found")
-    return dataset
+    return await _get_valid_dataset(GraphDataset, "Graph dataset", session_id, dataset_id, user_id, db, request)
+
+
+async def query_slot(user_id: str = Depends(get_current_user_id)):
+    """
+    Dependency holding one of the key's concurrent query slots until the
+    response has been sent; 429 when they are all taken.
+    """
+    rate_limiter.acquire(user_id, "query")
+    try:
+        yield
+    finally:
+        rate_limiter.release(user_id, "query")
+
+
+async def bulk_load_slot(request: Request, user_id: str = Depends(get_current_user_id)):
+    """
+    Dependency holding one of the key's concurrent bulk load slots and charging
+    the request body to its ingest budget; 429 when either is exhausted. The
+    slot is taken first, so a request refused for concurrency costs no budget.
+    """
+    rate_limiter.acquire(user_id, "bulk_load")
+    try:
+        rate_limiter.check_ingest(user_id, len(await request.body()))
+        yield
+    finally:
+        rate_limiter.release(user_id, "bulk_load")
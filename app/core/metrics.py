@@ -0,0 +1,225 @@
+"""
+Prometheus metrics served at /metrics.
+
+``MetricsMiddleware`` times every request per route template, counts the
+requests in flight and measures the bytes sent. SQL statements are timed
+through engine events (``instrument_engine``), GraphService calls through
+the ``timed_calls`` class decorator, and ``PoolCollector`` reads the
+connection pool snapshots of the admin pools endpoint at scrape time.
+
+With several workers (``python -m app.server``) each worker writes its
+samples to PROMETHEUS_MULTIPROC_DIR and a scrape of any worker reports the
+sum over all of them; pool metrics are those of the worker that answers.
+"""
+import functools
+import inspect
+import os
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.query_stats import query_stats
+from app.core.request_timing import measure, record
+
+UNMATCHED_ROUTE = "<unmatched>"
+SQL_OPERATIONS = {
+    "select", "insert", "update", "delete", "with", "create", "drop", "alter", "copy",
+    "explain", "set", "show", "begin", "commit", "rollback", "savepoint", "release",
+}
+_QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "diaas_http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response.",
+    ["method", "route", "status"],
+    buckets=_QUERY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "diaas_http_requests_in_progress", "Requests being handled.", ["method"], multiprocess_mode="livesum"
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    "diaas_http_response_bytes",
+    "Size of response bodies.",
+    ["method", "route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864),
+)
+SQL_STATEMENT_DURATION = Histogram(
+    "diaas_sql_statement_duration_seconds",
+    "Execution time of SQL statements, until the first row is available.",
+    ["database", "operation"],
+    buckets=_QUERY_BUCKETS,
+)
+NEO4J_CALL_DURATION = Histogram(
+    "diaas_neo4j_call_duration_seconds",
+    "Duration of GraphService calls, including driver retries.",
+    ["operation"],
+    buckets=_QUERY_BUCKETS,
+)
+NEO4J_CALL_ERRORS = Counter(
+    "diaas_neo4j_call_errors_total", "GraphService calls that raised.", ["operation"]
+)
+QUERY_RESULT_ROWS = Histogram(
+    "diaas_query_result_rows",
+    "Rows returned by /query statements.",
+    ["query_type", "mode"],
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000, 1000000),
+)
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """
+    The matched route's path template (``/sessions/{session_id}``), keeping
+    label cardinality bounded. Only known once the router has run.
+
+    ``scope["route"].path`` is relative to the router it was declared on when
+    FastAPI includes routers lazily; the full template is then recorded on the
+    effective route context.
+    """
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    return (
+        getattr(context, "path_format", None)
+        or getattr(scope.get("route"), "path", None)
+        or UNMATCHED_ROUTE
+    )
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed responses are timed until their last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        size = 0
+
+        async def send_and_measure(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        # The route is resolved further down the stack, so requests in flight are counted per method
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            in_progress.dec()
+            route = route_template(scope)
+            HTTP_REQUEST_DURATION.labels(method, route, str(status)).observe(time.perf_counter() - started)
+            HTTP_RESPONSE_BYTES.labels(method, route).observe(size)
+
+
+def _sql_operation(statement: str) -> str:
+    words = statement.lstrip(" \n\t(").split(None, 1)
+    operation = words[0].lower() if words else ""
+    return operation if operation in SQL_OPERATIONS else "other"
+
+
+def instrument_engine(engine: AsyncEngine, database: str) -> None:
+    """Observe the duration of every statement the engine executes, also in the statement statistics."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def observe(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            SQL_STATEMENT_DURATION.labels(database, _sql_operation(statement)).observe(elapsed)
+            record("sql", elapsed)
+            query_stats.observe("sql", statement, elapsed, cursor.rowcount if cursor.rowcount >= 0 else None)
+
+
+def timed_calls(cls):
+    """
+    Class decorator observing each public coroutine method in NEO4J_CALL_DURATION
+    and in the request's Cypher time.
+    """
+    for name, member in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.iscoroutinefunction(member):
+            setattr(cls, name, _timed(member, name))
+    return cls
+
+
+def _timed(method, operation: str):
+    duration = NEO4J_CALL_DURATION.labels(operation)
+    errors = NEO4J_CALL_ERRORS.labels(operation)
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with measure("cypher"):
+                return await method(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+class PoolCollector:
+    """Connection pool gauges and counters, read from the pool snapshots at scrape time."""
+
+    def collect(self) -> Iterator[Any]:
+        # Imported here: the database module imports this one to instrument its engines
+        from app.core.database import engine, replica_engine
+        from app.core.neo4j_db import get_neo4j_driver
+        from app.core.pool_metrics import neo4j_pool_snapshot, sql_pool_snapshot
+
+        snapshots: Dict[str, Optional[Dict[str, Any]]] = {
+            "postgres": sql_pool_snapshot(engine),
+            "postgres_replica": sql_pool_snapshot(replica_engine),
+            "neo4j": neo4j_pool_snapshot(get_neo4j_driver()),
+        }
+        connections = GaugeMetricFamily("diaas_pool_connections", "Pooled connections by state.", labels=["pool", "state"])
+        utilization = GaugeMetricFamily("diaas_pool_utilization_ratio", "Connections in use over the pool's capacity.", labels=["pool"])
+        counters = {
+            "acquisitions": CounterMetricFamily("diaas_pool_acquisitions", "Connection acquisitions.", labels=["pool"]),
+            "waits": CounterMetricFamily("diaas_pool_waits", "Acquisitions that waited for a free connection.", labels=["pool"]),
+            "wait_seconds_total": CounterMetricFamily("diaas_pool_wait_seconds", "Time spent waiting for a free connection.", labels=["pool"]),
+            "timeouts": CounterMetricFamily("diaas_pool_timeouts", "Acquisitions that timed out.", labels=["pool"]),
+        }
+        for pool, snapshot in snapshots.items():
+            if snapshot is None:
+                continue
+            in_use = snapshot.get("checked_out", snapshot.get("in_use"))
+            if in_use is not None:
+                connections.add_metric([pool, "in_use"], in_use)
+                connections.add_metric([pool, "idle"], snapshot["idle"])
+            if snapshot.get("utilization") is not None:
+                utilization.add_metric([pool], snapshot["utilization"])
+            for key, family in counters.items():
+                if key in snapshot:
+                    family.add_metric([pool], snapshot[key])
+        yield connections
+        yield utilization
+        yield from counters.values()
+
+
+def scrape_registry() -> CollectorRegistry:
+    """The registry /metrics reports: this process's, or all workers' when running multiprocess."""
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(PoolCollector())
+    return registry
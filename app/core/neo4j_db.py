@@ -1,20 +1,50 @@
+from fastapi import Request
+from fastapi.responses import JSONResponse
 from neo4j import GraphDatabase, AsyncGraphDatabase
 from app.core.config import settings
+from app.core.pool_metrics import instrument_neo4j_pool
 
 # Global driver instance
 driver = None
 
 async def init_neo4j():
     global driver
+    # Use a neo4j:// URI against a cluster so reads are routed to followers and read replicas
     driver = AsyncGraphDatabase.driver(
         settings.NEO4J_URI, 
-        auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+        auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+        max_transaction_retry_time=settings.NEO4J_MAX_TRANSACTION_RETRY_TIME,
+        max_connection_pool_size=settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+        connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT_SECONDS,
+        max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME_SECONDS,
+        liveness_check_timeout=settings.NEO4J_LIVENESS_CHECK_TIMEOUT_SECONDS
     )
+    instrument_neo4j_pool(driver)
 
 async def close_neo4j():
     global driver
     if driver:
         await driver.close()
 
+def reset_after_fork():
+    """Drop a driver inherited from the parent process; each worker opens its own in the lifespan handler."""
+    global driver
+    driver = None
+
 def get_neo4j_driver():
     return driver
+
+async def neo4j_constraint_handler(request: Request, exc: Exception):
+    """Report writes rejected by a uniqueness constraint (e.g. a duplicate node key) as 409 instead of 500."""
+    return JSONResponse(
+        status_code=409,
+        content={"detail": f"Conflicts with an existing node: {exc}"}
+    )
+
+async def neo4j_unavailable_handler(request: Request, exc: Exception):
+    """Report transient Neo4j failures that outlived the driver's retries as 503 instead of 500."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Graph database temporarily unavailable: {exc}"},
+        headers={"Retry-After": "1"}
+    )
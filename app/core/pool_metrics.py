@@ -0,0 +1,138 @@
+"""
+Connection pool instrumentation for the admin pools endpoint.
+
+Both pools count acquisitions, how many of them had to wait because every
+connection was in use, and the time spent acquiring. The Neo4j driver has no
+public pool API, so its pool is read and wrapped through driver internals;
+``neo4j_pool_snapshot`` returns None where those are not available.
+"""
+import time
+from typing import Any, Dict, Optional
+
+from neo4j import AsyncDriver
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import settings
+
+
+class PoolStats:
+    """Acquisition counters of one pool since it was created."""
+
+    def __init__(self):
+        self.acquisitions = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds: float, waited: bool) -> None:
+        self.acquisitions += 1
+        if waited:
+            self.waits += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "acquisitions": self.acquisitions,
+            "waits": self.waits,
+            "wait_seconds_total": round(self.wait_seconds, 6),
+            "wait_seconds_max": round(self.max_wait_seconds, 6),
+            "timeouts": self.timeouts,
+        }
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """The default asyncio queue pool, counting checkouts that wait for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        # With every connection checked out and no overflow left, the checkout blocks
+        waited = self.checkedin() == 0 and 0 <= self._max_overflow <= self.overflow()
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record(time.perf_counter() - started, waited)
+        return connection
+
+
+def sql_pool_snapshot(engine) -> Optional[Dict[str, Any]]:
+    if engine is None:
+        return None
+    pool = engine.pool
+    snapshot: Dict[str, Any] = {"class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        in_use = pool.checkedout()
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        snapshot.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+            "checked_out": in_use,
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "utilization": round(in_use / capacity, 4) if capacity else None,
+        })
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        snapshot.update(stats.snapshot())
+    return snapshot
+
+
+def instrument_neo4j_pool(driver: AsyncDriver) -> None:
+    """Wrap the driver pool's acquire() to record acquisition waits."""
+    pool = getattr(driver, "_pool", None)
+    if pool is None or not hasattr(pool, "acquire") or hasattr(pool, "stats"):
+        return
+    pool.stats = PoolStats()
+    acquire = pool.acquire
+
+    async def instrumented_acquire(*args, **kwargs):
+        waited = _neo4j_in_use(pool) >= pool.pool_config.max_connection_pool_size
+        started = time.perf_counter()
+        try:
+            connection = await acquire(*args, **kwargs)
+        except Exception:
+            # The acquisition timeout is a session setting, not part of the pool config
+            if time.perf_counter() - started >= settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT_SECONDS:
+                pool.stats.timeouts += 1
+            raise
+        pool.stats.record(time.perf_counter() - started, waited)
+        return connection
+
+    pool.acquire = instrumented_acquire
+
+
+def _neo4j_in_use(pool) -> int:
+    return sum(connection.in_use for connections in list(pool.connections.values()) for connection in list(connections))
+
+
+def neo4j_pool_snapshot(driver) -> Optional[Dict[str, Any]]:
+    pool = getattr(driver, "_pool", None) if isinstance(driver, AsyncDriver) else None
+    if pool is None or not hasattr(pool, "connections"):
+        return None
+    connections = sum(len(connections) for connections in list(pool.connections.values()))
+    in_use = _neo4j_in_use(pool)
+    max_size = pool.pool_config.max_connection_pool_size
+    snapshot = {
+        "class": type(pool).__name__,
+        "max_size": max_size,
+        "acquisition_timeout_seconds": settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT_SECONDS,
+        "max_lifetime_seconds": pool.pool_config.max_connection_lifetime,
+        "addresses": len(pool.connections),
+        "in_use": in_use,
+        "idle": connections - in_use,
+        # The limit applies per server address
+        "utilization": round(in_use / (max_size * max(len(pool.connections), 1)), 4) if max_size > 0 else None,
+    }
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        snapshot.update(stats.snapshot())
+    return snapshot
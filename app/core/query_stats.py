@@ -0,0 +1,144 @@
+"""
+Slow statement log and per-fingerprint statement statistics.
+
+SQL statements are reported through the engine events of ``metrics``, Cypher
+statements by GraphService and the /query endpoint. Statements are grouped
+by ``fingerprint``, which strips literals and dataset ids so that the same
+statement against different datasets is counted once, unlike
+pg_stat_statements. Statements slower than SLOW_QUERY_THRESHOLD_SECONDS are
+logged to the ``diaas.slow_queries`` logger with their fingerprint, row
+count, session and a hash of the API key. Statistics are kept per worker.
+"""
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.request_timing import current_request
+
+logger = logging.getLogger("diaas.slow_queries")
+
+ORDERINGS = ("total_seconds", "mean_seconds", "max_seconds", "calls", "rows", "slow_calls")
+
+# String literals and comments; quoted identifiers are matched so they can be kept
+_SQL_TOKENS = re.compile(
+    r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/|\$(\w*)\$.*?\$\1\$""",
+    re.DOTALL,
+)
+_CYPHER_TOKENS = re.compile(
+    r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`(?:[^`]|``)*`|//[^\n]*|/\*.*?\*/""",
+    re.DOTALL,
+)
+_IDENTIFIER_QUOTES = {"sql": '"', "cypher": "`"}
+# Dataset ids are baked into table names, labels and constraint names
+_UUID = re.compile(r"[0-9a-f]{8}[-_][0-9a-f]{4}[-_][0-9a-f]{4}[-_][0-9a-f]{4}[-_][0-9a-f]{12}", re.IGNORECASE)
+_NUMBER = re.compile(r"(?<![\w$.])[-+]?\d+(?:\.\d+)?(?:e[-+]?\d+)?\b", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+_VALUES_ROWS = re.compile(r"(\((?:\s*\?\s*,)*\s*\?\s*\))(?:\s*,\s*\((?:\s*\?\s*,)*\s*\?\s*\))+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)|\[\s*\?(?:\s*,\s*\?)+\s*\]")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(query_type: str, query: str) -> Tuple[str, str]:
+    """
+    ``(id, text)`` grouping statements that differ only in literals, dataset
+    ids and list lengths. The text is lowercased, literals become ``?`` and
+    dataset tables and labels become ``dataset_?`` and ``graph_?``.
+    """
+    pattern = _SQL_TOKENS if query_type == "sql" else _CYPHER_TOKENS
+    identifier_quote = _IDENTIFIER_QUOTES.get(query_type)
+
+    def mask(match: re.Match) -> str:
+        token = match.group(0)
+        if token.startswith(("--", "//", "/*")):
+            return " "
+        if token.startswith(identifier_quote):
+            return token
+        return "?"
+
+    text = _UUID.sub("?", pattern.sub(mask, query))
+    text = _NUMBER.sub("?", text)
+    text = _WHITESPACE.sub(" ", text).strip().rstrip(";").strip().lower()
+    text = _VALUES_ROWS.sub(r"\1", text)
+    text = _PLACEHOLDER_LIST.sub(lambda m: "(?)" if m.group(0).startswith("(") else "[?]", text)
+    return hashlib.sha1(f"{query_type}:{text}".encode()).hexdigest()[:16], text
+
+
+def key_id(api_key: Optional[str]) -> Optional[str]:
+    """Stable short hash of an API key; keys are credentials and are not logged."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12] if api_key else None
+
+
+class StatementStats:
+    def __init__(self, fingerprint_id: str, query_type: str, text: str):
+        self.fingerprint_id = fingerprint_id
+        self.query_type = query_type
+        self.text = text
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.slow_calls = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint_id,
+            "query_type": self.query_type,
+            "query": self.text,
+            "calls": self.calls,
+            "total_seconds": round(self.total_seconds, 6),
+            "mean_seconds": round(self.total_seconds / self.calls, 6),
+            "max_seconds": round(self.max_seconds, 6),
+            "rows": self.rows,
+            "slow_calls": self.slow_calls,
+        }
+
+
+class QueryStats:
+    """Statement statistics by fingerprint, keeping the ``max_fingerprints`` most recently seen."""
+
+    def __init__(self, max_fingerprints: int, slow_threshold_seconds: Optional[float]):
+        self.max_fingerprints = max_fingerprints
+        self.slow_threshold_seconds = slow_threshold_seconds
+        self._entries: "OrderedDict[str, StatementStats]" = OrderedDict()
+
+    def observe(self, query_type: str, query: str, seconds: float, rows: Optional[int] = None) -> None:
+        fingerprint_id, text = fingerprint(query_type, query)
+        stats = self._entries.get(fingerprint_id)
+        if stats is None:
+            stats = self._entries[fingerprint_id] = StatementStats(fingerprint_id, query_type, text)
+            while len(self._entries) > self.max_fingerprints:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(fingerprint_id)
+        stats.calls += 1
+        stats.total_seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+        stats.rows += rows or 0
+        if self.slow_threshold_seconds is not None and seconds >= self.slow_threshold_seconds:
+            stats.slow_calls += 1
+            api_key, session_id = current_request()
+            logger.warning(
+                "slow %s statement: %.1f ms, rows=%s, session=%s, key=%s, fingerprint=%s: %s",
+                query_type, seconds * 1000, rows, session_id, key_id(api_key), fingerprint_id, text,
+            )
+
+    def top(self, limit: int, order_by: str = "total_seconds", query_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        snapshots = [
+            stats.snapshot() for stats in list(self._entries.values())
+            if query_type is None or stats.query_type == query_type
+        ]
+        snapshots.sort(key=lambda snapshot: snapshot[order_by], reverse=True)
+        return snapshots[:limit]
+
+    def reset(self) -> None:
+        self._entries.clear()
+
+
+query_stats = QueryStats(
+    max_fingerprints=settings.QUERY_STATS_MAX_FINGERPRINTS,
+    slow_threshold_seconds=settings.SLOW_QUERY_THRESHOLD_SECONDS,
+)
@@ -0,0 +1,132 @@
+"""
+Per-API-key request rate, concurrency and ingest quotas.
+
+Every key belongs to a tier of RATE_LIMIT_TIERS (``default`` unless
+RATE_LIMIT_KEY_TIERS names another); fields a tier leaves out come from the
+default tier and ``None`` means unlimited. Requests over a limit are refused
+with 429 and a ``Retry-After`` header before they reach the connection
+pools. State is kept per worker process, so with N workers a key can use up
+to N times its budget.
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+LIMITS = (
+    "requests_per_second", "burst", "concurrent_queries", "concurrent_query_jobs", "concurrent_bulk_loads",
+    "ingest_bytes_per_second",
+)
+SLOT_LIMITS = {"query": "concurrent_queries", "query_job": "concurrent_query_jobs", "bulk_load": "concurrent_bulk_loads"}
+
+
+class TokenBucket:
+    """Refills ``rate`` tokens per second up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def take(self, amount: float = 1.0) -> float:
+        """
+        Take ``amount`` tokens and return 0, or return the seconds until they
+        are available. Amounts above the capacity are granted once the bucket
+        is full and leave it in debt.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            self.tokens -= amount
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+
+def too_many_requests(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimiter:
+    def __init__(self, tiers: Dict[str, Dict[str, Optional[float]]], key_tiers: Dict[str, str], max_keys: int):
+        self.tiers = tiers
+        self.key_tiers = key_tiers
+        self.max_keys = max_keys
+        # Keys need not be registered, so the per-key buckets are bounded (least recently used go first)
+        self._buckets: "OrderedDict[tuple, TokenBucket]" = OrderedDict()
+        self._slots: Dict[tuple, int] = {}
+
+    def limits(self, api_key: str) -> Dict[str, Optional[float]]:
+        tier = self.key_tiers.get(api_key, "default")
+        return {**self.tiers.get("default", {}), **self.tiers.get(tier, {})}
+
+    def _bucket(self, api_key: str, kind: str, rate: float, capacity: float) -> TokenBucket:
+        key = (api_key, kind)
+        bucket = self._buckets.get(key)
+        if bucket is None or (bucket.rate, bucket.capacity) != (rate, capacity):
+            bucket = self._buckets[key] = TokenBucket(rate, capacity)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def check_request(self, api_key: str) -> None:
+        """Count one request against the key's rate; raises 429 when it is exhausted."""
+        limits = self.limits(api_key)
+        rate = limits.get("requests_per_second")
+        if not rate:
+            return
+        burst = limits.get("burst") or rate
+        wait = self._bucket(api_key, "requests", rate, burst).take()
+        if wait:
+            raise too_many_requests(f"Rate limit of {rate:g} requests per second exceeded.", wait)
+
+    def check_ingest(self, api_key: str, size: int) -> None:
+        """Count ``size`` bytes against the key's ingest budget; raises 429 when it is exhausted."""
+        rate = self.limits(api_key).get("ingest_bytes_per_second")
+        if not rate or not size:
+            return
+        # One second of budget can be spent at once
+        wait = self._bucket(api_key, "ingest", rate, rate).take(size)
+        if wait:
+            raise too_many_requests(f"Ingest budget of {rate:g} bytes per second exceeded.", wait)
+
+    def acquire(self, api_key: str, kind: str) -> None:
+        """Take one of the key's ``query``, ``query_job`` or ``bulk_load`` slots; raises 429 when all are taken."""
+        limit = self.limits(api_key).get(SLOT_LIMITS[kind])
+        key = (api_key, kind)
+        if limit is not None and self._slots.get(key, 0) >= limit:
+            raise too_many_requests(
+                f"Too many concurrent {kind.replace('_', ' ')}s (limit {limit:g}).",
+                settings.RATE_LIMIT_RETRY_AFTER_SECONDS,
+            )
+        self._slots[key] = self._slots.get(key, 0) + 1
+
+    def release(self, api_key: str, kind: str) -> None:
+        key = (api_key, kind)
+        remaining = self._slots.get(key, 0) - 1
+        if remaining > 0:
+            self._slots[key] = remaining
+        else:
+            self._slots.pop(key, None)
+
+    def in_use(self, api_key: str, kind: str) -> int:
+        return self._slots.get((api_key, kind), 0)
+
+
+rate_limiter = RateLimiter(
+    tiers=settings.RATE_LIMIT_TIERS,
+    key_tiers=settings.RATE_LIMIT_KEY_TIERS,
+    max_keys=settings.RATE_LIMIT_MAX_KEYS,
+)
@@ -0,0 +1,189 @@
+"""
+Per-request timing breakdown and the opt-in request profiler.
+
+``ServerTimingMiddleware`` puts a ``RequestTimings`` into a context variable
+for every request. Auth, ownership checks, SQL statements, Cypher calls and
+JSON rendering add their time to it through ``measure`` and ``record``, and
+the totals are sent as a ``Server-Timing`` header with the response start
+(time spent streaming a body afterwards is not included).
+
+Requests from keys in ADMIN_KEYS carrying ``X-Profile: 1`` additionally run
+under a sampling profiler. The profile is saved to PROFILE_DIR, its id is
+returned in ``X-Profile-Id`` and ``GET /admin/profiles/{id}`` renders it.
+"""
+import asyncio
+import functools
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, Tuple
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from pyinstrument.session import Session as ProfileSession
+
+PHASES = ("auth", "ownership", "sql", "cypher", "serialization")
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class RequestTimings:
+    """Seconds spent per phase of one request."""
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        # Overlapping spans of a phase (nested calls, concurrent tasks) count once
+        self._depth: Dict[str, int] = {}
+        self._started: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.durations[phase] = self.durations.get(phase, 0.0) + seconds
+
+    def begin(self, phase: str) -> None:
+        depth = self._depth.get(phase, 0)
+        if depth == 0:
+            self._started[phase] = time.perf_counter()
+        self._depth[phase] = depth + 1
+
+    def end(self, phase: str) -> None:
+        self._depth[phase] -= 1
+        if self._depth[phase] == 0:
+            self.add(phase, time.perf_counter() - self._started.pop(phase))
+
+    def header_value(self, total_seconds: float) -> str:
+        entries = [f"{phase};dur={self.durations[phase] * 1000:.3f}" for phase in PHASES if phase in self.durations]
+        entries.append(f"total;dur={total_seconds * 1000:.3f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+
+def current_request() -> Tuple[Optional[str], Optional[str]]:
+    """API key and session id of the current request; None outside requests and session routes."""
+    scope = _scope.get()
+    if scope is None:
+        return None, None
+    # Path parameters are filled in once the router has matched the request
+    return _header(scope, b"x-api-key"), scope.get("path_params", {}).get("session_id")
+
+
+def record(phase: str, seconds: float) -> None:
+    """Add ``seconds`` to ``phase`` of the current request, if there is one."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(phase, seconds)
+
+
+@contextmanager
+def measure(phase: str) -> Iterator[None]:
+    """Time the block as ``phase`` of the current request."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    timings.begin(phase)
+    try:
+        yield
+    finally:
+        timings.end(phase)
+
+
+def measured(phase: str):
+    """Decorator timing a coroutine function as ``phase`` of the current request."""
+    def decorate(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with measure(phase):
+                return await function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _profile_path(profile_id: str) -> str:
+    return os.path.join(settings.PROFILE_DIR, f"{profile_id}.json")
+
+
+def save_profile(profile_id: str, session: "ProfileSession") -> None:
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    purge_profiles()
+    session.save(_profile_path(profile_id))
+
+
+def load_profile(profile_id: str) -> Optional["ProfileSession"]:
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    from pyinstrument.session import Session as ProfileSession
+    try:
+        return ProfileSession.load(_profile_path(profile_id))
+    except (OSError, ValueError):
+        return None
+
+
+def purge_profiles() -> None:
+    cutoff = time.time() - settings.PROFILE_TTL_SECONDS
+    try:
+        names = os.listdir(settings.PROFILE_DIR)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(settings.PROFILE_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class ServerTimingMiddleware:
+    """Pure ASGI middleware: collects the request's timings and runs the admin profiler."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile = _header(scope, b"x-profile") == "1" and _header(scope, b"x-api-key") in settings.ADMIN_KEYS
+        profile_id = uuid.uuid4().hex if profile else None
+        timings = RequestTimings()
+        token = _current.set(timings)
+        scope_token = _scope.set(scope)
+        started = time.perf_counter()
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if settings.SERVER_TIMING_ENABLED:
+                    headers.append((b"server-timing", timings.header_value(time.perf_counter() - started).encode()))
+                if profile_id:
+                    headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = None
+        if profile:
+            # The profiler is only imported once an admin asks for a profile
+            from pyinstrument import Profiler
+            profiler = Profiler(interval=settings.PROFILE_INTERVAL_SECONDS, async_mode="enabled")
+            profiler.start()
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            _current.reset(token)
+            _scope.reset(scope_token)
+            if profiler:
+                session = profiler.stop()
+                await asyncio.to_thread(save_profile, profile_id, session)
@@ -1,7 +1,9 @@
 import re
-from fastapi import HTTPException, Security, status
+from fastapi import Depends, HTTPException, Security, status
 from fastapi.security import APIKeyHeader
 from app.core.config import settings
+from app.core.rate_limit import rate_limiter
+from app.core.request_timing import measure
 
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=True)
 
@@ -11,20 +13,33 @@ async def get_current_user_id(api_key: str = Security(api_key_header)) -> str:
     """
     Validates API Key and returns it as the user ID.
     If ALLOWED_KEYS is configured, checks against the list.
-    Otherwise, just validates format.
+    Otherwise, just validates format. Keys over their request rate get 429.
     """
-    # 1. Format Validation
-    if not KEY_PATTERN.match(api_key):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Invalid API Key format. Must be 8-64 alphanumeric characters (including - and _)."
-        )
+    with measure("auth"):
+        # 1. Format Validation
+        if not KEY_PATTERN.match(api_key):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Invalid API Key format. Must be 8-64 alphanumeric characters (including - and _)."
+            )
+
+        # 2. Permission Check (if configured)
+        if settings.ALLOWED_KEYS and api_key not in settings.ALLOWED_KEYS:
+             raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="API Key not authorized."
+            )
 
-    # 2. Permission Check (if configured)
-    if settings.ALLOWED_KEYS and api_key not in settings.ALLOWED_KEYS:
-         raise HTTPException(
+        # 3. Request rate of the key's tier
+        rate_limiter.check_request(api_key)
+
+    return api_key
+
+async def require_admin(api_key: str = Depends(get_current_user_id)) -> str:
+    """Allows only keys listed in ADMIN_KEYS; with none configured, admin endpoints are closed."""
+    if api_key not in settings.ADMIN_KEYS:
+        raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="API Key not authorized."
+            detail="Admin access required."
         )
-    
     return api_key
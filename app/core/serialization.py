@@ -0,0 +1,62 @@
+"""
+JSON encoding of query results and graph payloads.
+
+Values are encoded in one pass by orjson. Types orjson does not know are
+converted by ``encode_value`` without losing information: Neo4j graph
+objects keep their ids, labels and types, temporal values keep nanoseconds
+and time zones, Decimals keep their digits and bytes are base64-encoded.
+Routes return ``ResultJSONResponse`` directly, which skips FastAPI's
+``jsonable_encoder`` walk.
+"""
+import base64
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from neo4j.graph import Node, Path, Relationship
+from neo4j.spatial import Point
+from neo4j.time import Date, DateTime, Duration, Time
+
+from app.core.request_timing import measure
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def encode_value(value: Any) -> Any:
+    """orjson ``default`` hook: a JSON-compatible form of ``value``."""
+    if isinstance(value, Node):
+        return {"element_id": value.element_id, "labels": sorted(value.labels), "properties": dict(value)}
+    if isinstance(value, Relationship):
+        return {
+            "element_id": value.element_id,
+            "type": value.type,
+            "start": value.start_node.element_id if value.start_node is not None else None,
+            "end": value.end_node.element_id if value.end_node is not None else None,
+            "properties": dict(value),
+        }
+    if isinstance(value, Path):
+        return {"nodes": list(value.nodes), "relationships": list(value.relationships)}
+    if isinstance(value, (Date, DateTime, Time, Duration)):
+        return value.iso_format()
+    if isinstance(value, Point):
+        return {"srid": value.srid, "coordinates": list(value)}
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(value).decode()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=encode_value, option=_OPTIONS)
+
+
+class ResultJSONResponse(JSONResponse):
+    """JSONResponse rendered with ``dumps``; return it from the route to bypass jsonable_encoder."""
+
+    def render(self, content: Any) -> bytes:
+        with measure("serialization"):
+            return dumps(content)
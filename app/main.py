@@ -1,11 +1,35 @@
 
-from fastapi import FastAPI, APIRouter
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, APIRouter, Response
+from neo4j.exceptions import ConstraintError, ServiceUnavailable, SessionExpired, TransientError
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 
 from app.core.config import settings
-from app.api.routes import users, sessions, tabular, graph, export, query
-from app.core.neo4j_db import init_neo4j, close_neo4j
+from app.core.metrics import MetricsMiddleware, PoolCollector, scrape_registry
+from app.core.request_timing import ServerTimingMiddleware
+from app.api.routes import users, sessions, tabular, graph, export, query, admin
+from app.core.database import init_db, close_db
+from app.core.neo4j_db import init_neo4j, close_neo4j, neo4j_constraint_handler, neo4j_unavailable_handler
+from app.services.query_jobs import query_jobs
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.DB_INIT_ON_STARTUP:
+        await init_db()
+    await init_neo4j()
+    yield
+    await query_jobs.shutdown()
+    await close_neo4j()
+    await close_db()
+
 
-app = FastAPI(title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json")
+app = FastAPI(title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+REGISTRY.register(PoolCollector())
 
 api_router = APIRouter()
 api_router.include_router(users.router, prefix="/users", tags=["users"])
@@ -14,14 +38,11 @@ api_router.include_router(tabular.router, prefix="/sessions", tags=["tabular"])
 api_router.include_router(graph.router, prefix="/sessions", tags=["graph"])
 api_router.include_router(export.router, prefix="/sessions", tags=["export"])
 api_router.include_router(query.router, prefix="/sessions", tags=["query"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
 
-@app.on_event("startup")
-async def startup_event():
-    await init_neo4j()
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    await close_neo4j()
+for exc_class in (TransientError, ServiceUnavailable, SessionExpired):
+    app.add_exception_handler(exc_class, neo4j_unavailable_handler)
+app.add_exception_handler(ConstraintError, neo4j_constraint_handler)
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -29,3 +50,8 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(scrape_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, ForeignKey, DateTime
+from sqlalchemy import Column, String, ForeignKey, DateTime, Integer
 from app.core.database import Base
 from datetime import datetime
 import uuid
@@ -12,3 +12,5 @@ class GraphDataset(Base):
     # Neo4j uses Labels to distinguish datasets.
     # Logic: Label = "Graph_" + ID (sanitized)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped on every write through the API; keys cached /query results of the session
+    write_version = Column(Integer, nullable=False, default=0, server_default="0")
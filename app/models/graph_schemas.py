@@ -1,13 +1,19 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Dict, List, Any, Optional
 
 class GraphDatasetCreate(BaseModel):
     name: str
+    key_properties: List[str] = Field([], description="Properties that uniquely identify a node (uniqueness constraint)")
+    indexed_properties: List[str] = Field([], description="Properties to back with a range index")
+    text_indexed_properties: List[str] = Field([], description="Properties to back with a text index")
 
     class Config:
         json_schema_extra = {
             "example": {
-                "name": "SocialNetwork"
+                "name": "SocialNetwork",
+                "key_properties": ["email"],
+                "indexed_properties": ["age"],
+                "text_indexed_properties": ["name"]
             }
         }
 
@@ -20,14 +26,82 @@ class GraphDatasetResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class SubgraphCreate(BaseModel):
+    name: str = Field(..., description="Name of the new graph dataset")
+    node_filter: Optional[Dict[str, Any]] = Field(None, description="Select nodes whose properties equal these values")
+    label: Optional[str] = Field(None, description="Restrict node_filter to nodes with this label")
+    node_keys: Optional[List[str]] = Field(None, description="Select these nodes by key")
+    seed_keys: Optional[List[str]] = Field(None, description="Select nodes within `radius` hops of these nodes")
+    radius: int = Field(1, ge=0, le=5, description="Hop radius around seed_keys")
+
+    @model_validator(mode="after")
+    def check_single_selection(self):
+        given = [name for name in ("node_filter", "node_keys", "seed_keys") if getattr(self, name) is not None]
+        if len(given) != 1:
+            raise ValueError("Select nodes with exactly one of node_filter, node_keys or seed_keys")
+        if self.label is not None and self.node_filter is None:
+            raise ValueError("label can only be combined with node_filter")
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "name": "alice_neighborhood",
+                "seed_keys": ["alice@example.com"],
+                "radius": 2
+            }
+        }
+
+class SubgraphResponse(GraphDatasetResponse):
+    node_count: int
+    relationship_count: int
+
+class DegreeDistribution(BaseModel):
+    min: int
+    max: int
+    mean: float
+    p50: int
+    p90: int
+    p99: int
+    histogram: Dict[str, int] = Field(..., description="Sampled node counts per power-of-two degree bucket")
+
+class GraphStatsResponse(BaseModel):
+    node_count: int
+    relationship_count: int
+    labels: Dict[str, int] = Field(..., description="Node counts for the labels found in the sample")
+    relationship_types: Dict[str, int]
+    property_coverage: Dict[str, float] = Field(..., description="Share of sampled nodes having each property")
+    degree: DegreeDistribution
+    sample_size: int
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "node_count": 1200,
+                "relationship_count": 5400,
+                "labels": {"Person": 1000, "Company": 200},
+                "relationship_types": {"KNOWS": 5000, "WORKS_AT": 400},
+                "property_coverage": {"_key": 1.0, "name": 1.0, "age": 0.62},
+                "degree": {"min": 0, "max": 85, "mean": 9.0, "p50": 7, "p90": 19, "p99": 52,
+                           "histogram": {"0": 12, "1": 40, "2-3": 120, "4-7": 300}},
+                "sample_size": 1000
+            }
+        }
+
+class GraphSchemaResponse(BaseModel):
+    constraints: List[Dict[str, Any]]
+    indexes: List[Dict[str, Any]]
+
 class NodeCreate(BaseModel):
     label: str
     properties: Dict[str, Any]
+    key: Optional[str] = Field(None, description="Stable node key; a UUID is assigned if omitted")
 
     class Config:
         json_schema_extra = {
             "example": {
                 "label": "Person",
+                "key": "alice",
                 "properties": {
                     "name": "Alice",
                     "age": 30
@@ -36,19 +110,74 @@ class NodeCreate(BaseModel):
         }
 
 class EdgeCreate(BaseModel):
-    from_node_id: int
-    to_node_id: int
+    from_node_id: Optional[int] = None
+    to_node_id: Optional[int] = None
+    from_key: Optional[str] = None
+    to_key: Optional[str] = None
     type: str
     properties: Dict[str, Any] = {}
 
+    @model_validator(mode="after")
+    def check_endpoints(self):
+        if self.from_key is None and self.from_node_id is None:
+            raise ValueError("Either from_key or from_node_id is required")
+        if self.to_key is None and self.to_node_id is None:
+            raise ValueError("Either to_key or to_node_id is required")
+        return self
+
+    @property
+    def from_ref(self):
+        return self.from_key if self.from_key is not None else self.from_node_id
+
+    @property
+    def to_ref(self):
+        return self.to_key if self.to_key is not None else self.to_node_id
+
     class Config:
         json_schema_extra = {
             "example": {
-                "from_node_id": 1,
-                "to_node_id": 2,
+                "from_key": "alice",
+                "to_key": "bob",
                 "type": "FOLLOWS",
                 "properties": {
                     "since": "2024-01-01"
                 }
             }
         }
+
+class KeyedEdge(BaseModel):
+    from_key: str
+    to_key: str
+    type: str
+    properties: Dict[str, Any] = {}
+
+class EdgeBatchCreate(BaseModel):
+    edges: List[KeyedEdge]
+    key_property: str = Field("_key", description="Node property the keys refer to, e.g. a declared key property")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "key_property": "email",
+                "edges": [
+                    {"from_key": "alice@example.com", "to_key": "bob@example.com", "type": "FOLLOWS"}
+                ]
+            }
+        }
+
+class AnalyticsRequest(BaseModel):
+    write_property: Optional[str] = Field(None, description="If set, write each node's score back as this property")
+    limit: int = Field(100, description="Number of top-scoring nodes to return")
+    source_node_id: Optional[int] = Field(None, description="Start node for bfs")
+    directed: bool = False
+    damping: float = 0.85
+    max_iterations: int = 100
+    tolerance: float = 1e-6
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "write_property": "pagerank",
+                "limit": 10
+            }
+        }
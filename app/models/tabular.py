@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, ForeignKey, DateTime
+from sqlalchemy import Column, String, ForeignKey, DateTime, Integer
 from app.core.database import Base
 from datetime import datetime
 import uuid
@@ -12,3 +12,5 @@ class TabularDataset(Base):
     # The physical table name in Postgres will be derived, e.g., "dataset_{id}"
     # We store the user-facing name here.
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped on every write through the API; keys cached /query results of the session
+    write_version = Column(Integer, nullable=False, default=0, server_default="0")
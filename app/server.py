@@ -0,0 +1,159 @@
+"""
+Production server: gunicorn managing uvicorn worker processes.
+
+    python -m app.server
+
+Runs WEB_CONCURRENCY workers (one per CPU available to the container by
+default), so a CPU-bound export or serialization only stalls its own worker.
+The application is imported once in the master, which also creates missing
+tables and columns before forking, so workers never race on DDL; every worker
+then opens its own SQL connection pools and Neo4j driver. On SIGTERM workers
+stop accepting connections, let in-flight requests and streamed responses
+finish for up to SERVER_DRAIN_SECONDS and then run the lifespan shutdown.
+For development, ``uvicorn app.main:app --reload`` is still the simplest; it
+creates the tables in its lifespan.
+
+Caches live in each worker's memory, and a write clears them only in the
+worker that served it. The others catch up as follows:
+
+- projection_cache (in-memory analytics): entries are tied to the dataset's
+  write_version and expire after PROJECTION_CACHE_TTL_SECONDS.
+- result_cache (/query results): keyed on the session's write_versions, so a
+  write anywhere misses it; entries expire after QUERY_CACHE_TTL_SECONDS.
+- stats_cache (graph statistics): tied to the dataset's write_version and
+  expires after GRAPH_STATS_CACHE_TTL_SECONDS.
+- ownership_cache (authorization): used for reads only and trusted for
+  OWNERSHIP_CACHE_TTL_SECONDS; mutating requests always check the database.
+
+Graph writes made directly in Neo4j, outside the API, do not bump
+write_version and are seen once the TTLs run out.
+"""
+import asyncio
+import math
+import os
+import shutil
+from typing import Optional
+
+from gunicorn.app.base import BaseApplication
+from uvicorn_worker import UvicornWorker
+
+from app.core.config import settings
+
+# Time left after draining for the lifespan shutdown before gunicorn kills the worker
+LIFESPAN_SHUTDOWN_SECONDS = 5
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """CPUs allowed by the container's CFS quota (cgroup v2, then v1), if one is set."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def worker_count() -> int:
+    if settings.WEB_CONCURRENCY:
+        return settings.WEB_CONCURRENCY
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(cpus, 1)
+
+
+class DrainingUvicornWorker(UvicornWorker):
+    """Uvicorn worker that bounds the wait for in-flight requests, so the lifespan shutdown still runs."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = settings.SERVER_DRAIN_SECONDS
+
+
+def on_starting(server) -> None:
+    """Create the schema once in the master; workers skip it in their lifespan."""
+    from app.core import database
+
+    async def init_schema():
+        await database.init_db()
+        # Connections opened on this short-lived loop must not reach the workers
+        await database.close_db()
+
+    asyncio.run(init_schema())
+    settings.DB_INIT_ON_STARTUP = False
+
+
+def post_fork(server, worker) -> None:
+    from app.core import database, neo4j_db
+
+    database.reset_after_fork()
+    neo4j_db.reset_after_fork()
+
+
+def child_exit(server, worker) -> None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+
+        return app
+
+
+def options(workers: int) -> dict:
+    return {
+        "bind": settings.SERVER_BIND,
+        "workers": workers,
+        "worker_class": DrainingUvicornWorker,
+        "preload_app": True,
+        "graceful_timeout": settings.SERVER_DRAIN_SECONDS + LIFESPAN_SHUTDOWN_SECONDS,
+        "timeout": settings.SERVER_WORKER_TIMEOUT_SECONDS,
+        "on_starting": on_starting,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+        "accesslog": "-",
+    }
+
+
+def prepare_metrics_dir(workers: int) -> None:
+    """
+    Share metric samples between workers. Must run before prometheus_client is
+    imported, which happens when the application is preloaded; samples of a
+    previous run are removed.
+    """
+    if workers < 2:
+        return
+    directory = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.PROMETHEUS_MULTIPROC_DIR)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def main() -> None:
+    workers = worker_count()
+    prepare_metrics_dir(workers)
+    Server(options(workers)).run()
+
+
+if __name__ == "__main__":
+    main()
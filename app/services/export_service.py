@@ -3,7 +3,6 @@ import json
 import io
 import zipfile
 from typing import List, Dict, Any, Union
-import networkx as nx
 from app.services.tabular_service import TabularService
 from app.services.graph_service import GraphService
 
@@ -29,6 +28,9 @@ class ExportService:
 
     @staticmethod
     def graph_to_graphml(nodes: List[Dict], edges: List[Dict]) -> str:
+        # networkx is slow to import and only needed here
+        import networkx as nx
+
         G = nx.MultiDiGraph()
         
         for node in nodes:
@@ -0,0 +1,90 @@
+"""
+Joins between a SQL result and a Cypher result of the same session.
+
+Both statements run concurrently and are rolled back afterwards. This is a
+bounded in-memory join, not a streaming one: both results are fetched in
+full and loaded into DataFrames, and pandas' vectorized hash join on the
+declared key columns runs off the event loop. Only the joined rows are
+streamed. FEDERATED_MAX_INPUT_ROWS bounds each side; a larger input raises
+TooManyRows instead of being joined partially.
+"""
+import asyncio
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Tuple
+
+from app.core.config import settings
+from app.services.query_service import QueryService
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+JOIN_TYPES = ("inner", "left", "right", "outer")
+SUFFIXES = ("_sql", "_graph")
+
+
+def hash_join(
+    sql_columns: List[str],
+    sql_rows: List[tuple],
+    graph_columns: List[str],
+    graph_rows: List[tuple],
+    sql_key: str,
+    graph_key: str,
+    how: str,
+) -> "pd.DataFrame":
+    import pandas as pd
+
+    # Nullable dtypes keep integer columns integral when an outer join leaves gaps
+    left = pd.DataFrame.from_records(sql_rows, columns=sql_columns).convert_dtypes()
+    right = pd.DataFrame.from_records(graph_rows, columns=graph_columns).convert_dtypes()
+    if sql_key == graph_key:
+        return left.merge(right, how=how, on=sql_key, suffixes=SUFFIXES)
+    return left.merge(right, how=how, left_on=sql_key, right_on=graph_key, suffixes=SUFFIXES)
+
+
+async def frame_rows(frame: "pd.DataFrame") -> AsyncIterator[Dict[str, Any]]:
+    """Rows of ``frame`` as dicts with missing values as None, converted one batch at a time."""
+    columns = [str(column) for column in frame.columns]
+    batch_size = settings.QUERY_STREAM_FETCH_SIZE
+    for start in range(0, len(frame), batch_size):
+        batch = frame.iloc[start:start + batch_size].astype(object)
+        batch = batch.where(batch.notna(), None)
+        for values in batch.itertuples(index=False, name=None):
+            yield dict(zip(columns, values))
+        # Let other requests run between batches of a large join
+        await asyncio.sleep(0)
+
+
+async def federated_join(
+    service: QueryService,
+    sql: str,
+    sql_params: Dict[str, Any],
+    cypher: str,
+    cypher_params: Dict[str, Any],
+    sql_key: str,
+    graph_key: str,
+    how: str,
+    timeout: float,
+) -> Tuple[List[str], AsyncIterator[Dict[str, Any]]]:
+    """
+    Run both statements, join them on ``sql_key`` = ``graph_key`` and return
+    the joined columns with an iterator over the rows. Raises TooManyRows for
+    oversized inputs and ValueError for bad keys and incompatible key types.
+    """
+    if how not in JOIN_TYPES:
+        raise ValueError(f"Invalid join type '{how}'. Must be one of {', '.join(JOIN_TYPES)}.")
+    limit = settings.FEDERATED_MAX_INPUT_ROWS
+    sql_task = asyncio.ensure_future(service.fetch_sql_records(sql, sql_params, limit, timeout))
+    graph_task = asyncio.ensure_future(service.fetch_cypher_records(cypher, cypher_params, limit, timeout))
+    try:
+        (sql_columns, sql_rows), (graph_columns, graph_rows) = await asyncio.gather(sql_task, graph_task)
+    except BaseException:
+        for task in (sql_task, graph_task):
+            task.cancel()
+        await asyncio.gather(sql_task, graph_task, return_exceptions=True)
+        raise
+
+    if sql_key not in sql_columns:
+        raise ValueError(f"Join key '{sql_key}' is not a column of the SQL result")
+    if graph_key not in graph_columns:
+        raise ValueError(f"Join key '{graph_key}' is not a column of the Cypher result")
+    joined = await asyncio.to_thread(hash_join, sql_columns, sql_rows, graph_columns, graph_rows, sql_key, graph_key, how)
+    return [str(column) for column in joined.columns], frame_rows(joined)
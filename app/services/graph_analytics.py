@@ -0,0 +1,398 @@
+"""
+In-process graph analytics on a compact CSR projection of a graph dataset.
+
+The projection keeps only topology: a sorted array of Neo4j node ids (the
+position of an id is its dense int32 index) plus a CSR adjacency of
+outgoing edges. All algorithms are vectorized over these arrays, so a
+10M-edge graph costs roughly 12 bytes per edge instead of the dict-of-dicts
+overhead of a networkx graph.
+
+Building projections and running algorithms is CPU-bound and happens in a
+worker thread (numpy releases the GIL in most kernels), so the event loop
+keeps serving other requests meanwhile.
+"""
+import asyncio
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.graph_service import GraphService
+from app.services.projection_cache import projection_cache
+
+ALGORITHMS = ("pagerank", "connected_components", "bfs", "degree_centrality", "triangle_count")
+
+
+def _expand_ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenate ``arange(s, s + l)`` for every (s, l) pair without a Python loop."""
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    before = np.cumsum(lengths) - lengths
+    return np.repeat(starts - before, lengths) + np.arange(total, dtype=np.int64)
+
+
+def _sorted_unique(values: np.ndarray) -> np.ndarray:
+    """Sort-based unique; much faster than np.unique for large integer arrays."""
+    values = np.sort(values)
+    if values.size:
+        values = values[np.concatenate(([True], values[1:] != values[:-1]))]
+    return values
+
+
+def _build_indptr(sources: np.ndarray, node_count: int) -> np.ndarray:
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=node_count), out=indptr[1:])
+    return indptr
+
+
+class GraphProjection:
+    """
+    Read-only CSR adjacency of a graph dataset.
+
+    node_ids: sorted int64 Neo4j ids; index i is the dense id of node_ids[i].
+    indptr:   int64 offsets of length node_count + 1.
+    indices:  int32 dense targets of outgoing edges, grouped by source.
+    """
+
+    def __init__(self, node_ids: np.ndarray, indptr: np.ndarray, indices: np.ndarray):
+        self.node_ids = node_ids
+        self.indptr = indptr
+        self.indices = indices
+        self._undirected: Optional["GraphProjection"] = None
+
+    @classmethod
+    def from_edges(cls, node_ids, src_ids, dst_ids) -> "GraphProjection":
+        """Build a projection from Neo4j node ids and edge endpoint ids."""
+        node_ids = _sorted_unique(np.asarray(node_ids, dtype=np.int64))
+        src = np.asarray(src_ids, dtype=np.int64)
+        dst = np.asarray(dst_ids, dtype=np.int64)
+        n = len(node_ids)
+
+        # Map ids to dense indexes; drop edges whose endpoints are outside the node set
+        src_idx = np.searchsorted(node_ids, src)
+        dst_idx = np.searchsorted(node_ids, dst)
+        if n:
+            valid = (src_idx < n) & (dst_idx < n)
+            valid[valid] &= (node_ids[src_idx[valid]] == src[valid]) & (node_ids[dst_idx[valid]] == dst[valid])
+            src_idx, dst_idx = src_idx[valid], dst_idx[valid]
+        else:
+            src_idx, dst_idx = src_idx[:0], dst_idx[:0]
+
+        order = np.argsort(src_idx, kind="stable")
+        indices = dst_idx[order].astype(np.int32)
+        return cls(node_ids, _build_indptr(src_idx, n), indices)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    @property
+    def nbytes(self) -> int:
+        size = self.node_ids.nbytes + self.indptr.nbytes + self.indices.nbytes
+        if self._undirected is not None:
+            size += self._undirected.indptr.nbytes + self._undirected.indices.nbytes
+        return size
+
+    def index_of(self, node_ids) -> np.ndarray:
+        """Dense indexes for Neo4j ids; -1 where the id is not in the projection."""
+        ids = np.atleast_1d(np.asarray(node_ids, dtype=np.int64))
+        pos = np.searchsorted(self.node_ids, ids)
+        found = pos < self.node_count
+        found[found] &= self.node_ids[pos[found]] == ids[found]
+        return np.where(found, pos, -1).astype(np.int32)
+
+    def sources(self) -> np.ndarray:
+        """Dense source index of every edge, aligned with ``indices``."""
+        return np.repeat(np.arange(self.node_count, dtype=np.int32), np.diff(self.indptr))
+
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def in_degree(self) -> np.ndarray:
+        return np.bincount(self.indices, minlength=self.node_count)
+
+    def undirected(self) -> "GraphProjection":
+        """Symmetric, de-duplicated adjacency without self-loops (built once, then reused)."""
+        if self._undirected is None:
+            n = np.int64(self.node_count)
+            src = self.sources().astype(np.int64)
+            dst = self.indices.astype(np.int64)
+            keep = src != dst
+            src, dst = src[keep], dst[keep]
+            keys = _sorted_unique(np.concatenate([src * n + dst, dst * n + src]))
+            und_src = keys // n if n else keys
+            und_dst = (keys % n).astype(np.int32) if n else keys.astype(np.int32)
+            self._undirected = GraphProjection(self.node_ids, _build_indptr(und_src, self.node_count), und_dst)
+        return self._undirected
+
+
+def pagerank(
+    projection: GraphProjection,
+    damping: float = 0.85,
+    max_iterations: int = 100,
+    tolerance: float = 1e-6,
+) -> np.ndarray:
+    """Power-iteration PageRank; dangling nodes redistribute their rank uniformly."""
+    n = projection.node_count
+    if n == 0:
+        return np.empty(0, dtype=np.float64)
+    out_degree = projection.out_degree().astype(np.float64)
+    dangling = out_degree == 0
+    inv_degree = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    sources = projection.sources()
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iterations):
+        contrib = (rank * inv_degree)[sources]
+        incoming = np.bincount(projection.indices, weights=contrib, minlength=n)
+        new_rank = damping * (incoming + rank[dangling].sum() / n) + (1.0 - damping) / n
+        delta = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if delta < n * tolerance:
+            break
+    return rank
+
+
+def connected_components(projection: GraphProjection) -> np.ndarray:
+    """
+    Weakly connected components via min-label propagation with pointer jumping.
+    Each node is labelled with the smallest dense index in its component.
+    """
+    und = projection.undirected()
+    n = und.node_count
+    labels = np.arange(n, dtype=np.int32)
+    if und.edge_count == 0:
+        return labels
+    has_edges = np.diff(und.indptr) > 0
+    starts = und.indptr[:-1][has_edges]
+    while True:
+        neighbor_min = np.minimum.reduceat(labels[und.indices], starts)
+        new_labels = labels.copy()
+        new_labels[has_edges] = np.minimum(labels[has_edges], neighbor_min)
+        # Pointer jumping: follow labels to their own labels until stable
+        while True:
+            jumped = new_labels[new_labels]
+            if np.array_equal(jumped, new_labels):
+                break
+            new_labels = jumped
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
+
+
+def bfs_levels(projection: GraphProjection, source: int, directed: bool = False) -> np.ndarray:
+    """Hop distance from the dense index ``source``; -1 for unreachable nodes."""
+    graph = projection if directed else projection.undirected()
+    levels = np.full(graph.node_count, -1, dtype=np.int32)
+    levels[source] = 0
+    frontier = np.array([source], dtype=np.int64)
+    depth = 0
+    while frontier.size:
+        depth += 1
+        starts = graph.indptr[frontier]
+        lengths = graph.indptr[frontier + 1] - starts
+        neighbors = graph.indices[_expand_ranges(starts, lengths)]
+        neighbors = _sorted_unique(neighbors[levels[neighbors] == -1])
+        levels[neighbors] = depth
+        frontier = neighbors.astype(np.int64)
+    return levels
+
+
+def shortest_path(projection: GraphProjection, source: int, target: int, directed: bool = False) -> Optional[np.ndarray]:
+    """Dense indexes along a minimum-hop path from source to target, or None."""
+    graph = projection if directed else projection.undirected()
+    parents = np.full(graph.node_count, -1, dtype=np.int64)
+    parents[source] = source
+    frontier = np.array([source], dtype=np.int64)
+    while frontier.size and parents[target] < 0:
+        starts = graph.indptr[frontier]
+        lengths = graph.indptr[frontier + 1] - starts
+        neighbors = graph.indices[_expand_ranges(starts, lengths)].astype(np.int64)
+        origins = np.repeat(frontier, lengths)
+        fresh = parents[neighbors] < 0
+        neighbors, origins = neighbors[fresh], origins[fresh]
+        # Any parent on the previous level yields a shortest path
+        parents[neighbors] = origins
+        frontier = _sorted_unique(neighbors)
+    if parents[target] < 0:
+        return None
+    path = [target]
+    while path[-1] != source:
+        path.append(int(parents[path[-1]]))
+    return np.array(path[::-1], dtype=np.int64)
+
+
+def degree_centrality(projection: GraphProjection) -> np.ndarray:
+    """(in + out degree) / (n - 1), matching networkx for directed graphs."""
+    n = projection.node_count
+    degree = projection.out_degree() + projection.in_degree()
+    return degree / max(n - 1, 1)
+
+
+def triangle_count(projection: GraphProjection, chunk_wedges: int = 4_000_000) -> np.ndarray:
+    """
+    Number of triangles through each node, treating edges as undirected.
+
+    Edges are oriented from lower to higher degree rank so each triangle is
+    found exactly once; wedges are generated and checked in bounded chunks.
+    """
+    und = projection.undirected()
+    n = und.node_count
+    counts = np.zeros(n, dtype=np.int64)
+    if und.edge_count == 0:
+        return counts
+
+    degree = np.diff(und.indptr)
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.lexsort((np.arange(n), degree))] = np.arange(n)
+
+    src = rank[und.sources()]
+    dst = rank[und.indices]
+    keep = src < dst
+    keys = np.sort(src[keep] * n + dst[keep])
+    fwd_src = keys // n
+    fwd_dst = keys % n
+    fwd_ptr = _build_indptr(fwd_src, n)
+
+    edge_pos = np.arange(len(keys), dtype=np.int64)
+    tail = fwd_ptr[fwd_src + 1] - edge_pos - 1
+    cumulative = np.cumsum(tail)
+    start = 0
+    while start < len(keys):
+        limit = (cumulative[start - 1] if start else 0) + chunk_wedges
+        stop = max(int(np.searchsorted(cumulative, limit, side="right")), start + 1)
+        first = np.repeat(edge_pos[start:stop], tail[start:stop])
+        second = _expand_ranges(edge_pos[start:stop] + 1, tail[start:stop])
+        closing = fwd_dst[first] * n + fwd_dst[second]
+        pos = np.minimum(np.searchsorted(keys, closing), len(keys) - 1)
+        hit = keys[pos] == closing
+        corners = np.concatenate([fwd_src[first[hit]], fwd_dst[first[hit]], fwd_dst[second[hit]]])
+        counts += np.bincount(corners, minlength=n)
+        start = stop
+
+    return counts[rank]
+
+
+class GraphAnalyticsService:
+    def __init__(self, driver):
+        self.graph = GraphService(driver)
+
+    async def load_projection(self, dataset_id: str, version: Optional[int] = None) -> GraphProjection:
+        """Projection of the dataset at ``version`` (its write_version), scanning Neo4j only on a cache miss."""
+        return await projection_cache.get_or_load(dataset_id, lambda: self._scan_projection(dataset_id), version)
+
+    async def _scan_projection(self, dataset_id: str) -> GraphProjection:
+        node_ids, src_ids, dst_ids = await self.graph.get_topology(dataset_id)
+        return await asyncio.to_thread(
+            GraphProjection.from_edges,
+            np.frombuffer(node_ids, dtype=np.int64),
+            np.frombuffer(src_ids, dtype=np.int64),
+            np.frombuffer(dst_ids, dtype=np.int64),
+        )
+
+    async def shortest_path(
+        self, dataset_id: str, from_node_id: int, to_node_id: int, directed: bool = False, version: Optional[int] = None
+    ):
+        """Minimum-hop path computed on the cached projection."""
+        projection = await self.load_projection(dataset_id, version)
+        source, target = projection.index_of([from_node_id, to_node_id]).tolist()
+        if source < 0 or target < 0:
+            return None
+        path = await asyncio.to_thread(shortest_path, projection, source, target, directed)
+        if path is None:
+            return None
+        return {"length": len(path) - 1, "node_ids": projection.node_ids[path].tolist()}
+
+    def compute(self, projection: GraphProjection, algorithm: str, options: Dict[str, Any]) -> np.ndarray:
+        if algorithm == "pagerank":
+            return pagerank(
+                projection,
+                damping=options.get("damping", 0.85),
+                max_iterations=options.get("max_iterations", 100),
+                tolerance=options.get("tolerance", 1e-6),
+            )
+        if algorithm == "connected_components":
+            return connected_components(projection)
+        if algorithm == "bfs":
+            source_id = options.get("source_node_id")
+            if source_id is None:
+                raise ValueError("bfs requires source_node_id")
+            source = int(projection.index_of(source_id)[0])
+            if source < 0:
+                raise ValueError(f"Node {source_id} is not part of this dataset")
+            return bfs_levels(projection, source, directed=options.get("directed", False))
+        if algorithm == "degree_centrality":
+            return degree_centrality(projection)
+        if algorithm == "triangle_count":
+            return triangle_count(projection)
+        raise ValueError(f"Unknown algorithm '{algorithm}'. Must be one of: {', '.join(ALGORITHMS)}")
+
+    async def run(
+        self,
+        dataset_id: str,
+        algorithm: str,
+        options: Dict[str, Any],
+        write_property: Optional[str] = None,
+        limit: int = 100,
+        version: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm '{algorithm}'. Must be one of: {', '.join(ALGORITHMS)}")
+        if algorithm == "bfs" and options.get("source_node_id") is None:
+            raise ValueError("bfs requires source_node_id")
+        projection = await self.load_projection(dataset_id, version)
+        scores = await asyncio.to_thread(self.compute, projection, algorithm, options)
+
+        written = 0
+        if write_property:
+            written = await self.graph.write_node_property(
+                dataset_id,
+                write_property,
+                projection.node_ids,
+                scores,
+                batch_size=settings.ANALYTICS_WRITE_BATCH_SIZE,
+            )
+
+        summary, results = await asyncio.to_thread(
+            lambda: (self._summarize(algorithm, scores), self._top_results(algorithm, projection, scores, limit))
+        )
+        return {
+            "algorithm": algorithm,
+            "node_count": projection.node_count,
+            "edge_count": projection.edge_count,
+            "summary": summary,
+            "results": results,
+            "written": written,
+        }
+
+    def _summarize(self, algorithm: str, scores: np.ndarray) -> Dict[str, Any]:
+        if scores.size == 0:
+            return {}
+        if algorithm == "connected_components":
+            sizes = np.bincount(scores)
+            sizes = sizes[sizes > 0]
+            return {"component_count": int(sizes.size), "largest_component": int(sizes.max())}
+        if algorithm == "bfs":
+            reached = scores[scores >= 0]
+            return {"reached": int(reached.size), "max_level": int(reached.max())}
+        if algorithm == "triangle_count":
+            return {"triangles": int(scores.sum() // 3)}
+        return {"min": float(scores.min()), "max": float(scores.max()), "mean": float(scores.mean())}
+
+    def _top_results(self, algorithm: str, projection: GraphProjection, scores: np.ndarray, limit: int):
+        if algorithm == "bfs":
+            reached = np.flatnonzero(scores >= 0)
+            order = reached[np.argsort(scores[reached], kind="stable")][:limit]
+        elif algorithm == "connected_components":
+            order = np.arange(min(limit, scores.size))
+        else:
+            order = np.argsort(-scores, kind="stable")[:limit]
+        return [
+            {"node_id": node_id, "value": value}
+            for node_id, value in zip(projection.node_ids[order].tolist(), scores[order].tolist())
+        ]
@@ -1,94 +1,713 @@
-from typing import List, Dict, Any, Optional
-from neo4j import AsyncDriver, AsyncSession
+import re
+import time
+import uuid
+from array import array
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from neo4j import AsyncDriver, AsyncManagedTransaction, READ_ACCESS, WRITE_ACCESS, unit_of_work
 
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import timed_calls
+from app.core.query_stats import query_stats
+from app.services.projection_cache import projection_cache
+
+PROPERTY_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Stable, uniquely constrained node key assigned on create (client-provided or a UUID)
+NODE_KEY_PROPERTY = "_key"
+
+# Nodes are addressed by stable key (str) or by Neo4j internal id (int, deprecated)
+NodeRef = Union[int, str]
+
+# Storage modes for dataset isolation:
+#   "label":    every dataset has its own Graph_<uuid> label baked into the query text
+#   "property": all datasets share one label and are told apart by an indexed
+#               dataset_id property, so query text (and the Neo4j plan cache) is shared
+STORAGE_MODES = ("label", "property")
+SHARED_NODE_LABEL = "GraphNode"
+DATASET_ID_PROPERTY = "dataset_id"
+
+# Dataset statistics are approximate overviews; serve repeated requests from memory
+stats_cache = TTLCache(settings.GRAPH_STATS_CACHE_TTL_SECONDS)
+
+
+def _quote_name(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def _degree_summary(degrees: List[int]) -> Dict[str, Any]:
+    """Percentiles and a power-of-two histogram (``"0"``, ``"1"``, ``"2-3"``, ...) of sampled degrees."""
+    if not degrees:
+        return {"min": 0, "max": 0, "mean": 0.0, "p50": 0, "p90": 0, "p99": 0, "histogram": {}}
+    degrees = sorted(degrees)
+
+    def percentile(q: float) -> int:
+        return degrees[min(len(degrees) - 1, int(q * len(degrees)))]
+
+    histogram: Dict[str, int] = {}
+    for degree in degrees:
+        if degree < 2:
+            bucket = str(degree)
+        else:
+            low = 1 << (degree.bit_length() - 1)
+            bucket = f"{low}-{2 * low - 1}"
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+    return {
+        "min": degrees[0],
+        "max": degrees[-1],
+        "mean": sum(degrees) / len(degrees),
+        "p50": percentile(0.5),
+        "p90": percentile(0.9),
+        "p99": percentile(0.99),
+        "histogram": histogram,
+    }
+
+@timed_calls
 class GraphService:
-    def __init__(self, driver: AsyncDriver):
+    def __init__(self, driver: AsyncDriver, storage_mode: Optional[str] = None):
         self.driver = driver
+        self.storage_mode = storage_mode or settings.GRAPH_STORAGE_MODE
+        if self.storage_mode not in STORAGE_MODES:
+            raise ValueError(f"Unknown graph storage mode '{self.storage_mode}'")
+
+    def _session(self, access_mode: str = WRITE_ACCESS):
+        return self.driver.session(database=settings.NEO4J_DATABASE, default_access_mode=access_mode)
+
+    async def _execute(self, access_mode: str, work: Callable[[AsyncManagedTransaction], Awaitable[Any]]):
+        """
+        Run ``work`` as a managed transaction function. The driver retries it on
+        transient errors (deadlocks, leader changes) for up to
+        NEO4J_MAX_TRANSACTION_RETRY_TIME, so it must not have side effects
+        outside the transaction. Reads are routed to followers and read
+        replicas when the driver is connected through a neo4j:// URI.
+        """
+        work = unit_of_work(timeout=settings.NEO4J_TRANSACTION_TIMEOUT_SECONDS)(work)
+        async with self._session(access_mode) as session:
+            if access_mode == READ_ACCESS:
+                return await session.execute_read(work)
+            return await session.execute_write(work)
+
+    async def _run(self, access_mode: str, query: str, params: Optional[Dict[str, Any]], single: bool):
+        async def work(tx: AsyncManagedTransaction):
+            result = await tx.run(query, **(params or {}))
+            if single:
+                return await result.single()
+            return [record async for record in result]
+        started = time.perf_counter()
+        records = await self._execute(access_mode, work)
+        rows = (records is not None) if single else len(records)
+        query_stats.observe("cypher", query, time.perf_counter() - started, int(rows))
+        return records
+
+    async def _read(self, query: str, params: Optional[Dict[str, Any]] = None, single: bool = False):
+        """Run a read-only statement; returns its records, or the only record if ``single``."""
+        return await self._run(READ_ACCESS, query, params, single)
+
+    async def _write(self, query: str, params: Optional[Dict[str, Any]] = None, single: bool = False):
+        """Run a statement that writes; returns its records, or the only record if ``single``."""
+        return await self._run(WRITE_ACCESS, query, params, single)
 
     def _get_dataset_label(self, dataset_id: str) -> str:
         return f"Graph_{dataset_id.replace('-', '_')}"
 
-    async def create_node(self, dataset_id: str, label: str, properties: Dict[str, Any]):
-        dataset_label = self._get_dataset_label(dataset_id)
+    def _isolation_label(self, dataset_id: str) -> str:
+        """The label every node of the dataset carries in the current storage mode."""
+        if self.storage_mode == "property":
+            return SHARED_NODE_LABEL
+        return self._get_dataset_label(dataset_id)
+
+    def _node_pattern(self, var: str, dataset_id: str, label: Optional[str] = None, props: str = "", param: str = "dataset_id") -> str:
+        """
+        Node pattern restricted to the dataset, e.g. ``(n:Graph_x:Person {email: row.key})``.
+        In property mode the dataset is matched with the ``$<param>`` parameter
+        (``$dataset_id`` by default), so callers must always pass it with the query.
+        """
+        labels = f":{self._isolation_label(dataset_id)}" + (f":{label}" if label else "")
+        entries = [f"{DATASET_ID_PROPERTY}: ${param}"] if self.storage_mode == "property" else []
+        if props:
+            entries.append(props)
+        map_literal = f" {{{', '.join(entries)}}}" if entries else ""
+        return f"({var}{labels}{map_literal})"
+
+    def _schema_name(self, dataset_id: str, property_name: str, kind: str) -> str:
+        return f"{self._isolation_label(dataset_id)}_{property_name}_{kind}".lower()
+
+    async def create_schema(
+        self,
+        dataset_id: str,
+        key_properties: List[str],
+        indexed_properties: List[str],
+        text_indexed_properties: List[str],
+    ):
+        """
+        Create the node key constraint, uniqueness constraints for key properties
+        and range/text indexes for indexed properties on the dataset label. Idempotent.
+
+        In property mode all datasets share one label, so schema is shared too:
+        a uniqueness constraint would also bind datasets that never declared
+        it, and key properties are rejected. Range indexes lead with dataset_id;
+        text indexes are single-property and serve every dataset's nodes.
+        """
+        for prop in [*key_properties, *indexed_properties, *text_indexed_properties]:
+            if not PROPERTY_NAME_PATTERN.match(prop):
+                raise ValueError(f"Invalid property name '{prop}'")
+        if key_properties and self.storage_mode == "property":
+            raise ValueError(
+                "key_properties are not supported in property storage mode, where a uniqueness "
+                "constraint would apply to every dataset; declare them as indexed_properties."
+            )
+
+        label = self._isolation_label(dataset_id)
+        def unique_on(prop_expr: str) -> str:
+            if self.storage_mode == "property":
+                return f"(n.{DATASET_ID_PROPERTY}, {prop_expr})"
+            return prop_expr
+
+        prefix = f"n.{DATASET_ID_PROPERTY}, " if self.storage_mode == "property" else ""
+        statements = []
+        if self.storage_mode == "property":
+            statements.append(
+                f"CREATE RANGE INDEX {self._schema_name(dataset_id, DATASET_ID_PROPERTY, 'range')} IF NOT EXISTS "
+                f"FOR (n:{label}) ON (n.{DATASET_ID_PROPERTY})"
+            )
+        statements.append(
+            f"CREATE CONSTRAINT {self._schema_name(dataset_id, NODE_KEY_PROPERTY, 'unique')} IF NOT EXISTS "
+            f"FOR (n:{label}) REQUIRE {unique_on(f'n.{NODE_KEY_PROPERTY}')} IS UNIQUE"
+        )
+        for prop in key_properties:
+            # The constraint's backing range index also serves lookups
+            statements.append(
+                f"CREATE CONSTRAINT {self._schema_name(dataset_id, prop, 'unique')} IF NOT EXISTS "
+                f"FOR (n:{label}) REQUIRE {unique_on(f'n.`{prop}`')} IS UNIQUE"
+            )
+        for prop in indexed_properties:
+            if prop in key_properties:
+                continue
+            statements.append(
+                f"CREATE RANGE INDEX {self._schema_name(dataset_id, prop, 'range')} IF NOT EXISTS "
+                f"FOR (n:{label}) ON ({prefix}n.`{prop}`)"
+            )
+        for prop in text_indexed_properties:
+            # Text indexes are single-property only
+            statements.append(
+                f"CREATE TEXT INDEX {self._schema_name(dataset_id, prop, 'text')} IF NOT EXISTS "
+                f"FOR (n:{label}) ON (n.`{prop}`)"
+            )
+
+        # Schema commands cannot share a transaction with each other
+        for statement in statements:
+            await self._write(statement)
+
+    async def get_schema(self, dataset_id: str) -> Dict[str, Any]:
+        """
+        Constraints and indexes on the dataset label, with index state and population progress.
+        In property mode these are the shared indexes of the common label.
+        """
+        params = {"label": self._isolation_label(dataset_id)}
+        constraints = await self._read(
+            "SHOW CONSTRAINTS YIELD name, type, labelsOrTypes, properties "
+            "WHERE $label IN labelsOrTypes "
+            "RETURN name, type, properties",
+            params
+        )
+        indexes = await self._read(
+            "SHOW INDEXES YIELD name, type, state, populationPercent, labelsOrTypes, properties, owningConstraint "
+            "WHERE $label IN labelsOrTypes "
+            "RETURN name, type, state, populationPercent, properties, owningConstraint",
+            params
+        )
+        return {
+            "constraints": [record.data() for record in constraints],
+            "indexes": [record.data() for record in indexes],
+        }
+
+    async def drop_schema(self, dataset_id: str):
+        """
+        Drop every constraint and index defined on the dataset label. In property
+        mode, where schema is shared, drop the indexes of properties that no
+        remaining node carries; a dataset that declared one of them but has no
+        nodes yet loses it too and can declare it again.
+        """
+        if self.storage_mode == "property":
+            await self._drop_unused_shared_schema(dataset_id)
+            return
+        schema = await self.get_schema(dataset_id)
+        # Dropping a constraint also drops the index it owns
+        for constraint in schema["constraints"]:
+            await self._write(f"DROP CONSTRAINT `{constraint['name']}` IF EXISTS")
+        for index in schema["indexes"]:
+            if index.get("owningConstraint"):
+                continue
+            await self._write(f"DROP INDEX `{index['name']}` IF EXISTS")
+
+    async def _drop_unused_shared_schema(self, dataset_id: str):
+        schema = await self.get_schema(dataset_id)
+        candidates = [("CONSTRAINT", c["name"], c["properties"]) for c in schema["constraints"]]
+        candidates += [("INDEX", i["name"], i["properties"]) for i in schema["indexes"] if not i.get("owningConstraint")]
+        for kind, name, properties in candidates:
+            properties = [p for p in properties or [] if p != DATASET_ID_PROPERTY]
+            # The dataset_id index and the node key constraint serve every dataset
+            if len(properties) != 1 or properties[0] == NODE_KEY_PROPERTY:
+                continue
+            in_use = await self._read(
+                f"MATCH (n:{SHARED_NODE_LABEL}) "
+                f"WHERE n.{DATASET_ID_PROPERTY} IS NOT NULL AND n.{_quote_name(properties[0])} IS NOT NULL "
+                "RETURN 1 LIMIT 1"
+            )
+            if not in_use:
+                await self._write(f"DROP {kind} {_quote_name(name)} IF EXISTS")
+
+    async def delete_dataset(self, dataset_id: str, batch_size: int = 10000):
+        """Remove all nodes and relationships of the dataset, then its schema."""
+        query = (
+            f"MATCH {self._node_pattern('n', dataset_id)} "
+            "CALL { WITH n DETACH DELETE n } "
+            f"IN TRANSACTIONS OF {int(batch_size)} ROWS"
+        )
+        # CALL {} IN TRANSACTIONS requires an auto-commit transaction
+        async with self._session() as session:
+            result = await session.run(query, dataset_id=dataset_id)
+            await result.consume()
+        await self.drop_schema(dataset_id)
+        projection_cache.invalidate(dataset_id)
+        stats_cache.invalidate(dataset_id)
+
+    async def _declared_schema(self, dataset_id: str) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Key, range-indexed and text-indexed properties declared for the dataset,
+        as passed to create_schema. Empty in property mode, where the composite
+        indexes on the shared label cannot be attributed to one dataset.
+        """
+        key_properties, indexed_properties, text_indexed_properties = [], [], []
+        if self.storage_mode == "label":
+            schema = await self.get_schema(dataset_id)
+            for constraint in schema["constraints"]:
+                key_properties.extend(p for p in constraint["properties"] if p != NODE_KEY_PROPERTY)
+            for index in schema["indexes"]:
+                if index.get("owningConstraint") or index["type"] not in ("RANGE", "TEXT"):
+                    continue
+                target_list = text_indexed_properties if index["type"] == "TEXT" else indexed_properties
+                target_list.extend(index["properties"])
+        return key_properties, indexed_properties, text_indexed_properties
+
+    async def backfill_node_keys(self, dataset_id: str, batch_size: int = 10000):
+        """
+        Give nodes created before stable keys existed a UUID ``_key`` and add the
+        node key constraint, so key lookups find them. Idempotent.
+        """
+        query = (
+            f"MATCH {self._node_pattern('n', dataset_id)} WHERE n.{NODE_KEY_PROPERTY} IS NULL "
+            f"CALL {{ WITH n SET n.{NODE_KEY_PROPERTY} = randomUUID() }} "
+            f"IN TRANSACTIONS OF {int(batch_size)} ROWS"
+        )
+        # CALL {} IN TRANSACTIONS requires an auto-commit transaction
+        async with self._session() as session:
+            result = await session.run(query, dataset_id=dataset_id)
+            await result.consume()
+        await self.create_schema(dataset_id, [], [], [])
+
+    async def migrate_storage(self, dataset_id: str, target_mode: str, batch_size: int = 10000):
+        """
+        Move a dataset from this service's storage mode to ``target_mode``.
+        Declared constraints and indexes are carried over when leaving label mode
+        (key properties become range indexes, see create_schema); shared indexes
+        cannot be attributed to a dataset, so only the node key
+        constraint is recreated when going back to label mode. Idempotent.
+        """
+        if target_mode not in STORAGE_MODES:
+            raise ValueError(f"Unknown graph storage mode '{target_mode}'")
+        if target_mode == self.storage_mode:
+            return
+        target = GraphService(self.driver, storage_mode=target_mode)
+
+        key_properties, indexed_properties, text_indexed_properties = await self._declared_schema(dataset_id)
+        if target_mode == "property":
+            # Shared-label schema cannot enforce per-dataset uniqueness; keep the lookups indexed
+            indexed_properties = [*key_properties, *indexed_properties]
+            key_properties = []
+        await target.create_schema(dataset_id, key_properties, indexed_properties, text_indexed_properties)
+
+        if target_mode == "property":
+            update = (
+                f"SET n:{SHARED_NODE_LABEL}, n.{DATASET_ID_PROPERTY} = $dataset_id, "
+                f"n.{NODE_KEY_PROPERTY} = coalesce(n.{NODE_KEY_PROPERTY}, randomUUID()) "
+                f"REMOVE n:{self._get_dataset_label(dataset_id)}"
+            )
+        else:
+            update = (
+                f"SET n:{self._get_dataset_label(dataset_id)}, "
+                f"n.{NODE_KEY_PROPERTY} = coalesce(n.{NODE_KEY_PROPERTY}, randomUUID()) "
+                f"REMOVE n:{SHARED_NODE_LABEL}, n.{DATASET_ID_PROPERTY}"
+            )
+        query = (
+            f"MATCH {self._node_pattern('n', dataset_id)} "
+            f"CALL {{ WITH n {update} }} "
+            f"IN TRANSACTIONS OF {int(batch_size)} ROWS"
+        )
+        async with self._session() as session:
+            result = await session.run(query, dataset_id=dataset_id)
+            await result.consume()
+
+        await self.drop_schema(dataset_id)
+        projection_cache.invalidate(dataset_id)
+        stats_cache.invalidate(dataset_id)
+
+    def _subgraph_selection(
+        self,
+        dataset_id: str,
+        node_filter: Optional[Dict[str, Any]] = None,
+        label: Optional[str] = None,
+        node_keys: Optional[List[str]] = None,
+        seed_keys: Optional[List[str]] = None,
+        radius: int = 1,
+    ) -> str:
+        """MATCH clause binding ``n`` to each selected node of the dataset exactly once."""
+        if seed_keys is not None:
+            return (
+                f"MATCH {self._node_pattern('s', dataset_id)} WHERE s.{NODE_KEY_PROPERTY} IN $seed_keys "
+                f"MATCH (s)-[*0..{int(radius)}]-{self._node_pattern('n', dataset_id)} "
+                "WITH DISTINCT n "
+            )
+        if node_keys is not None:
+            return f"MATCH {self._node_pattern('n', dataset_id)} WHERE n.{NODE_KEY_PROPERTY} IN $node_keys "
+        node_filter = node_filter or {}
+        for name in list(node_filter) + ([label] if label else []):
+            if not PROPERTY_NAME_PATTERN.match(name):
+                raise ValueError(f"Invalid name '{name}' in node filter")
+        props = ", ".join(f"`{name}`: $node_filter.`{name}`" for name in node_filter)
+        return f"MATCH {self._node_pattern('n', dataset_id, label, props)} "
+
+    async def extract_subgraph(
+        self,
+        dataset_id: str,
+        target_dataset_id: str,
+        node_filter: Optional[Dict[str, Any]] = None,
+        label: Optional[str] = None,
+        node_keys: Optional[List[str]] = None,
+        seed_keys: Optional[List[str]] = None,
+        radius: int = 1,
+        batch_size: int = 10000,
+    ) -> Dict[str, int]:
+        """
+        Copy the subgraph induced by the selected nodes into another dataset,
+        entirely inside Neo4j. Nodes are selected by property filter (and
+        optional label), by key list, or by seed keys expanded ``radius`` hops.
+
+        Cypher cannot set labels or relationship types from data, so nodes are
+        copied with one batched statement per distinct label set and
+        relationships with one per type. Copied nodes keep their ``_key``,
+        which is how relationships find their copied endpoints; only
+        relationships whose both endpoints were selected are copied.
+        """
+        selection = self._subgraph_selection(dataset_id, node_filter, label, node_keys, seed_keys, radius)
+        params = {
+            "dataset_id": dataset_id,
+            "target_dataset_id": target_dataset_id,
+            "node_filter": node_filter or {},
+            "node_keys": node_keys,
+            "seed_keys": seed_keys,
+        }
+        isolation_label = self._isolation_label(dataset_id)
+        await self.create_schema(target_dataset_id, *await self._declared_schema(dataset_id))
+
+        nodes_created = relationships_created = 0
+        # CALL {} IN TRANSACTIONS requires auto-commit transactions
+        async with self._session() as session:
+            result = await session.run(f"{selection}RETURN DISTINCT labels(n) AS labels", **params)
+            label_sets = {tuple(sorted(set(record["labels"]) - {isolation_label})) async for record in result}
+
+            target_node = self._node_pattern('m', target_dataset_id, param="target_dataset_id")
+            dataset_set = f", m.{DATASET_ID_PROPERTY} = $target_dataset_id" if self.storage_mode == "property" else ""
+            for label_set in sorted(label_sets):
+                extra_labels = "".join(f":{_quote_name(name)}" for name in label_set)
+                query = (
+                    f"{selection}"
+                    "WITH n WHERE size(labels(n)) = $label_count AND all(l IN $labels WHERE l IN labels(n)) "
+                    f"CALL {{ WITH n CREATE (m:{self._isolation_label(target_dataset_id)}{extra_labels}) "
+                    f"SET m = properties(n){dataset_set} }} "
+                    f"IN TRANSACTIONS OF {int(batch_size)} ROWS"
+                )
+                result = await session.run(query, labels=list(label_set), label_count=len(label_set) + 1, **params)
+                nodes_created += (await result.consume()).counters.nodes_created
+
+            source_end = self._node_pattern('b', dataset_id)
+            result = await session.run(f"{selection}MATCH (n)-[r]->{source_end} RETURN DISTINCT type(r) AS rel_type", **params)
+            rel_types = [record["rel_type"] async for record in result]
+            copy_a = self._node_pattern('a2', target_dataset_id, props=f"{NODE_KEY_PROPERTY}: n.{NODE_KEY_PROPERTY}", param="target_dataset_id")
+            copy_b = self._node_pattern('b2', target_dataset_id, props=f"{NODE_KEY_PROPERTY}: b.{NODE_KEY_PROPERTY}", param="target_dataset_id")
+            for rel_type in rel_types:
+                query = (
+                    f"{selection}"
+                    f"MATCH (n)-[r:{_quote_name(rel_type)}]->{source_end} "
+                    f"CALL {{ WITH n, r, b MATCH {copy_a}, {copy_b} "
+                    f"CREATE (a2)-[r2:{_quote_name(rel_type)}]->(b2) SET r2 = properties(r) }} "
+                    f"IN TRANSACTIONS OF {int(batch_size)} ROWS"
+                )
+                result = await session.run(query, **params)
+                relationships_created += (await result.consume()).counters.relationships_created
+
+        projection_cache.invalidate(target_dataset_id)
+        stats_cache.invalidate(target_dataset_id)
+        return {"node_count": nodes_created, "relationship_count": relationships_created}
+
+    def _node_condition(self, var: str, node_ref: NodeRef, param: str) -> str:
+        """WHERE condition addressing a node by stable key (str) or internal id (int)."""
+        if isinstance(node_ref, str):
+            return f"{var}.{NODE_KEY_PROPERTY} = ${param}"
+        return f"id({var}) = ${param}"
+
+    async def create_node(self, dataset_id: str, label: str, properties: Dict[str, Any], key: Optional[str] = None):
+        dataset_set = f"n.{DATASET_ID_PROPERTY} = $dataset_id, " if self.storage_mode == "property" else ""
         query = (
-            f"CREATE (n:{dataset_label}:{label} $props) "
-            "RETURN n"
+            f"CREATE (n:{self._isolation_label(dataset_id)}:{label} $props) "
+            f"SET {dataset_set}n.{NODE_KEY_PROPERTY} = $key "
+            "RETURN n{.*, _id: id(n)} AS n"
         )
-        async with self.driver.session() as session:
-            result = await session.run(query, props=properties)
-            record = await result.single()
-            return dict(record["n"])
+        record = await self._write(
+            query, {"props": properties, "key": key or str(uuid.uuid4()), "dataset_id": dataset_id}, single=True
+        )
+        projection_cache.invalidate(dataset_id)
+        return dict(record["n"])
 
-    async def create_relationship(self, dataset_id: str, from_node_id: int, to_node_id: int, rel_type: str, properties: Dict[str, Any]):
-        dataset_label = self._get_dataset_label(dataset_id)
+    async def create_relationship(self, dataset_id: str, from_node: NodeRef, to_node: NodeRef, rel_type: str, properties: Dict[str, Any]):
         query = (
-            f"MATCH (a:{dataset_label}), (b:{dataset_label}) "
-            "WHERE id(a) = $from_id AND id(b) = $to_id "
+            f"MATCH {self._node_pattern('a', dataset_id)}, {self._node_pattern('b', dataset_id)} "
+            f"WHERE {self._node_condition('a', from_node, 'from_ref')} AND {self._node_condition('b', to_node, 'to_ref')} "
             f"CREATE (a)-[r:{rel_type} $props]->(b) "
-            "RETURN r"
+            "RETURN r, id(a) AS from_id, id(b) AS to_id"
+        )
+        record = await self._write(
+            query, {"from_ref": from_node, "to_ref": to_node, "props": properties, "dataset_id": dataset_id}, single=True
         )
-        async with self.driver.session() as session:
-            result = await session.run(query, from_id=from_node_id, to_id=to_node_id, props=properties)
-            record = await result.single()
-            if record:
-                return dict(record["r"])
-            return None
+        if record:
+            projection_cache.invalidate(dataset_id)
+            return dict(record["r"])
+        return None
+
+    async def create_relationships_by_key(self, dataset_id: str, edges: List[Dict[str, Any]], key_property: str = NODE_KEY_PROPERTY, batch_size: int = 10000) -> int:
+        """
+        Bulk-create relationships whose endpoints are addressed by a key property.
+        edges: [{"from_key", "to_key", "type", "properties"}]. Returns the number created.
+        """
+        if not PROPERTY_NAME_PATTERN.match(key_property):
+            raise ValueError(f"Invalid property name '{key_property}'")
+
+        # Relationship types cannot be parameterized, so run one UNWIND per type
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        for edge in edges:
+            by_type.setdefault(edge["type"], []).append(
+                {"from": edge["from_key"], "to": edge["to_key"], "props": edge.get("properties") or {}}
+            )
+
+        for rel_type in by_type:
+            if not PROPERTY_NAME_PATTERN.match(rel_type):
+                raise ValueError(f"Invalid relationship type '{rel_type}'")
+
+        created = 0
+        for rel_type, rows in by_type.items():
+            query = (
+                "UNWIND $rows AS row "
+                f"MATCH {self._node_pattern('a', dataset_id, props=f'`{key_property}`: row.from')} "
+                f"MATCH {self._node_pattern('b', dataset_id, props=f'`{key_property}`: row.to')} "
+                f"CREATE (a)-[r:{rel_type}]->(b) SET r = row.props "
+                "RETURN count(r) AS created"
+            )
+            for start in range(0, len(rows), batch_size):
+                record = await self._write(query, {"rows": rows[start:start + batch_size], "dataset_id": dataset_id}, single=True)
+                created += record["created"]
+        if created:
+            projection_cache.invalidate(dataset_id)
+        return created
 
     async def get_nodes(self, dataset_id: str, label: Optional[str] = None, limit: int = 100):
-        dataset_label = self._get_dataset_label(dataset_id)
-        label_filter = f":{label}" if label else ""
         query = (
-            f"MATCH (n:{dataset_label}{label_filter}) "
+            f"MATCH {self._node_pattern('n', dataset_id, label)} "
             "RETURN n, id(n) as node_id LIMIT $limit"
         )
-        async with self.driver.session() as session:
-            result = await session.run(query, limit=limit)
-            nodes = []
-            async for record in result:
-                node_data = dict(record["n"])
-                node_data["_id"] = record["node_id"]
-                nodes.append(node_data)
-            return nodes
+        nodes = []
+        for record in await self._read(query, {"limit": limit, "dataset_id": dataset_id}):
+            node_data = dict(record["n"])
+            node_data["_id"] = record["node_id"]
+            nodes.append(node_data)
+        return nodes
 
-    async def get_neighbors(self, dataset_id: str, node_id: int):
-        dataset_label = self._get_dataset_label(dataset_id)
+    async def get_edges(self, dataset_id: str, limit: int = 100):
+        """Relationships with endpoints identified by their stable keys."""
         query = (
-            f"MATCH (n:{dataset_label})-[r]-(m:{dataset_label}) "
-            "WHERE id(n) = $node_id "
-            "RETURN m, r, type(r) as rel_type, id(m) as neighbor_id"
+            f"MATCH {self._node_pattern('a', dataset_id)}-[r]->{self._node_pattern('b', dataset_id)} "
+            f"RETURN a.{NODE_KEY_PROPERTY} AS source, b.{NODE_KEY_PROPERTY} AS target, type(r) AS rel_type, r "
+            "LIMIT $limit"
         )
-        async with self.driver.session() as session:
-            result = await session.run(query, node_id=node_id)
-            neighbors = []
-            async for record in result:
-                neighbor = {
-                    "node": dict(record["m"]), 
-                    "node_id": record["neighbor_id"],
-                    "relationship": dict(record["r"]),
-                    "type": record["rel_type"]
-                }
-                neighbors.append(neighbor)
-            return neighbors
+        edges = []
+        for record in await self._read(query, {"limit": limit, "dataset_id": dataset_id}):
+            edges.append({
+                "source": record["source"],
+                "target": record["target"],
+                "type": record["rel_type"],
+                "properties": dict(record["r"])
+            })
+        return edges
+
+    async def get_stats(
+        self, dataset_id: str, sample_size: int = 1000, refresh: bool = False, version: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Size overview of the dataset without scanning it.
+
+        Total node and per-type relationship counts are single-label/single-type
+        counts that Neo4j answers from its count store in label mode (and from
+        the dataset_id index plus node degrees in property mode). Labels,
+        property coverage and the degree distribution come from a sample of
+        ``sample_size`` nodes; counts for the sampled labels are exact.
+        Cached statistics are reused only for the same ``version`` (the
+        dataset's write_version), so writes served by other workers are seen.
+        """
+        if not refresh:
+            cached = stats_cache.get(dataset_id)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+        async def work(tx: AsyncManagedTransaction):
+            result = await tx.run(
+                f"MATCH {self._node_pattern('n', dataset_id)} RETURN count(n) AS count",
+                dataset_id=dataset_id
+            )
+            node_count = (await result.single())["count"]
+
+            result = await tx.run(
+                f"MATCH {self._node_pattern('n', dataset_id)} WITH n LIMIT $sample_size "
+                "RETURN labels(n) AS labels, keys(n) AS keys, COUNT { (n)--() } AS degree",
+                sample_size=sample_size, dataset_id=dataset_id
+            )
+            sample = [record async for record in result]
+            sampled_labels = set()
+            for record in sample:
+                sampled_labels.update(record["labels"])
+            sampled_labels.discard(self._isolation_label(dataset_id))
+
+            labels = {}
+            for label in sorted(sampled_labels):
+                result = await tx.run(
+                    f"MATCH {self._node_pattern('n', dataset_id, _quote_name(label))} RETURN count(n) AS count",
+                    dataset_id=dataset_id
+                )
+                labels[label] = (await result.single())["count"]
+
+            # Relationship types are global; counts of unused types are dropped below
+            result = await tx.run("CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType")
+            rel_types = [record["relationshipType"] async for record in result]
+            relationship_types = {}
+            for rel_type in rel_types:
+                result = await tx.run(
+                    f"MATCH {self._node_pattern('n', dataset_id)}-[r:{_quote_name(rel_type)}]->() RETURN count(r) AS count",
+                    dataset_id=dataset_id
+                )
+                count = (await result.single())["count"]
+                if count:
+                    relationship_types[rel_type] = count
+            return node_count, sample, labels, relationship_types
+
+        node_count, sample, labels, relationship_types = await self._execute(READ_ACCESS, work)
+        sampled = len(sample)
+        key_counts: Dict[str, int] = {}
+        degrees = []
+        for record in sample:
+            for key in record["keys"]:
+                key_counts[key] = key_counts.get(key, 0) + 1
+            degrees.append(record["degree"])
+
+        if self.storage_mode == "property":
+            key_counts.pop(DATASET_ID_PROPERTY, None)
+        stats = {
+            "node_count": node_count,
+            "relationship_count": sum(relationship_types.values()),
+            "labels": labels,
+            "relationship_types": relationship_types,
+            "property_coverage": {key: count / sampled for key, count in sorted(key_counts.items())},
+            "degree": _degree_summary(degrees),
+            "sample_size": sampled,
+        }
+        stats_cache.set(dataset_id, (version, stats))
+        return stats
+
+    async def get_neighbors(self, dataset_id: str, node: NodeRef):
+        query = (
+            f"MATCH {self._node_pattern('n', dataset_id)}-[r]-{self._node_pattern('m', dataset_id)} "
+            f"WHERE {self._node_condition('n', node, 'node_ref')} "
+            f"RETURN m, r, type(r) as rel_type, id(m) as neighbor_id, m.{NODE_KEY_PROPERTY} as neighbor_key"
+        )
+        neighbors = []
+        for record in await self._read(query, {"node_ref": node, "dataset_id": dataset_id}):
+            neighbor = {
+                "node": dict(record["m"]), 
+                "node_id": record["neighbor_id"],
+                "node_key": record["neighbor_key"],
+                "relationship": dict(record["r"]),
+                "type": record["rel_type"]
+            }
+            neighbors.append(neighbor)
+        return neighbors
     
-    async def shortest_path(self, dataset_id: str, from_node_id: int, to_node_id: int):
-        dataset_label = self._get_dataset_label(dataset_id)
+    async def shortest_path(self, dataset_id: str, from_node: NodeRef, to_node: NodeRef):
         # Using simple shortestPath cypher
         query = (
-            f"MATCH (a:{dataset_label}), (b:{dataset_label}), "
+            f"MATCH {self._node_pattern('a', dataset_id)}, {self._node_pattern('b', dataset_id)}, "
             f"p = shortestPath((a)-[*]-(b)) "
-            "WHERE id(a) = $from_id AND id(b) = $to_id "
+            f"WHERE {self._node_condition('a', from_node, 'from_ref')} AND {self._node_condition('b', to_node, 'to_ref')} "
             "RETURN p"
         )
-        async with self.driver.session() as session:
-            result = await session.run(query, from_id=from_node_id, to_id=to_node_id)
-            record = await result.single()
-            if record:
-                # Path object handling might need serialization logic for complex cases
-                # Return simple length and nodes for now
-                path = record["p"]
-                return {
-                    "length": len(path),
-                    "nodes": [dict(n) for n in path.nodes],
-                    "relationships": [dict(r) for r in path.relationships]
-                }
-            return None
+        record = await self._read(query, {"from_ref": from_node, "to_ref": to_node, "dataset_id": dataset_id}, single=True)
+        if record:
+            # Path object handling might need serialization logic for complex cases
+            # Return simple length and nodes for now
+            path = record["p"]
+            return {
+                "length": len(path),
+                "nodes": [dict(n) for n in path.nodes],
+                "relationships": [dict(r) for r in path.relationships]
+            }
+        return None
+
+    async def get_topology(self, dataset_id: str) -> Tuple[array, array, array]:
+        """
+        Stream the dataset's node ids and edge endpoints into compact int64 buffers.
+        Used to build in-process projections without materializing records.
+        """
+        async def work(tx: AsyncManagedTransaction):
+            # Buffers are created per attempt so a retried transaction starts clean
+            node_ids, src_ids, dst_ids = array("q"), array("q"), array("q")
+            result = await tx.run(
+                f"MATCH {self._node_pattern('n', dataset_id)} RETURN id(n) AS id",
+                dataset_id=dataset_id
+            )
+            async for record in result:
+                node_ids.append(record["id"])
+            result = await tx.run(
+                f"MATCH {self._node_pattern('a', dataset_id)}-[]->{self._node_pattern('b', dataset_id)} "
+                "RETURN id(a) AS src, id(b) AS dst",
+                dataset_id=dataset_id
+            )
+            async for record in result:
+                src_ids.append(record["src"])
+                dst_ids.append(record["dst"])
+            return node_ids, src_ids, dst_ids
+
+        return await self._execute(READ_ACCESS, work)
+
+    async def write_node_property(self, dataset_id: str, property_name: str, node_ids, values, batch_size: int = 10000) -> int:
+        """Write one value per node as a property, one UNWIND transaction per batch."""
+        if not PROPERTY_NAME_PATTERN.match(property_name):
+            raise ValueError(f"Invalid property name '{property_name}'")
+        query = (
+            "UNWIND $rows AS row "
+            f"MATCH {self._node_pattern('n', dataset_id)} WHERE id(n) = row.id "
+            f"SET n.`{property_name}` = row.value"
+        )
+        written = 0
+        for start in range(0, len(node_ids), batch_size):
+            ids = node_ids[start:start + batch_size].tolist()
+            vals = values[start:start + batch_size].tolist()
+            rows = [{"id": i, "value": v} for i, v in zip(ids, vals)]
+            await self._write(query, {"rows": rows, "dataset_id": dataset_id})
+            written += len(rows)
+        return written
@@ -0,0 +1,131 @@
+"""
+Per-dataset cache of in-memory graph projections.
+
+Entries are evicted least-recently-used once the summed ``nbytes`` of all
+cached projections exceeds the configured budget. Each entry remembers the
+dataset's ``write_version`` it was loaded at and is only served for that
+version, so writes through any worker (including raw /query writes, which
+bump every dataset of the session) retire it. Writes through GraphService
+also drop the entry in their own worker right away, and
+PROJECTION_CACHE_TTL_SECONDS bounds staleness from writes that bypass the API.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from app.core.config import settings
+
+
+class ProjectionCache:
+    def __init__(self, max_bytes: int, ttl_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        # dataset id -> (write version, monotonic load time)
+        self._versions: Dict[str, Tuple[Optional[int], float]] = {}
+        self._loading: Dict[Tuple[str, Optional[int]], asyncio.Future] = {}
+        self._stale: Set[Tuple[str, Optional[int]]] = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def get(self, dataset_id: str, version: Optional[int] = None):
+        projection = self._entries.get(dataset_id)
+        if projection is None:
+            return None
+        cached_version, loaded_at = self._versions[dataset_id]
+        expired = self.ttl_seconds is not None and time.monotonic() - loaded_at >= self.ttl_seconds
+        if cached_version != version or expired:
+            self._drop(dataset_id)
+            return None
+        self._entries.move_to_end(dataset_id)
+        # Derived views (e.g. the undirected adjacency) grow entries after insertion
+        self._sizes[dataset_id] = projection.nbytes
+        self._evict()
+        return projection
+
+    def put(self, dataset_id: str, projection, version: Optional[int] = None) -> None:
+        size = projection.nbytes
+        if size > self.max_bytes:
+            self._drop(dataset_id)
+            return
+        self._entries[dataset_id] = projection
+        self._entries.move_to_end(dataset_id)
+        self._sizes[dataset_id] = size
+        self._versions[dataset_id] = (version, time.monotonic())
+        self._evict()
+
+    async def get_or_load(self, dataset_id: str, loader: Callable[[], Awaitable[Any]], version: Optional[int] = None):
+        """
+        Return the projection cached for ``version`` of the dataset, loading it
+        once even under concurrent misses.
+        """
+        projection = self.get(dataset_id, version)
+        if projection is not None:
+            self.hits += 1
+            return projection
+        key = (dataset_id, version)
+        if key in self._loading:
+            return await asyncio.shield(self._loading[key])
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        self._stale.discard(key)
+        try:
+            projection = await loader()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure doesn't log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._loading.pop(key, None)
+        future.set_result(projection)
+        # A write may have landed while loading; only cache if nobody invalidated us
+        if key in self._stale:
+            self._stale.discard(key)
+        else:
+            self.put(dataset_id, projection, version)
+        return projection
+
+    def invalidate(self, dataset_id: str) -> None:
+        """Drop the dataset's projection, e.g. after a write; loads in flight are not cached."""
+        self._drop(dataset_id)
+        self._stale.update(key for key in self._loading if key[0] == dataset_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._sizes.clear()
+        self._versions.clear()
+
+    def _drop(self, dataset_id: str) -> None:
+        self._entries.pop(dataset_id, None)
+        self._sizes.pop(dataset_id, None)
+        self._versions.pop(dataset_id, None)
+
+    def _evict(self) -> None:
+        while self._entries and self.total_bytes > self.max_bytes:
+            dataset_id, _ = self._entries.popitem(last=False)
+            self._sizes.pop(dataset_id, None)
+            self._versions.pop(dataset_id, None)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "total_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+projection_cache = ProjectionCache(settings.PROJECTION_CACHE_MAX_BYTES, settings.PROJECTION_CACHE_TTL_SECONDS)
@@ -0,0 +1,145 @@
+"""
+Conservative static analysis of raw SQL and Cypher statements.
+
+``is_read_only_*`` only answer True for single statements that cannot write
+and whose results do not depend on the clock or randomness; anything the
+scanner does not understand is treated as a write. String literals, quoted
+identifiers and comments are blanked before keywords are matched, so a
+column named "update" or a literal 'DELETE' does not trip the scan.
+
+``may_write`` answers a different question: whether the statement can change
+stored data, judged by statement type alone. A SELECT calling now() is not
+cacheable but does not write, so it neither commits nor invalidates caches.
+Side effects of functions a query calls are not tracked.
+"""
+import re
+
+_SQL_MASK = re.compile(
+    r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/|\$(\w*)\$.*?\$\1\$""",
+    re.DOTALL,
+)
+_CYPHER_MASK = re.compile(
+    r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`(?:[^`]|``)*`|//[^\n]*|/\*.*?\*/""",
+    re.DOTALL,
+)
+_WHITESPACE = re.compile(r"\s+")
+
+_SQL_READ_STARTS = {"select", "with", "values", "table"}
+_SQL_WRITE_KEYWORDS = re.compile(
+    r"\b(insert|update|delete|merge|upsert|create|drop|alter|truncate|grant|revoke|copy|call|do|"
+    r"lock|set|reset|into|vacuum|analyze|cluster|reindex|refresh|listen|notify|prepare|execute|"
+    r"comment|security|import|begin|commit|rollback|savepoint)\b"
+)
+_SQL_LOCKING = re.compile(r"\bfor\s+(update|share|no\s+key\s+update|key\s+share)\b")
+# SQL-standard clock functions are called without parentheses
+_SQL_CLOCK_KEYWORDS = re.compile(r"\b(current_timestamp|current_date|current_time|localtime|localtimestamp)\b")
+# Function calls outside this list may be volatile or user-defined with side effects
+_SQL_SAFE_FUNCTIONS = {
+    "count", "sum", "avg", "min", "max", "coalesce", "nullif", "greatest", "least",
+    "lower", "upper", "length", "char_length", "trim", "ltrim", "rtrim", "replace", "substring",
+    "substr", "concat", "concat_ws", "left", "right", "split_part", "position", "strpos",
+    "abs", "round", "floor", "ceil", "ceiling", "trunc", "mod", "power", "sqrt", "ln", "log", "exp",
+    "cast", "extract", "date_part", "date_trunc", "to_char", "to_date", "to_number",
+    "array_agg", "string_agg", "json_agg", "jsonb_agg", "json_build_object", "jsonb_build_object",
+    "bool_and", "bool_or", "every", "stddev", "stddev_pop", "stddev_samp", "variance",
+    "var_pop", "var_samp", "percentile_cont", "percentile_disc", "mode", "corr",
+    "row_number", "rank", "dense_rank", "percent_rank", "cume_dist", "ntile",
+    "lag", "lead", "first_value", "last_value", "nth_value", "array_length", "unnest",
+}
+# Keywords that may be followed by "(" without being a function call
+_SQL_PAREN_KEYWORDS = {
+    "select", "from", "where", "and", "or", "not", "in", "exists", "any", "all", "some", "as",
+    "on", "using", "join", "values", "over", "filter", "within", "group", "by", "having",
+    "union", "intersect", "except", "case", "when", "then", "else", "with", "lateral",
+    "partition", "order", "limit", "offset", "between", "like", "ilike", "is", "distinct",
+    "recursive", "materialized", "table", "array", "row",
+}
+
+_CYPHER_WRITE_KEYWORDS = re.compile(
+    r"\b(create|merge|delete|detach|set|remove|drop|load|foreach|alter|grant|deny|revoke|terminate|transactions)\b"
+)
+_CYPHER_PROCEDURE_CALL = re.compile(r"\bcall\b(?!\s*\{)")
+_CYPHER_NONDETERMINISTIC = re.compile(
+    r"\b(rand|randomuuid|timestamp|linenumber|file)\s*\(|"
+    r"\b(datetime|localdatetime|date|time|localtime)\s*\(\s*\)|"
+    r"\.\s*(realtime|statement|transaction)\s*\("
+)
+
+
+def _mask(pattern: re.Pattern, query: str) -> str:
+    return pattern.sub(" ? ", query)
+
+
+def _single_statement(masked: str) -> str:
+    """The masked statement without trailing semicolons, or "" if there are several."""
+    statement = masked.strip().rstrip(";").strip()
+    return "" if ";" in statement else statement
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace outside string literals and drop trailing semicolons."""
+    parts = []
+    last = 0
+    for match in _CYPHER_MASK.finditer(query):
+        parts.append(_WHITESPACE.sub(" ", query[last:match.start()]))
+        if not match.group(0).startswith(("//", "/*")):
+            parts.append(match.group(0))
+        last = match.end()
+    parts.append(_WHITESPACE.sub(" ", query[last:]))
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def is_read_only_sql(query: str) -> bool:
+    statement = _single_statement(_mask(_SQL_MASK, query)).lower()
+    if not statement:
+        return False
+    if statement.split(None, 1)[0].lstrip("(") not in _SQL_READ_STARTS:
+        return False
+    if _SQL_WRITE_KEYWORDS.search(statement) or _SQL_LOCKING.search(statement) or _SQL_CLOCK_KEYWORDS.search(statement):
+        return False
+    for match in re.finditer(r"([a-z_][a-z0-9_$]*)\s*\(", statement):
+        name = match.group(1)
+        if name not in _SQL_SAFE_FUNCTIONS and name not in _SQL_PAREN_KEYWORDS:
+            return False
+    return True
+
+
+def is_read_only_cypher(query: str) -> bool:
+    statement = _single_statement(_mask(_CYPHER_MASK, query)).lower()
+    if not statement:
+        return False
+    return not (
+        _CYPHER_WRITE_KEYWORDS.search(statement)
+        or _CYPHER_PROCEDURE_CALL.search(statement)
+        or _CYPHER_NONDETERMINISTIC.search(statement)
+    )
+
+
+def may_write_sql(query: str) -> bool:
+    statement = _single_statement(_mask(_SQL_MASK, query)).lower()
+    if not statement or statement.split(None, 1)[0].lstrip("(") not in _SQL_READ_STARTS:
+        return True
+    return bool(_SQL_WRITE_KEYWORDS.search(statement))
+
+
+def may_write_cypher(query: str) -> bool:
+    statement = _single_statement(_mask(_CYPHER_MASK, query)).lower()
+    if not statement:
+        return True
+    return bool(_CYPHER_WRITE_KEYWORDS.search(statement) or _CYPHER_PROCEDURE_CALL.search(statement))
+
+
+def may_write(query_type: str, query: str) -> bool:
+    if query_type == "sql":
+        return may_write_sql(query)
+    if query_type == "cypher":
+        return may_write_cypher(query)
+    return True
+
+
+def is_read_only(query_type: str, query: str) -> bool:
+    if query_type == "sql":
+        return is_read_only_sql(query)
+    if query_type == "cypher":
+        return is_read_only_cypher(query)
+    return False
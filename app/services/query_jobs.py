@@ -0,0 +1,282 @@
+"""
+Background /query jobs with results spooled to disk.
+
+Each job writes ``<job_id>.ndjson.gz`` and a ``<job_id>.json`` metadata
+sidecar to QUERY_JOB_DIR. Results are NDJSON, compressed one page of
+QUERY_JOB_PAGE_ROWS rows per gzip member; the sidecar records the offset of
+every member, so a page is read by seeking to it and decompressing only that
+member. Status and results are read from the sidecar, so any worker sharing
+the directory can serve them, and deleting the sidecar from any worker stops
+the job at its next progress update. Files are removed QUERY_JOB_TTL_SECONDS
+after the job finishes.
+"""
+import asyncio
+import gzip
+import json
+import os
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from neo4j import AsyncDriver
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.rate_limit import rate_limiter
+from app.services.query_service import QueryService, _json_line
+from app.services.result_cache import bump_session_write_versions
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class JobDeleted(Exception):
+    """The job's sidecar was removed, e.g. by a DELETE served by another worker."""
+
+
+class QueryJobManager:
+    def __init__(self, directory: str, ttl_seconds: float, page_rows: int, max_running: int):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.page_rows = page_rows
+        self._slots = asyncio.Semaphore(max_running)
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{job_id}{suffix}")
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        path = self._path(job["job_id"], ".json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(job, f)
+        os.replace(path + ".tmp", path)
+
+    def _update(self, job: Dict[str, Any]) -> None:
+        """Save the progress of a running job, unless the job has been deleted meanwhile."""
+        if not os.path.exists(self._path(job["job_id"], ".json")):
+            raise JobDeleted(job["job_id"])
+        self._save(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job metadata, or None if it does not exist or has expired."""
+        try:
+            with open(self._path(job_id, ".json")) as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if job["expires_at"] <= time.time():
+            self._remove(job_id)
+            return None
+        return job
+
+    def submit(
+        self,
+        db: AsyncSession,
+        driver: AsyncDriver,
+        api_key: str,
+        session_id: str,
+        query_type: str,
+        query: str,
+        params: Dict[str, Any],
+        writes: bool,
+        max_rows: int,
+        timeout: float,
+    ) -> Dict[str, Any]:
+        """
+        Record a pending job and start it in the background; returns its
+        metadata. The job holds one of the key's ``query_job`` slots until it
+        finishes, so 429 is raised while the key has too many jobs running or
+        queued.
+        """
+        rate_limiter.acquire(api_key, "query_job")
+        try:
+            job = self._create(session_id, query_type, timeout)
+        except BaseException:
+            rate_limiter.release(api_key, "query_job")
+            raise
+        # The request's session closes with the response; the job gets its own
+        session_factory = async_sessionmaker(db.bind, expire_on_commit=False)
+        task = asyncio.create_task(
+            self._run(job, session_factory, driver, query, params, writes, max_rows, timeout)
+        )
+        self._tasks[job["job_id"]] = task
+
+        def finished(_) -> None:
+            self._tasks.pop(job["job_id"], None)
+            rate_limiter.release(api_key, "query_job")
+
+        task.add_done_callback(finished)
+        return job
+
+    def _create(self, session_id: str, query_type: str, timeout: float) -> Dict[str, Any]:
+        os.makedirs(self.directory, exist_ok=True)
+        self.purge_expired()
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "session_id": session_id,
+            "query_type": query_type,
+            "status": "pending",
+            "created_at": now,
+            "finished_at": None,
+            # A job whose worker died never finishes; this still lets it expire
+            "expires_at": now + timeout + self.ttl_seconds,
+            "columns": [],
+            "row_count": 0,
+            "truncated": False,
+            # Rows affected by a SQL statement without RETURNING
+            "rowcount": None,
+            "page_rows": self.page_rows,
+            "pages": [],
+            "error": None,
+        }
+        self._save(job)
+        return job
+
+    async def _run(
+        self,
+        job: Dict[str, Any],
+        session_factory: async_sessionmaker,
+        driver: AsyncDriver,
+        query: str,
+        params: Dict[str, Any],
+        writes: bool,
+        max_rows: int,
+        timeout: float,
+    ) -> None:
+        job_id = job["job_id"]
+        async with self._slots:
+            job["status"] = "running"
+            try:
+                self._update(job)
+            except JobDeleted:
+                return
+            async with session_factory() as db:
+                service = QueryService(db, driver)
+                try:
+                    await self._spool(job, service, query, params, writes, max_rows, timeout)
+                    job["status"] = "succeeded"
+                    if writes:
+                        await bump_session_write_versions(db, job["session_id"])
+                except JobDeleted:
+                    job["status"] = "cancelled"
+                    await db.rollback()
+                except asyncio.CancelledError:
+                    job["status"] = "cancelled"
+                    await service.cancel()
+                    raise
+                except Exception as e:
+                    job["status"] = "failed"
+                    job["error"] = str(e)
+                    await db.rollback()
+                finally:
+                    job["finished_at"] = time.time()
+                    job["expires_at"] = job["finished_at"] + self.ttl_seconds
+                    try:
+                        self._update(job)
+                    except JobDeleted:
+                        # The spool file may have been written after the DELETE removed it
+                        self._remove(job_id)
+
+    async def _spool(
+        self,
+        job: Dict[str, Any],
+        service: QueryService,
+        query: str,
+        params: Dict[str, Any],
+        writes: bool,
+        max_rows: int,
+        timeout: float,
+    ) -> None:
+        if job["query_type"] == "sql" and writes:
+            # Streaming needs a statement that returns rows, which most writes do not
+            columns, rows, job["rowcount"] = await service.open_sql_write(query, params, timeout)
+        else:
+            columns, rows = await service.open_stream(job["query_type"], query, params, timeout)
+        job["columns"] = columns
+        page: List[bytes] = []
+        try:
+            with open(self._path(job["job_id"], ".ndjson.gz"), "wb") as f:
+                async for row in rows:
+                    if job["row_count"] == max_rows:
+                        job["truncated"] = True
+                        break
+                    page.append(_json_line(row))
+                    job["row_count"] += 1
+                    if len(page) == self.page_rows:
+                        await asyncio.to_thread(self._write_page, f, job, page)
+                        page = []
+                if page:
+                    await asyncio.to_thread(self._write_page, f, job, page)
+        finally:
+            await rows.aclose()
+
+    def _write_page(self, f, job: Dict[str, Any], page: List[bytes]) -> None:
+        member = gzip.compress(b"".join(page))
+        offset = f.tell()
+        f.write(member)
+        f.flush()
+        job["pages"].append([offset, len(member), len(page)])
+        # Publishing progress lets clients read finished pages of a running job
+        self._update(job)
+
+    def read_page(self, job: Dict[str, Any], page: int) -> List[Dict[str, Any]]:
+        offset, length, _ = job["pages"][page]
+        with open(self._path(job["job_id"], ".ndjson.gz"), "rb") as f:
+            f.seek(offset)
+            data = gzip.decompress(f.read(length))
+        return [json.loads(line) for line in data.splitlines()]
+
+    async def iter_results(self, job: Dict[str, Any]) -> AsyncIterator[bytes]:
+        """Decompressed NDJSON of all pages, one page per chunk."""
+        with open(self._path(job["job_id"], ".ndjson.gz"), "rb") as f:
+            for offset, length, _ in job["pages"]:
+                f.seek(offset)
+                yield await asyncio.to_thread(lambda: gzip.decompress(f.read(length)))
+
+    async def cancel(self, job_id: str) -> None:
+        """Stop the job if it runs in this process and delete its files."""
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._remove(job_id)
+
+    async def shutdown(self) -> None:
+        for job_id in list(self._tasks):
+            await self.cancel(job_id)
+
+    def purge_expired(self) -> None:
+        now = time.time()
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            job_id = name[:-len(".json")]
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    expired = json.load(f)["expires_at"] <= now
+            except (OSError, ValueError, KeyError):
+                continue
+            if expired:
+                self._remove(job_id)
+
+    def _remove(self, job_id: str) -> None:
+        for suffix in (".json", ".ndjson.gz"):
+            try:
+                os.remove(self._path(job_id, suffix))
+            except OSError:
+                pass
+
+
+query_jobs = QueryJobManager(
+    directory=settings.QUERY_JOB_DIR,
+    ttl_seconds=settings.QUERY_JOB_TTL_SECONDS,
+    page_rows=settings.QUERY_JOB_PAGE_ROWS,
+    max_running=settings.QUERY_JOB_MAX_RUNNING,
+)
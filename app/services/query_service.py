@@ -0,0 +1,582 @@
+"""
+Raw SQL/Cypher execution for the /query endpoint, including streamed results.
+"""
+import asyncio
+import csv
+import io
+import json
+import time
+from contextlib import suppress
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, TypeVar
+
+from neo4j import AsyncDriver, Query
+from sqlalchemy import text
+from sqlalchemy.exc import ResourceClosedError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import QUERY_RESULT_ROWS
+from app.core.query_stats import query_stats
+from app.core.request_timing import measured
+from app.core.serialization import dumps, encode_value
+from app.services.query_analysis import is_read_only
+
+ERROR_PREFIXES = {"sql": "SQL", "cypher": "Cypher"}
+STREAM_FORMATS = ("ndjson", "csv")
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Encoded rows are flushed to the client in chunks of about this size
+STREAM_CHUNK_BYTES = 64 * 1024
+
+Rows = AsyncIterator[Dict[str, Any]]
+T = TypeVar("T")
+
+
+class QueryCancelled(Exception):
+    """The client disconnected and the running statement was cancelled on the server."""
+
+
+class TooManyRows(ValueError):
+    """A statement returned more rows than the caller can hold in memory."""
+
+
+class Statement(NamedTuple):
+    """One entry of a /query/batch request."""
+    query_type: str
+    query: str
+    params: Dict[str, Any]
+    dependent: bool = False
+
+
+def resolve_timeout(requested: Optional[float], api_key: str, job: bool = False) -> float:
+    """
+    Per-request timeout, capped by the API key's override or QUERY_TIMEOUT_SECONDS.
+    Async jobs use QUERY_JOB_TIMEOUT_OVERRIDES and QUERY_JOB_TIMEOUT_SECONDS and
+    are never capped below the key's interactive limit.
+    """
+    limit = settings.QUERY_TIMEOUT_OVERRIDES.get(api_key, settings.QUERY_TIMEOUT_SECONDS)
+    if job:
+        limit = max(limit, settings.QUERY_JOB_TIMEOUT_OVERRIDES.get(api_key, settings.QUERY_JOB_TIMEOUT_SECONDS))
+    return limit if requested is None else min(requested, limit)
+
+
+def resolve_row_limit(requested: Optional[int], stream: bool) -> int:
+    limit = settings.QUERY_STREAM_MAX_ROWS if stream else settings.QUERY_MAX_ROWS
+    return limit if requested is None else min(requested, limit)
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
+def _serialize(rows: List[Any], to_dict: Callable[[Any], Dict[str, Any]]) -> float:
+    """Milliseconds spent turning driver rows into dicts and encoding them as JSON."""
+    started = time.perf_counter()
+    dumps([to_dict(row) for row in rows])
+    return _elapsed_ms(started)
+
+
+def _timings(fetch_ms: float, execution_ms: Optional[float], serialization_ms: Optional[float]) -> Dict[str, Optional[float]]:
+    """
+    Split a profiled query's wall time. ``fetch`` is measured here (execute
+    and read all rows); ``execution`` is what the database reports for that
+    same run, so ``network`` is the rest of the fetch: round trips, transfer
+    and driver decoding. Without rows (``serialization_ms`` is None) there is
+    no transfer to attribute, and ``network`` is None too.
+    """
+    network_ms = None
+    if execution_ms is not None and serialization_ms is not None:
+        network_ms = round(max(fetch_ms - execution_ms, 0.0), 3)
+    return {
+        "total": round(fetch_ms + (serialization_ms or 0.0), 3),
+        "fetch": fetch_ms,
+        "execution": execution_ms,
+        "network": network_ms,
+        "serialization": serialization_ms,
+    }
+
+
+def _collect_rows(result, max_rows: int) -> Dict[str, Any]:
+    rows = [dict(row._mapping) for row in result.fetchmany(max_rows + 1)]
+    result.close()
+    truncated = len(rows) > max_rows
+    rows = rows[:max_rows]
+    QUERY_RESULT_ROWS.labels("sql", "json").observe(len(rows))
+    return {"status": "success", "data": rows, "count": len(rows), "truncated": truncated}
+
+
+async def _collect_records(result, max_rows: int) -> Dict[str, Any]:
+    # Values stay driver objects (Nodes, Paths, temporal types); the response encodes them in one pass
+    data = []
+    truncated = False
+    async for record in result:
+        if len(data) == max_rows:
+            truncated = True
+            break
+        data.append(dict(record.items()))
+    QUERY_RESULT_ROWS.labels("cypher", "json").observe(len(data))
+    return {"status": "success", "data": data, "count": len(data), "truncated": truncated}
+
+
+def _error(query_type: str, exc: Exception) -> Dict[str, Any]:
+    return {"status": "error", "error": f"{ERROR_PREFIXES[query_type]} Error: {str(exc)}"}
+
+
+async def run_until_disconnected(
+    work: Awaitable[T],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    cancel: Callable[[], Awaitable[None]],
+) -> T:
+    """
+    Await ``work`` while polling for a client disconnect. If the client
+    goes away first, ``cancel`` stops the statements on the server and
+    QueryCancelled is raised.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.QUERY_DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await is_disconnected():
+                raise QueryCancelled()
+    except BaseException:
+        if not task.done():
+            with suppress(Exception):
+                await cancel()
+            task.cancel()
+            with suppress(BaseException):
+                await task
+        raise
+
+
+def _json_line(row: Dict[str, Any]) -> bytes:
+    return dumps(row) + b"\n"
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (str, int, float)):
+        return value
+    if not isinstance(value, (dict, list, tuple)):
+        value = encode_value(value)
+        if isinstance(value, str):
+            return value
+    return dumps(value).decode()
+
+
+def _csv_line(values: List[Any]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow([_csv_value(value) for value in values])
+    return buffer.getvalue().encode()
+
+
+async def encode_rows(columns: List[str], rows: Rows, fmt: str, max_rows: int, max_bytes: int) -> AsyncIterator[bytes]:
+    """
+    Encode rows as NDJSON or CSV while they are read. Stops at ``max_rows``
+    rows or before the output would exceed ``max_bytes``; a truncated NDJSON
+    stream ends with a ``{"_truncated": ...}`` line.
+    """
+    chunk = bytearray()
+    sent = 0
+    count = 0
+    truncated = None
+    try:
+        if fmt == "csv":
+            chunk += _csv_line(columns)
+        async for row in rows:
+            if count >= max_rows:
+                truncated = "max_rows"
+                break
+            line = _csv_line([row.get(column) for column in columns]) if fmt == "csv" else _json_line(row)
+            if sent + len(chunk) + len(line) > max_bytes:
+                truncated = "max_bytes"
+                break
+            chunk += line
+            count += 1
+            if len(chunk) >= STREAM_CHUNK_BYTES:
+                sent += len(chunk)
+                yield bytes(chunk)
+                chunk.clear()
+        if truncated and fmt == "ndjson":
+            chunk += _json_line({"_truncated": {"reason": truncated, "rows": count}})
+        if chunk:
+            yield bytes(chunk)
+    finally:
+        # Releases the cursor / Neo4j session even if the client went away mid-stream
+        await rows.aclose()
+
+
+class QueryService:
+    def __init__(self, db: AsyncSession, driver: AsyncDriver):
+        self.db = db
+        self.driver = driver
+        # Handles to the statement in flight, used by cancel()
+        self._backend_pid: Optional[int] = None
+        self._neo4j_session = None
+
+    @property
+    def _is_postgres(self) -> bool:
+        return self.db.bind is not None and self.db.bind.dialect.name == "postgresql"
+
+    async def _prepare_sql(self, timeout: float) -> None:
+        """Set a transaction-local statement_timeout and remember the backend pid for cancellation."""
+        if not self._is_postgres:
+            return
+        result = await self.db.execute(
+            text("SELECT pg_backend_pid(), set_config('statement_timeout', :timeout, true)"),
+            {"timeout": str(int(timeout * 1000))}
+        )
+        self._backend_pid = result.first()[0]
+
+    async def execute_sql(
+        self, query: str, params: Dict[str, Any], max_rows: int, timeout: float, commit: bool = True
+    ) -> Dict[str, Any]:
+        await self._prepare_sql(timeout)
+        result = await self.db.execute(text(query), params)
+        if result.returns_rows:
+            payload = _collect_rows(result, max_rows)
+        else:
+            payload = {"status": "success", "rowcount": result.rowcount}
+        # Writes may return rows too (INSERT ... RETURNING)
+        if commit and not is_read_only("sql", query):
+            await self.db.commit()
+        return payload
+
+    @measured("cypher")
+    async def execute_cypher(self, query: str, params: Dict[str, Any], max_rows: int, timeout: float) -> Dict[str, Any]:
+        # Auto-commit keeps CALL {} IN TRANSACTIONS usable; Query.timeout bounds it server-side
+        async with self.driver.session(database=settings.NEO4J_DATABASE) as session:
+            self._neo4j_session = session
+            try:
+                started = time.perf_counter()
+                result = await session.run(Query(query, timeout=timeout), params)
+                records = await _collect_records(result, max_rows)
+                query_stats.observe("cypher", query, time.perf_counter() - started, records["count"])
+                return records
+            finally:
+                self._neo4j_session = None
+
+    async def execute(self, query_type: str, query: str, params: Dict[str, Any], max_rows: int, timeout: float) -> Dict[str, Any]:
+        if query_type == "sql":
+            return await self.execute_sql(query, params, max_rows, timeout)
+        return await self.execute_cypher(query, params, max_rows, timeout)
+
+    async def profile_sql(self, query: str, params: Dict[str, Any], max_rows: int, timeout: float) -> Dict[str, Any]:
+        """
+        Execute the statement once and roll it back, so profiling a write does
+        not apply it. PostgreSQL runs it under ``EXPLAIN (ANALYZE, BUFFERS,
+        FORMAT JSON)``, which reports the plan and the server-side time but
+        sends no rows, so ``network`` and ``serialization`` are None. Other
+        databases return their (non-executing) EXPLAIN output, and the
+        statement runs once to time fetching and serializing its rows.
+        """
+        await self._prepare_sql(timeout)
+        try:
+            if self._is_postgres:
+                started = time.perf_counter()
+                plan = (await self.db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"), params)).scalar()
+                fetch_ms = _elapsed_ms(started)
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                plan = plan[0]
+                execution_ms = round(plan.get("Planning Time", 0.0) + plan.get("Execution Time", 0.0), 3)
+                row_count = plan.get("Plan", {}).get("Actual Rows", 0)
+                serialization_ms = None
+            else:
+                result = await self.db.execute(text(f"EXPLAIN QUERY PLAN {query}"), params)
+                plan = [dict(row._mapping) for row in result]
+                execution_ms = None
+
+                started = time.perf_counter()
+                result = await self.db.execute(text(query), params)
+                rows = result.fetchmany(max_rows + 1) if result.returns_rows else []
+                result.close()
+                fetch_ms = _elapsed_ms(started)
+                row_count = len(rows)
+                serialization_ms = _serialize(rows[:max_rows], lambda row: dict(row._mapping))
+        finally:
+            await self.db.rollback()
+
+        return {
+            "status": "success",
+            "plan": plan,
+            "count": min(row_count, max_rows),
+            "truncated": row_count > max_rows,
+            "timings_ms": _timings(fetch_ms, execution_ms, serialization_ms),
+        }
+
+    @measured("cypher")
+    async def profile_cypher(self, query: str, params: Dict[str, Any], max_rows: int, timeout: float) -> Dict[str, Any]:
+        """
+        Run the statement with ``PROFILE`` inside an explicit transaction that
+        is rolled back. The records are read and serialized as usual; Neo4j's
+        t_first/t_last give the server-side time.
+        """
+        async with self.driver.session(database=settings.NEO4J_DATABASE) as session:
+            self._neo4j_session = session
+            tx = await session.begin_transaction(timeout=timeout)
+            try:
+                started = time.perf_counter()
+                result = await tx.run(f"PROFILE {query}", params)
+                records = []
+                async for record in result:
+                    records.append(record)
+                    if len(records) > max_rows:
+                        break
+                summary = await result.consume()
+                fetch_ms = _elapsed_ms(started)
+            finally:
+                self._neo4j_session = None
+                await tx.close()
+
+        truncated = len(records) > max_rows
+        records = records[:max_rows]
+        server_times = [summary.result_available_after, summary.result_consumed_after]
+        execution_ms = None if server_times[0] is None else float(sum(t or 0 for t in server_times))
+        serialization_ms = _serialize(records, lambda record: dict(record.items()))
+        return {
+            "status": "success",
+            "plan": summary.profile,
+            "count": len(records),
+            "truncated": truncated,
+            "timings_ms": _timings(fetch_ms, execution_ms, serialization_ms),
+        }
+
+    async def profile(self, query_type: str, query: str, params: Dict[str, Any], max_rows: int, timeout: float) -> Dict[str, Any]:
+        if query_type == "sql":
+            return await self.profile_sql(query, params, max_rows, timeout)
+        return await self.profile_cypher(query, params, max_rows, timeout)
+
+    async def fetch_sql_records(
+        self, query: str, params: Dict[str, Any], limit: int, timeout: float
+    ) -> Tuple[List[str], List[tuple]]:
+        """Column names and up to ``limit`` row tuples; more rows raise TooManyRows. Nothing is committed."""
+        await self._prepare_sql(timeout)
+        try:
+            result = await self.db.execute(text(query), params)
+            if not result.returns_rows:
+                raise ValueError("The SQL statement must return rows")
+            columns = list(result.keys())
+            rows = [tuple(row) for row in result.fetchmany(limit + 1)]
+            result.close()
+        finally:
+            await self.db.rollback()
+        if len(rows) > limit:
+            raise TooManyRows(f"The SQL statement returned more than {limit} rows")
+        return columns, rows
+
+    @measured("cypher")
+    async def fetch_cypher_records(
+        self, query: str, params: Dict[str, Any], limit: int, timeout: float
+    ) -> Tuple[List[str], List[tuple]]:
+        """Like fetch_sql_records; the statement runs in a transaction that is rolled back."""
+        async with self.driver.session(database=settings.NEO4J_DATABASE, fetch_size=settings.QUERY_STREAM_FETCH_SIZE) as session:
+            self._neo4j_session = session
+            tx = await session.begin_transaction(timeout=timeout)
+            try:
+                result = await tx.run(query, params)
+                columns = list(await result.keys())
+                rows = []
+                async for record in result:
+                    if len(rows) == limit:
+                        raise TooManyRows(f"The Cypher statement returned more than {limit} rows")
+                    rows.append(tuple(record.values()))
+            finally:
+                self._neo4j_session = None
+                await tx.close()
+        return columns, rows
+
+    async def cancel(self) -> None:
+        """Cancel the statement in flight on the server."""
+        if self._neo4j_session is not None:
+            # Drops the connection; Neo4j terminates the transaction it was running
+            self._neo4j_session.cancel()
+        if self._backend_pid is not None:
+            async with self.db.bind.connect() as conn:
+                await conn.execute(text("SELECT pg_cancel_backend(:pid)"), {"pid": self._backend_pid})
+
+    async def run_until_disconnected(self, work: Awaitable[T], is_disconnected: Callable[[], Awaitable[bool]]) -> T:
+        return await run_until_disconnected(work, is_disconnected, self.cancel)
+
+    async def open_sql_stream(self, query: str, params: Dict[str, Any], timeout: float) -> Tuple[List[str], Rows]:
+        """
+        Execute SQL through a server-side cursor. Rows are fetched in batches of
+        QUERY_STREAM_FETCH_SIZE as the returned iterator is consumed.
+        Raises ValueError for statements that do not return rows.
+        """
+        await self._prepare_sql(timeout)
+        result = await self.db.stream(text(query), params)
+        try:
+            columns = list(result.keys())
+        except ResourceClosedError:
+            await self.db.rollback()
+            raise ValueError("Streaming requires a statement that returns rows")
+
+        async def rows():
+            count = 0
+            try:
+                async for partition in result.mappings().partitions(settings.QUERY_STREAM_FETCH_SIZE):
+                    for row in partition:
+                        count += 1
+                        yield dict(row)
+            finally:
+                QUERY_RESULT_ROWS.labels("sql", "stream").observe(count)
+                await result.close()
+
+        return columns, rows()
+
+    async def open_sql_write(
+        self, query: str, params: Dict[str, Any], timeout: float
+    ) -> Tuple[List[str], Rows, Optional[int]]:
+        """
+        Execute SQL that may not return rows, without committing. Returns the
+        columns and rows of a RETURNING clause (buffered by the driver), or no
+        columns and the number of affected rows.
+        """
+        await self._prepare_sql(timeout)
+        result = await self.db.execute(text(query), params)
+        returns_rows = result.returns_rows
+        columns = list(result.keys()) if returns_rows else []
+        rowcount = None if returns_rows else result.rowcount
+
+        async def rows():
+            if not returns_rows:
+                return
+            count = 0
+            try:
+                for row in result.mappings():
+                    count += 1
+                    yield dict(row)
+            finally:
+                QUERY_RESULT_ROWS.labels("sql", "stream").observe(count)
+                result.close()
+
+        return columns, rows(), rowcount
+
+    async def open_cypher_stream(self, query: str, params: Dict[str, Any], timeout: float) -> Tuple[List[str], Rows]:
+        """
+        Run Cypher and iterate its records lazily; the driver pulls
+        QUERY_STREAM_FETCH_SIZE records at a time. The session stays open
+        until the returned iterator is exhausted or closed.
+        """
+        session = self.driver.session(database=settings.NEO4J_DATABASE, fetch_size=settings.QUERY_STREAM_FETCH_SIZE)
+        try:
+            result = await session.run(Query(query, timeout=timeout), params)
+            columns = list(await result.keys())
+        except BaseException:
+            await session.close()
+            raise
+
+        async def rows():
+            count = 0
+            try:
+                async for record in result:
+                    count += 1
+                    yield dict(record.items())
+            finally:
+                QUERY_RESULT_ROWS.labels("cypher", "stream").observe(count)
+                await session.close()
+
+        return columns, rows()
+
+    async def open_stream(self, query_type: str, query: str, params: Dict[str, Any], timeout: float) -> Tuple[List[str], Rows]:
+        if query_type == "sql":
+            return await self.open_sql_stream(query, params, timeout)
+        return await self.open_cypher_stream(query, params, timeout)
+
+
+class QueryBatch:
+    """
+    Runs the statements of a /query/batch request. Independent statements run
+    concurrently (up to QUERY_BATCH_CONCURRENCY), each on its own pooled
+    connection. Dependent statements run in order, next to the independent
+    ones, inside one SQL transaction and one Neo4j transaction; the first
+    failure rolls both back. The two transactions are committed one after
+    the other, not atomically. Independent read-only SQL goes to ``read_db``'s
+    engine when one is given.
+    """
+
+    def __init__(self, db: AsyncSession, driver: AsyncDriver, read_db: Optional[AsyncSession] = None):
+        self.db = db
+        self.driver = driver
+        self.session_factory = async_sessionmaker(db.bind, expire_on_commit=False)
+        self.read_session_factory = async_sessionmaker((read_db or db).bind, expire_on_commit=False)
+        self._services: List[QueryService] = []
+
+    async def run(self, statements: List[Statement], max_rows: int, timeout: float) -> List[Dict[str, Any]]:
+        results: List[Optional[Dict[str, Any]]] = [None] * len(statements)
+        semaphore = asyncio.Semaphore(settings.QUERY_BATCH_CONCURRENCY)
+
+        async def independent(index: int, statement: Statement):
+            async with semaphore:
+                results[index] = await self._run_independent(statement, max_rows, timeout)
+
+        work = [independent(index, statement) for index, statement in enumerate(statements) if not statement.dependent]
+        dependent = [(index, statement) for index, statement in enumerate(statements) if statement.dependent]
+        if dependent:
+            work.append(self._run_dependent(dependent, results, max_rows, timeout))
+        await asyncio.gather(*work)
+        return results
+
+    async def cancel(self) -> None:
+        for service in list(self._services):
+            with suppress(Exception):
+                await service.cancel()
+
+    async def _run_independent(self, statement: Statement, max_rows: int, timeout: float) -> Dict[str, Any]:
+        read_only = statement.query_type == "sql" and is_read_only("sql", statement.query)
+        async with (self.read_session_factory if read_only else self.session_factory)() as db:
+            service = QueryService(db, self.driver)
+            self._services.append(service)
+            try:
+                if statement.query_type == "sql":
+                    return await service.execute_sql(statement.query, statement.params, max_rows, timeout)
+                return await service.execute_cypher(statement.query, statement.params, max_rows, timeout)
+            except Exception as e:
+                if statement.query_type == "sql":
+                    await db.rollback()
+                return _error(statement.query_type, e)
+            finally:
+                self._services.remove(service)
+
+    async def _run_dependent(
+        self, statements: List[Tuple[int, Statement]], results: List[Optional[Dict[str, Any]]], max_rows: int, timeout: float
+    ) -> None:
+        service = QueryService(self.db, self.driver)
+        self._services.append(service)
+        session = tx = None
+        committed = False
+        try:
+            for position, (index, statement) in enumerate(statements):
+                try:
+                    if statement.query_type == "sql":
+                        results[index] = await service.execute_sql(
+                            statement.query, statement.params, max_rows, timeout, commit=False
+                        )
+                        continue
+                    if tx is None:
+                        session = self.driver.session(database=settings.NEO4J_DATABASE)
+                        service._neo4j_session = session
+                        tx = await session.begin_transaction(timeout=timeout)
+                    results[index] = await _collect_records(await tx.run(statement.query, statement.params), max_rows)
+                except Exception as e:
+                    results[index] = _error(statement.query_type, e)
+                    for earlier, _ in statements[:position]:
+                        results[earlier] = {"status": "rolled_back"}
+                    for later, _ in statements[position + 1:]:
+                        results[later] = {"status": "skipped"}
+                    return
+            if tx is not None:
+                await tx.commit()
+            await self.db.commit()
+            committed = True
+        finally:
+            self._services.remove(service)
+            if tx is not None:
+                await tx.close()
+            if session is not None:
+                await session.close()
+            if not committed:
+                await self.db.rollback()
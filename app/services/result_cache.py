@@ -0,0 +1,67 @@
+"""
+Opt-in cache of /query results.
+
+Entries are keyed on the session, the normalized statement, its parameters
+and the session's data version: the ids and write counters of all its
+datasets. Any write through the API bumps a counter, so cached results of
+the session stop matching without explicit invalidation; the TTL bounds
+staleness from writes that bypass the API.
+"""
+import hashlib
+import json
+from typing import Any, Dict
+
+from sqlalchemy import select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import ByteLRUCache
+from app.core.config import settings
+from app.models.graph import GraphDataset
+from app.models.tabular import TabularDataset
+from app.services.query_analysis import normalize_query
+
+result_cache = ByteLRUCache(
+    max_bytes=settings.QUERY_CACHE_MAX_BYTES,
+    ttl_seconds=settings.QUERY_CACHE_TTL_SECONDS,
+    max_entry_bytes=settings.QUERY_CACHE_MAX_ENTRY_BYTES,
+    spill_dir=settings.QUERY_CACHE_SPILL_DIR,
+    spill_max_bytes=settings.QUERY_CACHE_SPILL_MAX_BYTES,
+)
+
+
+async def session_data_version(db: AsyncSession, session_id: str) -> str:
+    """Fingerprint of the session's datasets and their write counters."""
+    query = union_all(
+        select(TabularDataset.id, TabularDataset.write_version).where(TabularDataset.session_id == session_id),
+        select(GraphDataset.id, GraphDataset.write_version).where(GraphDataset.session_id == session_id),
+    )
+    rows = (await db.execute(query)).all()
+    return ",".join(f"{dataset_id}:{version}" for dataset_id, version in sorted(rows))
+
+
+async def dataset_write_version(db: AsyncSession, dataset: Any) -> int:
+    """The dataset's current write counter; the ownership check may have served a cached row."""
+    model = type(dataset)
+    return (await db.execute(select(model.write_version).where(model.id == dataset.id))).scalar_one()
+
+
+async def bump_write_version(db: AsyncSession, dataset: Any) -> None:
+    """Mark a tabular or graph dataset as changed."""
+    model = type(dataset)
+    await db.execute(update(model).where(model.id == dataset.id).values(write_version=model.write_version + 1))
+    await db.commit()
+
+
+async def bump_session_write_versions(db: AsyncSession, session_id: str) -> None:
+    """Mark every dataset of the session as changed, e.g. after a raw write statement."""
+    for model in (TabularDataset, GraphDataset):
+        await db.execute(update(model).where(model.session_id == session_id).values(write_version=model.write_version + 1))
+    await db.commit()
+
+
+def cache_key(session_id: str, query_type: str, query: str, params: Dict[str, Any], data_version: str, max_rows: int) -> str:
+    payload = json.dumps(
+        [session_id, query_type, normalize_query(query), params, data_version, max_rows],
+        sort_keys=True, default=str, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
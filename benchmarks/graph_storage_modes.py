@@ -0,0 +1,90 @@
+"""
+Benchmark graph dataset isolation modes against a live Neo4j.
+
+Creates many small datasets in each storage mode, then issues key lookups
+(get_neighbors) spread across all of them. With per-dataset labels every
+dataset produces distinct Cypher text and needs its own plan; with the
+shared label the text is identical and plans are reused.
+
+    PYTHONPATH=. python benchmarks/graph_storage_modes.py --datasets 500 --nodes 50 --queries 5000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+from app.core.neo4j_db import init_neo4j, close_neo4j, get_neo4j_driver
+from app.services.graph_service import GraphService, STORAGE_MODES, DATASET_ID_PROPERTY, NODE_KEY_PROPERTY
+
+
+async def populate(service: GraphService, dataset_id: str, nodes: int):
+    await service.create_schema(dataset_id, [], [], [])
+    dataset_set = f", n.{DATASET_ID_PROPERTY} = $dataset_id" if service.storage_mode == "property" else ""
+    query = (
+        "UNWIND range(0, $nodes - 1) AS i "
+        f"CREATE (n:{service._isolation_label(dataset_id)}:Item) "
+        f"SET n.{NODE_KEY_PROPERTY} = toString(i){dataset_set} "
+        "WITH collect(n) AS created "
+        "UNWIND range(0, size(created) - 2) AS i "
+        "WITH created[i] AS a, created[i + 1] AS b "
+        "CREATE (a)-[:NEXT]->(b)"
+    )
+    async with service.driver.session() as session:
+        result = await session.run(query, nodes=nodes, dataset_id=dataset_id)
+        await result.consume()
+
+
+async def run_mode(driver, mode: str, datasets: int, nodes: int, queries: int):
+    service = GraphService(driver, storage_mode=mode)
+    dataset_ids = [str(uuid.uuid4()) for _ in range(datasets)]
+    for dataset_id in dataset_ids:
+        await populate(service, dataset_id, nodes)
+
+    async with driver.session() as session:
+        result = await session.run("CALL db.clearQueryCaches()")
+        await result.consume()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(queries):
+        dataset_id = random.choice(dataset_ids)
+        t0 = time.perf_counter()
+        await service.get_neighbors(dataset_id, str(random.randrange(nodes)))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+
+    for dataset_id in dataset_ids:
+        await service.delete_dataset(dataset_id)
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "qps": queries / elapsed,
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95)],
+    }
+
+
+async def main(args):
+    await init_neo4j()
+    try:
+        driver = get_neo4j_driver()
+        results = [await run_mode(driver, mode, args.datasets, args.nodes, args.queries) for mode in STORAGE_MODES]
+    finally:
+        await close_neo4j()
+
+    print(f"{args.datasets} datasets x {args.nodes} nodes, {args.queries} random key lookups")
+    print(f"{'mode':<10}{'qps':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for r in results:
+        print(f"{r['mode']:<10}{r['qps']:>10.0f}{r['mean_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datasets", type=int, default=500)
+    parser.add_argument("--nodes", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=5000)
+    asyncio.run(main(parser.parse_args()))
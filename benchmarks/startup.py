@@ -0,0 +1,67 @@
+"""
+Measure worker cold start and fail when it regresses past a budget.
+
+Each run starts a fresh interpreter, imports app.main ("import") and then
+serves a first /health request in-process ("boot": import plus building the
+middleware stack and routing one request; the lifespan handler is not run,
+so no database is needed). The median of the runs is compared against the
+budgets, and the modules that must stay lazy are checked to be unimported.
+Exits non-zero on any failure, so it can gate CI.
+
+    PYTHONPATH=. python benchmarks/startup.py --runs 5 --import-budget 3.0 --boot-budget 3.5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Imported by the code paths that use them, never at startup
+LAZY_MODULES = ("networkx", "pyinstrument", "app.services.graph_analytics")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+TestClient(app.main.app).get("/health").raise_for_status()
+booted = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "boot": booted - started,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def probe() -> dict:
+    output = subprocess.run([sys.executable, "-c", PROBE], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(args) -> int:
+    runs = [probe() for _ in range(args.runs)]
+    failures = []
+    print(f"{args.runs} cold starts")
+    print(f"{'phase':<8}{'median s':>10}{'min s':>10}{'max s':>10}{'budget s':>10}")
+    for phase, budget in (("import", args.import_budget), ("boot", args.boot_budget)):
+        seconds = [run[phase] for run in runs]
+        median = statistics.median(seconds)
+        print(f"{phase:<8}{median:>10.3f}{min(seconds):>10.3f}{max(seconds):>10.3f}{budget:>10.3f}")
+        if median > budget:
+            failures.append(f"{phase} took {median:.3f}s, over the {budget:.3f}s budget")
+    loaded = sorted({name for run in runs for name in run["loaded"]})
+    if loaded:
+        failures.append(f"imported at startup: {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=3.0)
+    parser.add_argument("--boot-budget", type=float, default=3.5)
+    sys.exit(main(parser.parse_args()))
@@ -5,7 +5,7 @@ setup(
     version="0.1.0",
     packages=find_packages(),
     install_requires=[
-        "fastapi>=0.111.0",
+        "fastapi>=0.118.0",
         "uvicorn[standard]>=0.30.0",
         "sqlalchemy>=2.0.30",
         "asyncpg>=0.29.0",
@@ -13,9 +13,15 @@ setup(
         "pydantic>=2.7.0",
         "pydantic-settings>=2.2.0",
         "python-multipart>=0.0.9",
+        "orjson>=3.9.0",
         "requests>=2.31.0",
         "pandas>=2.2.0",
         "networkx>=3.3",
+        "numpy>=1.26.0",
+        "prometheus-client>=0.20.0",
+        "pyinstrument>=4.6.0",
+        "gunicorn>=22.0.0",
+        "uvicorn-worker>=0.2.0",
     ],
     extras_require={
         "test": [
@@ -85,6 +85,12 @@ def mock_neo4j_driver():
     # Setup basic mock behavior
     mock_driver.session.return_value.__aenter__.return_value = mock_session
     mock_driver.session.return_value.__aexit__.return_value = None
+
+    # Managed transaction functions run against the session mock (tx.run is session.run)
+    async def execute(work, *args, **kwargs):
+        return await work(mock_session, *args, **kwargs)
+    mock_session.execute_read.side_effect = execute
+    mock_session.execute_write.side_effect = execute
     
     return mock_driver
 
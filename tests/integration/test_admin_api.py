@@ -0,0 +1,110 @@
+"""
+Integration tests for Admin API endpoints.
+"""
+from collections import OrderedDict
+from unittest.mock import patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.config import settings
+from app.core.query_stats import query_stats
+from tests.conftest import TEST_USER_ID
+
+
+pytestmark = pytest.mark.integration
+
+
+class TestPoolsAPI:
+    """Tests for /api/v1/admin/pools endpoint."""
+
+    async def test_requires_admin_key(self, test_client: AsyncClient, auth_headers):
+        """Test that keys outside ADMIN_KEYS are rejected."""
+        response = await test_client.get("/api/v1/admin/pools", headers=auth_headers)
+        assert response.status_code == 403
+
+    async def test_reports_pools(self, test_client: AsyncClient, auth_headers):
+        """Test that pool metrics are reported for admin keys."""
+        with patch.object(settings, "ADMIN_KEYS", [TEST_USER_ID]):
+            response = await test_client.get("/api/v1/admin/pools", headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["postgres"]["class"] == "InstrumentedAsyncPool"
+        assert {"checked_out", "waits", "wait_seconds_total", "utilization"} <= set(data["postgres"])
+        assert data["postgres_replica"] is None
+
+
+class TestMetricsEndpoint:
+    """Tests for the /metrics endpoint."""
+
+    async def test_exposes_request_and_pool_metrics(self, test_client: AsyncClient, auth_headers):
+        """Test that requests are recorded per route template and pool gauges are exported."""
+        await test_client.get("/api/v1/sessions/", headers=auth_headers)
+
+        response = await test_client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert 'diaas_http_request_duration_seconds_count{method="GET",route="/api/v1/sessions/",status="200"}' in body
+        assert 'diaas_pool_connections{pool="postgres",state="in_use"}' in body
+        assert "diaas_http_requests_in_progress" in body
+
+
+class TestRequestTiming:
+    """Tests for the Server-Timing header and admin request profiles."""
+
+    async def test_server_timing_header(self, test_client: AsyncClient, auth_headers, test_session):
+        """Test that ownership time and the total are reported per request."""
+        response = await test_client.get(f"/api/v1/sessions/{test_session.id}", headers=auth_headers)
+
+        assert response.status_code == 200
+        phases = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+        assert {"ownership", "total"} <= set(phases)
+        assert "x-profile-id" not in response.headers
+
+    async def test_profile_requires_admin(self, test_client: AsyncClient, auth_headers):
+        """Test that X-Profile is ignored for keys outside ADMIN_KEYS."""
+        response = await test_client.get("/api/v1/sessions/", headers={**auth_headers, "X-Profile": "1"})
+
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
+
+    async def test_admin_profile(self, test_client: AsyncClient, auth_headers, tmp_path):
+        """Test that an admin request with X-Profile: 1 stores a profile that can be rendered."""
+        # The middleware checks the raw key; the routes see the overridden user id
+        admin_keys = [TEST_USER_ID, auth_headers["X-API-Key"]]
+        with patch.object(settings, "ADMIN_KEYS", admin_keys), patch.object(settings, "PROFILE_DIR", str(tmp_path)):
+            response = await test_client.get("/api/v1/sessions/", headers={**auth_headers, "X-Profile": "1"})
+            assert response.status_code == 200
+            profile_id = response.headers["x-profile-id"]
+
+            html = await test_client.get(f"/api/v1/admin/profiles/{profile_id}", headers=auth_headers)
+            text = await test_client.get(f"/api/v1/admin/profiles/{profile_id}?format=text", headers=auth_headers)
+            missing = await test_client.get("/api/v1/admin/profiles/../../etc", headers=auth_headers)
+
+        assert html.status_code == 200
+        assert html.headers["content-type"].startswith("text/html")
+        assert text.status_code == 200
+        assert missing.status_code == 404
+
+
+class TestTopQueriesAPI:
+    """Tests for /api/v1/admin/queries endpoint."""
+
+    async def test_top_queries(self, test_client: AsyncClient, auth_headers):
+        """Test that statement statistics are listed and can be reset."""
+        with patch.object(query_stats, "_entries", OrderedDict()):
+            query_stats.observe("cypher", "MATCH (n:Graph_0a1b2c3d_1111_2222_3333_444455556666) RETURN n", 0.2, 3)
+            with patch.object(settings, "ADMIN_KEYS", [TEST_USER_ID]):
+                response = await test_client.get("/api/v1/admin/queries?query_type=cypher", headers=auth_headers)
+                reset = await test_client.delete("/api/v1/admin/queries", headers=auth_headers)
+            remaining = query_stats.top(10)
+
+        assert response.status_code == 200
+        statements = response.json()["statements"]
+        assert statements[0]["query"] == "match (n:graph_?) return n"
+        assert statements[0]["rows"] == 3
+        assert reset.status_code == 204
+        assert remaining == []
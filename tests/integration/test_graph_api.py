@@ -3,6 +3,9 @@ Integration tests for Graph Data API endpoints.
 """
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.models.graph import GraphDataset
 
 
 pytestmark = pytest.mark.integration
@@ -27,6 +30,154 @@ class TestGraphDatasetAPI:
         assert data["session_id"] == test_session.id
         assert "id" in data
     
+    async def test_create_graph_dataset_with_indexes(
+        self, test_client: AsyncClient, test_session, auth_headers, mock_neo4j_driver
+    ):
+        """Test that declared key and indexed properties create schema in Neo4j."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph",
+            json={"name": "people", "key_properties": ["email"], "indexed_properties": ["age"]},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        mock_session = mock_neo4j_driver.session.return_value.__aenter__.return_value
+        # Node key constraint, email constraint, age index
+        assert mock_session.run.call_count == 3
+
+    async def test_create_graph_dataset_invalid_property(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test that an invalid property name is rejected."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph",
+            json={"name": "people", "key_properties": ["bad name"]},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 400
+
+    async def test_failed_schema_cleanup_still_removes_dataset(
+        self, test_client: AsyncClient, test_session, auth_headers, mock_neo4j_driver, test_db
+    ):
+        """Test that the dataset row is removed even when dropping the partial schema fails too."""
+        mock_session = mock_neo4j_driver.session.return_value.__aenter__.return_value
+        mock_session.run.side_effect = RuntimeError("neo4j down")
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph",
+            json={"name": "people", "key_properties": ["email"]},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 400
+        assert "neo4j down" in response.json()["detail"]
+        datasets = (await test_db.execute(select(GraphDataset).where(GraphDataset.name == "people"))).scalars().all()
+        assert datasets == []
+
+    async def test_failed_subgraph_cleanup_still_removes_dataset(
+        self, test_client: AsyncClient, test_session, test_graph_dataset, auth_headers, mock_neo4j_driver, test_db
+    ):
+        """Test that a failed extraction removes the new dataset row even when the Neo4j cleanup fails too."""
+        mock_session = mock_neo4j_driver.session.return_value.__aenter__.return_value
+        mock_session.run.side_effect = RuntimeError("neo4j down")
+        mock_session.execute_read.side_effect = RuntimeError("neo4j down")
+        mock_session.execute_write.side_effect = RuntimeError("neo4j down")
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph/{test_graph_dataset.id}/subgraph",
+            json={"name": "extracted", "node_keys": ["a", "b"]},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 400
+        assert "neo4j down" in response.json()["detail"]
+        datasets = (await test_db.execute(select(GraphDataset).where(GraphDataset.name == "extracted"))).scalars().all()
+        assert datasets == []
+
+    async def test_list_indexes(
+        self, test_client: AsyncClient, test_session, test_graph_dataset, auth_headers
+    ):
+        """Test listing index state of a graph dataset."""
+        response = await test_client.get(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph/{test_graph_dataset.id}/indexes",
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"constraints": [], "indexes": []}
+
+    async def test_delete_graph_dataset(
+        self, test_client: AsyncClient, test_session, test_graph_dataset, auth_headers
+    ):
+        """Test deleting a graph dataset."""
+        response = await test_client.delete(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph/{test_graph_dataset.id}",
+            headers=auth_headers
+        )
+
+        assert response.status_code == 204
+
+        response = await test_client.get(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph/{test_graph_dataset.id}/indexes",
+            headers=auth_headers
+        )
+        assert response.status_code == 404
+
+    async def test_graph_stats_requires_dataset(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test that stats of an unknown dataset return 404."""
+        response = await test_client.get(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph/unknown/stats",
+            headers=auth_headers
+        )
+
+        assert response.status_code == 404
+
+    async def test_extract_subgraph_requires_one_selection(
+        self, test_client: AsyncClient, test_session, test_graph_dataset, auth_headers
+    ):
+        """Test that a subgraph must be selected by exactly one method."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph/{test_graph_dataset.id}/subgraph",
+            json={"name": "subset", "node_keys": ["a"], "seed_keys": ["b"]},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 422
+
+    async def test_transient_neo4j_error_returns_503(
+        self, test_client: AsyncClient, test_session, test_graph_dataset, auth_headers, mock_neo4j_driver
+    ):
+        """Test that transient errors surviving the driver's retries map to 503."""
+        from neo4j.exceptions import TransientError
+
+        mock_session = mock_neo4j_driver.session.return_value.__aenter__.return_value
+        mock_session.execute_read.side_effect = TransientError("deadlock detected")
+        response = await test_client.get(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph/{test_graph_dataset.id}/nodes",
+            headers=auth_headers
+        )
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+
+    async def test_duplicate_node_key_returns_409(
+        self, test_client: AsyncClient, test_session, test_graph_dataset, auth_headers, mock_neo4j_driver
+    ):
+        """Test that a node key rejected by the uniqueness constraint maps to 409."""
+        from neo4j.exceptions import ConstraintError
+
+        mock_session = mock_neo4j_driver.session.return_value.__aenter__.return_value
+        mock_session.execute_write.side_effect = ConstraintError("Node already exists with _key = 'alice'")
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph/{test_graph_dataset.id}/nodes",
+            json={"label": "Person", "key": "alice", "properties": {}},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 409
+        assert "alice" in response.json()["detail"]
+
     async def test_create_node(
         self,
         test_client: AsyncClient,
@@ -94,6 +245,53 @@ class TestGraphDatasetAPI:
         
         assert response.status_code in [200, 500]
     
+    async def test_create_edge_by_key(
+        self, test_client: AsyncClient, test_session, test_graph_dataset, auth_headers
+    ):
+        """Test creating an edge between nodes addressed by key."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph/{test_graph_dataset.id}/edges",
+            json={"from_key": "alice", "to_key": "bob", "type": "KNOWS"},
+            headers=auth_headers
+        )
+
+        assert response.status_code in [200, 400, 500]
+
+    async def test_create_edge_without_endpoints_fails(
+        self, test_client: AsyncClient, test_session, test_graph_dataset, auth_headers
+    ):
+        """Test that an edge needs a key or id for both endpoints."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph/{test_graph_dataset.id}/edges",
+            json={"from_key": "alice", "type": "KNOWS"},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 422
+
+    async def test_create_edges_batch_rejects_invalid_type(
+        self, test_client: AsyncClient, test_session, test_graph_dataset, auth_headers
+    ):
+        """Test that relationship types in bulk loads are validated."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph/{test_graph_dataset.id}/edges/batch",
+            json={"edges": [{"from_key": "a", "to_key": "b", "type": "BAD TYPE"}]},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 400
+
+    async def test_get_neighbors_by_key(
+        self, test_client: AsyncClient, test_session, test_graph_dataset, auth_headers
+    ):
+        """Test getting neighbors of a node addressed by key."""
+        response = await test_client.get(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph/{test_graph_dataset.id}/nodes/by-key/alice/neighbors",
+            headers=auth_headers
+        )
+
+        assert response.status_code in [200, 500]
+
     async def test_get_neighbors(
         self,
         test_client: AsyncClient,
@@ -1,8 +1,16 @@
 """
 Integration tests for Query and Export API endpoints.
 """
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
 import pytest
 from httpx import AsyncClient
+from neo4j import Record
+
+from app.core.config import settings
+from app.core.rate_limit import rate_limiter
 
 
 pytestmark = pytest.mark.integration
@@ -48,6 +56,208 @@ class TestQueryAPI:
         # Will depend on Neo4j mock
         assert response.status_code in [200, 400, 500]
     
+    async def test_sql_json_row_cap(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test that JSON results are capped at max_rows and flagged as truncated."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query",
+            json={
+                "query": "SELECT 1 AS n UNION ALL SELECT 2 UNION ALL SELECT 3",
+                "type": "sql",
+                "max_rows": 2
+            },
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 2
+        assert data["truncated"] is True
+
+    async def test_cypher_timeout_is_sent_to_neo4j(
+        self, test_client: AsyncClient, test_session, auth_headers, mock_neo4j_driver
+    ):
+        """Test that the requested timeout is bounded and attached to the Cypher query."""
+        mock_session = mock_neo4j_driver.session.return_value.__aenter__.return_value
+        result = MagicMock()
+        result.__aiter__.return_value = []
+        mock_session.run.return_value = result
+
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query",
+            json={"query": "RETURN 1", "type": "cypher", "timeout_seconds": 10**6},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        query = mock_session.run.call_args.args[0]
+        assert query.text == "RETURN 1"
+        assert query.timeout == settings.QUERY_TIMEOUT_SECONDS
+
+    async def test_profile_sql(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test profiling SQL returns the plan and a timing breakdown instead of rows."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query",
+            json={"query": "SELECT 1 AS n UNION ALL SELECT 2", "type": "sql", "profile": True},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert "data" not in data
+        assert data["count"] == 2
+        assert data["plan"]
+        assert set(data["timings_ms"]) == {"total", "fetch", "execution", "network", "serialization"}
+
+    async def test_profile_cypher_is_rolled_back(
+        self, test_client: AsyncClient, test_session, auth_headers, mock_neo4j_driver
+    ):
+        """Test profiling Cypher runs PROFILE in a transaction that is closed without commit."""
+        mock_session = mock_neo4j_driver.session.return_value.__aenter__.return_value
+        tx = mock_session.begin_transaction.return_value
+        result = MagicMock()
+        result.__aiter__.return_value = [Record({"n": 1})]
+        result.consume = AsyncMock(return_value=MagicMock(
+            profile={"operatorType": "ProduceResults@neo4j", "dbHits": 0},
+            result_available_after=2,
+            result_consumed_after=1
+        ))
+        tx.run.return_value = result
+
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query",
+            json={"query": "RETURN 1 AS n", "type": "cypher", "profile": True},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["plan"]["operatorType"] == "ProduceResults@neo4j"
+        assert data["timings_ms"]["execution"] == 3.0
+        assert tx.run.call_args.args[0] == "PROFILE RETURN 1 AS n"
+        tx.close.assert_awaited_once()
+        tx.commit.assert_not_called()
+
+    async def test_stream_sql_ndjson(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test streaming SQL rows as NDJSON with a row cap."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query",
+            json={
+                "query": "SELECT 1 AS n UNION ALL SELECT 2 UNION ALL SELECT 3",
+                "type": "sql",
+                "format": "ndjson",
+                "max_rows": 2
+            },
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = response.text.splitlines()
+        assert lines[:2] == ['{"n":1}', '{"n":2}']
+        assert '"reason":"max_rows"' in lines[2]
+
+    async def test_stream_sql_csv(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test streaming SQL rows as CSV."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query",
+            json={"query": "SELECT 1 AS n, 'a,b' AS s", "type": "sql", "format": "csv"},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert response.text.splitlines() == ["n,s", '1,"a,b"']
+
+    async def test_stream_rejects_statement_without_rows(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test that streaming a statement without a result set returns 400."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query",
+            json={"query": "CREATE TABLE streamed (a INTEGER)", "type": "sql", "format": "ndjson"},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 400
+
+    async def test_result_cache_hit_and_write_invalidation(
+        self, test_client: AsyncClient, test_session, test_graph_dataset, auth_headers
+    ):
+        """Test cached read-only results until a dataset of the session is written."""
+        url = f"/api/v1/sessions/{test_session.id}/query"
+        body = {"query": "SELECT 1 AS n", "type": "sql", "cache": True}
+
+        first = await test_client.post(url, json=body, headers=auth_headers)
+        second = await test_client.post(url, json={**body, "query": "SELECT 1\n  AS n;"}, headers=auth_headers)
+        assert first.headers["x-query-cache"] == "miss"
+        assert second.headers["x-query-cache"] == "hit"
+        assert second.json()["data"] == [{"n": 1}]
+
+        await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/datasets/graph/{test_graph_dataset.id}/nodes",
+            json={"label": "Person", "properties": {}},
+            headers=auth_headers
+        )
+        third = await test_client.post(url, json=body, headers=auth_headers)
+        assert third.headers["x-query-cache"] == "miss"
+
+    async def test_result_cache_skips_writes(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test that statements that are not provably read-only bypass the cache."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query",
+            json={"query": "SELECT random() AS r", "type": "sql", "cache": True},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert "x-query-cache" not in response.headers
+
+    async def test_volatile_read_does_not_bump_write_versions(
+        self, test_client: AsyncClient, test_session, test_graph_dataset, auth_headers
+    ):
+        """Test that a read that is merely not cacheable leaves the session's write versions alone."""
+        url = f"/api/v1/sessions/{test_session.id}/query"
+        version = {"query": "SELECT write_version FROM graph_datasets", "type": "sql"}
+        before = (await test_client.post(url, json=version, headers=auth_headers)).json()["data"]
+
+        for body in (
+            {"query": "SELECT random() AS r", "type": "sql"},
+            {"query": "SELECT random() AS r", "type": "sql", "format": "ndjson"},
+        ):
+            assert (await test_client.post(url, json=body, headers=auth_headers)).status_code == 200
+
+        assert (await test_client.post(url, json=version, headers=auth_headers)).json()["data"] == before
+
+    async def test_streamed_write_is_committed_after_the_cursor(
+        self, test_client: AsyncClient, test_session, test_graph_dataset, auth_headers
+    ):
+        """Test that a streamed INSERT ... RETURNING is committed and bumps the write versions once read."""
+        url = f"/api/v1/sessions/{test_session.id}/query"
+        version = {"query": "SELECT write_version FROM graph_datasets", "type": "sql"}
+        before = (await test_client.post(url, json=version, headers=auth_headers)).json()["data"][0]["write_version"]
+        await test_client.post(url, json={"query": "CREATE TABLE streamed_writes (v TEXT)", "type": "sql"}, headers=auth_headers)
+
+        response = await test_client.post(
+            url,
+            json={"query": "INSERT INTO streamed_writes (v) VALUES ('a'), ('b') RETURNING v", "type": "sql", "format": "ndjson"},
+            headers=auth_headers
+        )
+
+        assert [json.loads(line) for line in response.text.splitlines()] == [{"v": "a"}, {"v": "b"}]
+        count = await test_client.post(url, json={"query": "SELECT count(*) AS n FROM streamed_writes", "type": "sql"}, headers=auth_headers)
+        assert count.json()["data"] == [{"n": 2}]
+        after = (await test_client.post(url, json=version, headers=auth_headers)).json()["data"][0]["write_version"]
+        assert after > before
+
     async def test_invalid_query_type(
         self, test_client: AsyncClient, test_session, auth_headers
     ):
@@ -80,6 +290,355 @@ class TestQueryAPI:
         
         assert response.status_code in [200, 400]
 
+    async def test_concurrent_query_limit(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test that a key with all query slots taken gets 429 and the slot is freed afterwards."""
+        tiers = {"default": {"concurrent_queries": 1}}
+        with patch.object(rate_limiter, "tiers", tiers):
+            rate_limiter.acquire(test_session.user_id, "query")
+            try:
+                refused = await test_client.post(
+                    f"/api/v1/sessions/{test_session.id}/query",
+                    json={"query": "SELECT 1 AS x", "type": "sql"},
+                    headers=auth_headers
+                )
+            finally:
+                rate_limiter.release(test_session.user_id, "query")
+            accepted = await test_client.post(
+                f"/api/v1/sessions/{test_session.id}/query",
+                json={"query": "SELECT 1 AS x", "type": "sql"},
+                headers=auth_headers
+            )
+
+        assert refused.status_code == 429
+        assert refused.headers["retry-after"] == "1"
+        assert accepted.status_code == 200
+        assert rate_limiter.in_use(test_session.user_id, "query") == 0
+
+
+class TestQueryBatchAPI:
+    """Tests for /api/v1/sessions/{id}/query/batch endpoint."""
+
+    async def test_batch_results_keep_order(
+        self, test_client: AsyncClient, test_session, auth_headers, mock_neo4j_driver
+    ):
+        """Test that SQL and Cypher statements come back in request order."""
+        mock_session = mock_neo4j_driver.session.return_value.__aenter__.return_value
+        result = MagicMock()
+        result.__aiter__.return_value = [Record({"nodes": 0})]
+        mock_session.run.return_value = result
+
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query/batch",
+            json={"statements": [
+                {"type": "sql", "query": "SELECT 1 AS n"},
+                {"type": "cypher", "query": "MATCH (n) RETURN count(n) AS nodes"},
+                {"type": "sql", "query": "SELECT 2 AS n"}
+            ]},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["data"] for r in results] == [[{"n": 1}], [{"nodes": 0}], [{"n": 2}]]
+
+    async def test_batch_dependent_failure_rolls_back(
+        self, test_client: AsyncClient, test_session, auth_headers, test_db
+    ):
+        """Test that a failing dependent statement rolls back the earlier ones and skips the rest."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query/batch",
+            json={"statements": [
+                {"type": "sql", "query": "UPDATE sessions SET name = 'renamed' WHERE id = :id",
+                 "params": {"id": test_session.id}, "dependent": True},
+                {"type": "sql", "query": "SELECT * FROM missing_table", "dependent": True},
+                {"type": "sql", "query": "SELECT 1", "dependent": True},
+                {"type": "sql", "query": "SELECT 1 AS n"}
+            ]},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        statuses = [r["status"] for r in response.json()["results"]]
+        assert statuses == ["rolled_back", "error", "skipped", "success"]
+        await test_db.refresh(test_session)
+        assert test_session.name == "Test Session"
+
+    async def test_batch_independent_returning_write_is_committed(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test that an independent INSERT ... RETURNING is persisted, not only reported."""
+        url = f"/api/v1/sessions/{test_session.id}/query"
+        await test_client.post(url, json={"query": "CREATE TABLE batch_writes (id INTEGER PRIMARY KEY, v TEXT)", "type": "sql"}, headers=auth_headers)
+
+        response = await test_client.post(
+            f"{url}/batch",
+            json={"statements": [
+                {"type": "sql", "query": "INSERT INTO batch_writes (v) VALUES ('a') RETURNING id"},
+                {"type": "sql", "query": "INSERT INTO batch_writes (v) VALUES ('b')"}
+            ]},
+            headers=auth_headers
+        )
+
+        assert [r["status"] for r in response.json()["results"]] == ["success", "success"]
+        rows = await test_client.post(url, json={"query": "SELECT v FROM batch_writes ORDER BY v", "type": "sql"}, headers=auth_headers)
+        assert rows.json()["data"] == [{"v": "a"}, {"v": "b"}]
+
+    async def test_batch_invalid_type(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test that an unknown statement type rejects the whole batch."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query/batch",
+            json={"statements": [{"type": "mongo", "query": "{}"}]},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 400
+
+
+class TestFederatedQueryAPI:
+    """Tests for /api/v1/sessions/{id}/query/federated endpoint."""
+
+    def mock_cypher(self, mock_neo4j_driver, columns, rows):
+        mock_session = mock_neo4j_driver.session.return_value.__aenter__.return_value
+        tx = mock_session.begin_transaction.return_value
+        result = MagicMock()
+        result.keys = AsyncMock(return_value=columns)
+        result.__aiter__.return_value = [Record(dict(zip(columns, row))) for row in rows]
+        tx.run.return_value = result
+        return tx
+
+    async def test_federated_join_streams_rows(
+        self, test_client: AsyncClient, test_session, auth_headers, mock_neo4j_driver
+    ):
+        """Test joining SQL rows with Cypher records on a declared key."""
+        tx = self.mock_cypher(mock_neo4j_driver, ["key", "degree"], [("a", 2), ("c", 1)])
+
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query/federated",
+            json={
+                "sql": {"query": "SELECT 'a' AS id, 10 AS revenue UNION ALL SELECT 'b', 20", "key": "id"},
+                "cypher": {"query": "MATCH (n) RETURN n._key AS key, 0 AS degree", "key": "key"},
+                "how": "left"
+            },
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert rows == [
+            {"id": "a", "revenue": 10, "key": "a", "degree": 2},
+            {"id": "b", "revenue": 20, "key": None, "degree": None},
+        ]
+        tx.commit.assert_not_called()
+
+    async def test_federated_missing_key(
+        self, test_client: AsyncClient, test_session, auth_headers, mock_neo4j_driver
+    ):
+        """Test that a join key missing from a result is a 400."""
+        self.mock_cypher(mock_neo4j_driver, ["key"], [("a",)])
+
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query/federated",
+            json={
+                "sql": {"query": "SELECT 'a' AS id", "key": "missing"},
+                "cypher": {"query": "RETURN 'a' AS key", "key": "key"}
+            },
+            headers=auth_headers
+        )
+
+        assert response.status_code == 400
+        assert "missing" in response.json()["detail"]
+
+    async def test_federated_oversized_input(
+        self, test_client: AsyncClient, test_session, auth_headers, mock_neo4j_driver
+    ):
+        """Test that an input over FEDERATED_MAX_INPUT_ROWS is a 413, not a partial join."""
+        self.mock_cypher(mock_neo4j_driver, ["key"], [("a",)])
+
+        with patch.object(settings, "FEDERATED_MAX_INPUT_ROWS", 1):
+            response = await test_client.post(
+                f"/api/v1/sessions/{test_session.id}/query/federated",
+                json={
+                    "sql": {"query": "SELECT 'a' AS id UNION ALL SELECT 'b'", "key": "id"},
+                    "cypher": {"query": "RETURN 'a' AS key", "key": "key"}
+                },
+                headers=auth_headers
+            )
+
+        assert response.status_code == 413
+        assert "more than 1 rows" in response.json()["detail"]
+
+
+class TestQueryJobsAPI:
+    """Tests for asynchronous /query jobs."""
+
+    @pytest.fixture(autouse=True)
+    def job_dir(self, tmp_path):
+        from app.services.query_jobs import query_jobs
+        with patch.object(query_jobs, "directory", str(tmp_path)), patch.object(query_jobs, "page_rows", 2):
+            yield tmp_path
+
+    async def wait_for_job(self, test_client, session_id, job_id, auth_headers):
+        for _ in range(100):
+            response = await test_client.get(f"/api/v1/sessions/{session_id}/query/jobs/{job_id}", headers=auth_headers)
+            if response.json()["status"] in ("succeeded", "failed", "cancelled"):
+                return response.json()
+            await asyncio.sleep(0.01)
+        raise AssertionError("query job did not finish")
+
+    async def test_job_results_are_paged(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test that an async query returns a job id and its results can be paged and streamed."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query",
+            json={"query": "SELECT 1 AS n UNION ALL SELECT 2 UNION ALL SELECT 3", "type": "sql", "async": True},
+            headers=auth_headers
+        )
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        job = await self.wait_for_job(test_client, test_session.id, job_id, auth_headers)
+        assert job["status"] == "succeeded"
+        assert job["row_count"] == 3
+        assert job["page_count"] == 2
+
+        url = f"/api/v1/sessions/{test_session.id}/query/jobs/{job_id}/results"
+        first = (await test_client.get(url, headers=auth_headers)).json()
+        assert first["data"] == [{"n": 1}, {"n": 2}]
+        assert first["next_page"] == 1
+        second = (await test_client.get(url, params={"page": 1}, headers=auth_headers)).json()
+        assert second["data"] == [{"n": 3}]
+        assert second["next_page"] is None
+
+        response = await test_client.get(url, params={"format": "ndjson"}, headers=auth_headers)
+        assert [json.loads(line) for line in response.text.splitlines()] == [{"n": 1}, {"n": 2}, {"n": 3}]
+
+    async def test_failed_job_reports_error(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test that a failing async query is reported through the job status."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query",
+            json={"query": "SELECT * FROM missing_table", "type": "sql", "async": True},
+            headers=auth_headers
+        )
+        job = await self.wait_for_job(test_client, test_session.id, response.json()["job_id"], auth_headers)
+        assert job["status"] == "failed"
+        assert "missing_table" in job["error"]
+
+    async def test_deleted_job_is_gone(
+        self, test_client: AsyncClient, test_session, auth_headers, job_dir
+    ):
+        """Test that deleting a job removes its spooled files."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query",
+            json={"query": "SELECT 1 AS n", "type": "sql", "async": True},
+            headers=auth_headers
+        )
+        job_id = response.json()["job_id"]
+        await self.wait_for_job(test_client, test_session.id, job_id, auth_headers)
+
+        response = await test_client.delete(f"/api/v1/sessions/{test_session.id}/query/jobs/{job_id}", headers=auth_headers)
+        assert response.status_code == 204
+        assert list(job_dir.iterdir()) == []
+        response = await test_client.get(f"/api/v1/sessions/{test_session.id}/query/jobs/{job_id}", headers=auth_headers)
+        assert response.status_code == 404
+
+    async def test_jobs_hold_a_slot_until_finished(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test that a key's queued jobs count against its job limit after the 202."""
+        from app.services.query_jobs import query_jobs
+
+        url = f"/api/v1/sessions/{test_session.id}/query"
+        body = {"query": "SELECT 1 AS n", "type": "sql", "async": True}
+        tiers = {"default": {"concurrent_query_jobs": 1}}
+        # No free job slot in the worker, so the first job stays queued
+        with patch.object(rate_limiter, "tiers", tiers), patch.object(query_jobs, "_slots", asyncio.Semaphore(0)):
+            queued = await test_client.post(url, json=body, headers=auth_headers)
+            refused = await test_client.post(url, json=body, headers=auth_headers)
+            await test_client.delete(f"{url}/jobs/{queued.json()['job_id']}", headers=auth_headers)
+            assert rate_limiter.in_use(test_session.user_id, "query_job") == 0
+            accepted = await test_client.post(url, json=body, headers=auth_headers)
+            await test_client.delete(f"{url}/jobs/{accepted.json()['job_id']}", headers=auth_headers)
+
+        assert queued.status_code == 202
+        assert refused.status_code == 429
+        assert accepted.status_code == 202
+
+    async def test_volatile_read_job_streams_without_bumping(
+        self, test_client: AsyncClient, test_session, test_graph_dataset, auth_headers
+    ):
+        """Test that a read job that is merely not cacheable is streamed to disk and changes no write versions."""
+        url = f"/api/v1/sessions/{test_session.id}/query"
+        version = {"query": "SELECT write_version FROM graph_datasets", "type": "sql"}
+        before = (await test_client.post(url, json=version, headers=auth_headers)).json()["data"]
+
+        with patch("app.services.query_jobs.QueryService.open_sql_write", AsyncMock(side_effect=AssertionError)):
+            response = await test_client.post(
+                url, json={"query": "SELECT random() AS r", "type": "sql", "async": True}, headers=auth_headers
+            )
+            job = await self.wait_for_job(test_client, test_session.id, response.json()["job_id"], auth_headers)
+
+        assert job["status"] == "succeeded", job["error"]
+        assert job["row_count"] == 1
+        assert (await test_client.post(url, json=version, headers=auth_headers)).json()["data"] == before
+
+    async def test_write_job_records_rowcount(
+        self, test_client: AsyncClient, test_session, auth_headers
+    ):
+        """Test that an async SQL write without RETURNING succeeds and reports the affected rows."""
+        response = await test_client.post(
+            f"/api/v1/sessions/{test_session.id}/query",
+            json={
+                "query": "UPDATE sessions SET name = :name WHERE id = :id",
+                "params": {"name": "Renamed", "id": test_session.id},
+                "type": "sql",
+                "async": True,
+            },
+            headers=auth_headers
+        )
+        job = await self.wait_for_job(test_client, test_session.id, response.json()["job_id"], auth_headers)
+
+        assert job["status"] == "succeeded", job["error"]
+        assert job["rowcount"] == 1
+        assert job["row_count"] == 0
+
+    async def test_job_deleted_elsewhere_stays_deleted(
+        self, test_client: AsyncClient, test_session, auth_headers, job_dir
+    ):
+        """Test that a running job whose sidecar another worker removed stops without re-creating it."""
+        from app.services.query_jobs import query_jobs
+
+        async def rows():
+            for n in range(10):
+                if n == 3:
+                    # What a DELETE served by another worker leaves behind
+                    for path in job_dir.iterdir():
+                        path.unlink()
+                yield {"n": n}
+
+        with patch(
+            "app.services.query_jobs.QueryService.open_stream", AsyncMock(return_value=(["n"], rows()))
+        ):
+            response = await test_client.post(
+                f"/api/v1/sessions/{test_session.id}/query",
+                json={"query": "SELECT n FROM numbers", "type": "sql", "async": True},
+                headers=auth_headers
+            )
+            job_id = response.json()["job_id"]
+            task = query_jobs._tasks.get(job_id)
+            if task is not None:
+                await task
+
+        assert list(job_dir.iterdir()) == []
+        response = await test_client.get(f"/api/v1/sessions/{test_session.id}/query/jobs/{job_id}", headers=auth_headers)
+        assert response.status_code == 404
+
 
 class TestExportAPI:
     """Tests for /api/v1/sessions/{id}/export endpoint."""
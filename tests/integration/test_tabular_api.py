@@ -1,9 +1,14 @@
 """
 Integration tests for Tabular Data API endpoints.
 """
+from collections import OrderedDict
+from unittest.mock import patch
+
 import pytest
 from httpx import AsyncClient
 
+from app.core.rate_limit import rate_limiter
+
 
 pytestmark = pytest.mark.integration
 
@@ -141,3 +146,46 @@ class TestTabularDatasetAPI:
         )
         
         assert response.status_code == 404
+
+    async def test_insert_over_ingest_budget(
+        self,
+        test_client: AsyncClient,
+        test_session,
+        test_tabular_dataset,
+        auth_headers
+    ):
+        """Test that bulk loads beyond the key's ingest budget get 429 before touching the database."""
+        tiers = {"default": {"ingest_bytes_per_second": 64}}
+        rows = [{"name": "x" * 100, "age": 1}]
+        url = f"/api/v1/sessions/{test_session.id}/datasets/tabular/{test_tabular_dataset.id}/records"
+        with patch.object(rate_limiter, "tiers", tiers), patch.object(rate_limiter, "_buckets", OrderedDict()):
+            first = await test_client.post(url, json={"rows": rows}, headers=auth_headers)
+            second = await test_client.post(url, json={"rows": rows}, headers=auth_headers)
+
+        assert first.status_code != 429
+        assert second.status_code == 429
+        assert int(second.headers["retry-after"]) >= 1
+
+    async def test_busy_bulk_load_costs_no_ingest_budget(
+        self,
+        test_client: AsyncClient,
+        test_session,
+        test_tabular_dataset,
+        auth_headers
+    ):
+        """Test that a bulk load refused for concurrency does not spend the key's ingest budget."""
+        tiers = {"default": {"concurrent_bulk_loads": 1, "ingest_bytes_per_second": 150}}
+        rows = [{"name": "x" * 100, "age": 1}]
+        url = f"/api/v1/sessions/{test_session.id}/datasets/tabular/{test_tabular_dataset.id}/records"
+        with patch.object(rate_limiter, "tiers", tiers), patch.object(rate_limiter, "_buckets", OrderedDict()):
+            rate_limiter.acquire(test_session.user_id, "bulk_load")
+            try:
+                refused = await test_client.post(url, json={"rows": rows}, headers=auth_headers)
+            finally:
+                rate_limiter.release(test_session.user_id, "bulk_load")
+            accepted = await test_client.post(url, json={"rows": rows}, headers=auth_headers)
+
+        assert refused.status_code == 429
+        assert "concurrent" in refused.json()["detail"]
+        assert accepted.status_code != 429
+        assert rate_limiter.in_use(test_session.user_id, "bulk_load") == 0
@@ -0,0 +1,86 @@
+"""
+Unit tests for in-process caches.
+"""
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import TTLCache, ByteLRUCache
+
+
+pytestmark = pytest.mark.unit
+
+
+class TestTTLCache:
+    """Tests for TTLCache."""
+
+    def test_entries_expire(self, monkeypatch):
+        """Test that entries are dropped once their TTL has passed."""
+        now = [100.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+        cache = TTLCache(ttl_seconds=10)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        now[0] += 11
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_bounded_size_evicts_oldest(self):
+        """Test that the least recently used entry is evicted at capacity."""
+        cache = TTLCache(ttl_seconds=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+
+    def test_invalidate(self):
+        """Test explicit invalidation."""
+        cache = TTLCache(ttl_seconds=60)
+        cache.set("a", 1)
+        cache.invalidate("a")
+        assert cache.get("a", "missing") == "missing"
+
+
+class TestByteLRUCache:
+    """Tests for ByteLRUCache."""
+
+    def test_bounded_by_bytes(self):
+        """Test that least recently used values are evicted past the byte budget."""
+        cache = ByteLRUCache(max_bytes=10, ttl_seconds=60)
+        cache.set("a", b"12345")
+        cache.set("b", b"12345")
+        cache.get("a")
+        cache.set("c", b"12345")
+        assert cache.get("b") is None
+        assert cache.get("a") == b"12345"
+        assert cache.stats()["bytes"] == 10
+
+    def test_rejects_oversized_entries(self):
+        """Test that values above max_entry_bytes are not cached."""
+        cache = ByteLRUCache(max_bytes=100, ttl_seconds=60, max_entry_bytes=4)
+        assert not cache.set("a", b"12345")
+        assert cache.get("a") is None
+
+    def test_ttl(self, monkeypatch):
+        """Test that entries expire."""
+        now = [0.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+        cache = ByteLRUCache(max_bytes=100, ttl_seconds=5)
+        cache.set("a", b"x")
+        now[0] = 6
+        assert cache.get("a") is None
+
+    def test_spills_evicted_entries_to_disk(self, tmp_path):
+        """Test that evicted entries are written to disk and promoted back on a hit."""
+        cache = ByteLRUCache(max_bytes=10, ttl_seconds=60, spill_dir=str(tmp_path), spill_max_bytes=100)
+        cache.set("a", b"aaaaaaaa")
+        cache.set("b", b"bbbbbbbb")
+        assert cache.stats()["spilled_entries"] == 1
+        assert len(list(tmp_path.iterdir())) == 1
+
+        assert cache.get("a") == b"aaaaaaaa"
+        # "b" was pushed out to make room for the promoted entry
+        assert cache.stats()["spilled_entries"] == 1
+        cache.clear()
+        assert list(tmp_path.iterdir()) == []
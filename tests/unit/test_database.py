@@ -0,0 +1,87 @@
+"""
+Unit tests for read-replica routing.
+"""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import ReplicaMonitor, _add_missing_columns, get_read_db
+from app.models.graph import GraphDataset
+
+
+pytestmark = pytest.mark.unit
+
+
+def replica_engine(lag=None, error=None):
+    """Engine mock whose connection reports ``lag`` seconds or raises ``error``."""
+    conn = AsyncMock()
+    if error is not None:
+        conn.execute.side_effect = error
+    else:
+        conn.execute.return_value = MagicMock(scalar=MagicMock(return_value=lag))
+    engine = MagicMock()
+    engine.connect.return_value.__aenter__.return_value = conn
+    return engine, conn
+
+
+class TestReplicaMonitor:
+    """Tests for ReplicaMonitor."""
+
+    async def test_no_replica_is_never_usable(self):
+        """Test that reads stay on the primary without a replica."""
+        assert not await ReplicaMonitor(None, None, 5).usable()
+
+    async def test_lag_threshold(self):
+        """Test that a replica lagging past the threshold is skipped."""
+        engine, _ = replica_engine(lag=12.0)
+        assert not await ReplicaMonitor(engine, 10.0, 0).usable()
+        engine, _ = replica_engine(lag=3.0)
+        assert await ReplicaMonitor(engine, 10.0, 0).usable()
+
+    async def test_unreachable_replica_falls_back(self):
+        """Test that connection errors mark the replica unavailable."""
+        engine, _ = replica_engine(error=OSError("connection refused"))
+        assert not await ReplicaMonitor(engine, None, 0).usable()
+
+    async def test_probe_is_rate_limited(self):
+        """Test that the replica is probed at most once per interval."""
+        engine, conn = replica_engine(lag=0)
+        monitor = ReplicaMonitor(engine, None, 60)
+        assert await monitor.usable()
+        assert await monitor.usable()
+        assert conn.execute.await_count == 1
+
+
+class TestGetReadDb:
+    """Tests for get_read_db dependency."""
+
+    async def test_falls_back_to_primary_session(self, test_db):
+        """Test that the primary session is used when no replica is configured."""
+        sessions = [session async for session in get_read_db(db=test_db)]
+        assert sessions == [test_db]
+
+
+class TestAddMissingColumns:
+    """Tests for the column upgrade run by init_db."""
+
+    async def test_adds_new_columns_to_existing_tables(self, tmp_path):
+        """Test that a table from before write_version existed gains the column with its default."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'upgrade.db'}")
+        async with engine.begin() as conn:
+            await conn.execute(text(
+                "CREATE TABLE graph_datasets (id VARCHAR PRIMARY KEY, session_id VARCHAR NOT NULL, "
+                "name VARCHAR NOT NULL, created_at DATETIME)"
+            ))
+            await conn.execute(text("INSERT INTO graph_datasets (id, session_id, name) VALUES ('g1', 's1', 'old')"))
+            await conn.run_sync(_add_missing_columns)
+            # Idempotent
+            await conn.run_sync(_add_missing_columns)
+            columns = await conn.run_sync(lambda sync: [c["name"] for c in inspect(sync).get_columns("graph_datasets")])
+            version = (await conn.execute(text("SELECT write_version FROM graph_datasets"))).scalar_one()
+        await engine.dispose()
+
+        assert GraphDataset.write_version.key in columns
+        assert version == 0
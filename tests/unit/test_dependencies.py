@@ -3,12 +3,17 @@ Unit tests for dependency injection functions.
 """
 import pytest
 from fastapi import HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.core.dependencies import (
     get_valid_session,
     get_valid_tabular_dataset,
-    get_valid_graph_dataset
+    get_valid_graph_dataset,
+    invalidate_dataset_ownership,
+    invalidate_session_ownership,
+    ownership_cache
 )
 from app.models.session import Session
 from app.models.tabular import TabularDataset
@@ -135,3 +140,84 @@ class TestGetValidGraphDataset:
         
         assert exc_info.value.status_code == 404
         assert "not found" in exc_info.value.detail.lower()
+
+
+class TestOwnershipCache:
+    """Tests for the cached ownership checks."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        ownership_cache.clear()
+        yield
+        ownership_cache.clear()
+
+    @pytest.fixture
+    def statements(self, test_db_engine):
+        executed = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            executed.append(statement)
+
+        event.listen(test_db_engine.sync_engine, "before_cursor_execute", record)
+        yield executed
+        event.remove(test_db_engine.sync_engine, "before_cursor_execute", record)
+
+    async def test_dataset_check_is_one_query(self, test_db, test_session, test_tabular_dataset, statements):
+        """Test that a dataset check joins session and dataset in a single query."""
+        test_db.expunge_all()
+        await get_valid_tabular_dataset(
+            session_id=test_session.id,
+            dataset_id=test_tabular_dataset.id,
+            user_id=test_session.user_id,
+            db=test_db
+        )
+
+        assert len(statements) == 1
+
+    async def test_cache_hit_skips_the_database(self, test_db_engine, test_session, test_graph_dataset, statements):
+        """Test that a repeated check attaches the cached row without querying."""
+        factory = async_sessionmaker(test_db_engine, class_=AsyncSession, expire_on_commit=False)
+        kwargs = dict(session_id=test_session.id, dataset_id=test_graph_dataset.id, user_id=test_session.user_id)
+        async with factory() as db:
+            await get_valid_graph_dataset(db=db, **kwargs)
+        statements.clear()
+
+        async with factory() as db:
+            dataset = await get_valid_graph_dataset(db=db, **kwargs)
+            assert dataset in db
+            assert dataset.name == test_graph_dataset.name
+
+        assert statements == []
+
+    async def test_cache_is_per_user(self, test_db, test_session):
+        """Test that a cached check does not grant access to another user."""
+        await get_valid_session(session_id=test_session.id, user_id=test_session.user_id, db=test_db)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await get_valid_session(session_id=test_session.id, user_id="wrong-user-id", db=test_db)
+
+        assert exc_info.value.status_code == 404
+
+    async def test_invalidation(self, test_db, test_session, test_tabular_dataset, test_graph_dataset):
+        """Test that deleting a dataset or session drops the cached checks."""
+        await get_valid_session(session_id=test_session.id, user_id=test_session.user_id, db=test_db)
+        for getter, dataset in ((get_valid_tabular_dataset, test_tabular_dataset), (get_valid_graph_dataset, test_graph_dataset)):
+            await getter(session_id=test_session.id, dataset_id=dataset.id, user_id=test_session.user_id, db=test_db)
+        assert len(ownership_cache) == 3
+
+        invalidate_dataset_ownership(test_graph_dataset.id)
+        assert len(ownership_cache) == 2
+
+        invalidate_session_ownership(test_session.id)
+        assert len(ownership_cache) == 0
+
+    async def test_mutating_requests_skip_the_cache(self, test_db, test_session, test_graph_dataset, statements):
+        """Test that writes check the database even when a read cached the dataset."""
+        kwargs = dict(session_id=test_session.id, dataset_id=test_graph_dataset.id, user_id=test_session.user_id, db=test_db)
+        await get_valid_graph_dataset(request=Request({"type": "http", "method": "GET"}), **kwargs)
+        statements.clear()
+
+        await get_valid_graph_dataset(request=Request({"type": "http", "method": "GET"}), **kwargs)
+        assert statements == []
+        await get_valid_graph_dataset(request=Request({"type": "http", "method": "DELETE"}), **kwargs)
+        assert len(statements) == 1
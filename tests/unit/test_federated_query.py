@@ -0,0 +1,44 @@
+"""
+Unit tests for federated SQL/Cypher joins.
+"""
+import pytest
+
+from app.services.federated_query import frame_rows, hash_join
+
+
+pytestmark = pytest.mark.unit
+
+
+async def collect(rows):
+    return [row async for row in rows]
+
+
+class TestHashJoin:
+    """Tests for hash_join and frame_rows."""
+
+    async def test_inner_join_on_shared_key(self):
+        """Test that a shared key name yields a single key column."""
+        joined = hash_join(
+            ["id", "revenue"], [(1, 10), (2, 20)],
+            ["id", "degree"], [(2, 5), (3, 7)],
+            "id", "id", "inner"
+        )
+        assert await collect(frame_rows(joined)) == [{"id": 2, "revenue": 20, "degree": 5}]
+
+    async def test_outer_join_keeps_integers_and_nulls(self):
+        """Test that gaps of an outer join are None and integers stay integral."""
+        joined = hash_join(
+            ["customer_id", "score"], [(1, 10)],
+            ["key", "score"], [(2, 3)],
+            "customer_id", "key", "outer"
+        )
+        rows = await collect(frame_rows(joined))
+        assert rows == [
+            {"customer_id": 1, "score_sql": 10, "key": None, "score_graph": None},
+            {"customer_id": None, "score_sql": None, "key": 2, "score_graph": 3},
+        ]
+
+    def test_incompatible_key_types_raise(self):
+        """Test that joining an integer key with a string key is rejected."""
+        with pytest.raises(ValueError):
+            hash_join(["id"], [(1,)], ["id"], [("1",)], "id", "id", "inner")
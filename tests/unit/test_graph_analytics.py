@@ -0,0 +1,221 @@
+"""
+Unit tests for the CSR graph projection and in-process analytics.
+"""
+import threading
+import time
+from unittest.mock import AsyncMock, patch
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from app.services.graph_analytics import (
+    GraphProjection,
+    GraphAnalyticsService,
+    pagerank,
+    connected_components,
+    bfs_levels,
+    degree_centrality,
+    triangle_count,
+    shortest_path,
+)
+from app.services.projection_cache import ProjectionCache
+
+
+pytestmark = pytest.mark.unit
+
+
+# Neo4j ids are sparse; the projection must map them to dense indexes
+EDGES = [(10, 20), (20, 30), (30, 10), (30, 40), (40, 50), (50, 30), (70, 80), (20, 10)]
+NODES = [10, 20, 30, 40, 50, 60, 70, 80]
+
+
+@pytest.fixture
+def projection():
+    src, dst = zip(*EDGES)
+    return GraphProjection.from_edges(NODES, src, dst)
+
+
+@pytest.fixture
+def nx_graph():
+    G = nx.DiGraph()
+    G.add_nodes_from(NODES)
+    G.add_edges_from(EDGES)
+    return G
+
+
+class TestGraphProjection:
+    """Tests for CSR construction."""
+
+    def test_dense_mapping(self, projection):
+        """Test node ids map to dense int32 indexes."""
+        assert projection.node_count == 8
+        assert projection.edge_count == len(EDGES)
+        assert projection.indices.dtype == np.int32
+        assert projection.index_of([30, 99]).tolist() == [2, -1]
+
+    def test_edges_outside_node_set_are_dropped(self):
+        """Test that dangling edge endpoints are ignored."""
+        proj = GraphProjection.from_edges([1, 2], [1, 1], [2, 3])
+        assert proj.edge_count == 1
+
+    def test_undirected_is_symmetric_and_deduplicated(self, projection):
+        """Test undirected view merges reciprocal edges."""
+        und = projection.undirected()
+        # 10<->20 appears in both directions but is one undirected edge
+        assert und.edge_count == 2 * 7
+
+
+class TestAlgorithms:
+    """Tests comparing vectorized algorithms with networkx."""
+
+    def test_pagerank_matches_dense_solution(self, projection, nx_graph):
+        """Test PageRank scores against a dense Google-matrix solve."""
+        A = nx.to_numpy_array(nx_graph, nodelist=projection.node_ids.tolist())
+        n = len(A)
+        out = A.sum(axis=1, keepdims=True)
+        P = np.where(out > 0, A / np.where(out > 0, out, 1), 1.0 / n)
+        G = 0.85 * P.T + 0.15 / n
+        expected = np.linalg.solve(np.eye(n) - G + np.ones((n, n)) / n, np.ones(n) / n)
+
+        scores = pagerank(projection, tolerance=1e-12, max_iterations=500)
+        assert scores.sum() == pytest.approx(1.0)
+        assert np.allclose(scores, expected / expected.sum(), atol=1e-6)
+
+    def test_connected_components(self, projection, nx_graph):
+        """Test weakly connected components."""
+        labels = connected_components(projection)
+        groups = {}
+        for node_id, label in zip(projection.node_ids.tolist(), labels.tolist()):
+            groups.setdefault(label, set()).add(node_id)
+        expected = [set(c) for c in nx.weakly_connected_components(nx_graph)]
+        assert sorted(groups.values(), key=min) == sorted(expected, key=min)
+
+    def test_bfs_levels(self, projection, nx_graph):
+        """Test hop distances from a source node."""
+        levels = bfs_levels(projection, int(projection.index_of(10)[0]))
+        expected = nx.single_source_shortest_path_length(nx_graph.to_undirected(), 10)
+        for node_id, level in zip(projection.node_ids.tolist(), levels.tolist()):
+            assert level == expected.get(node_id, -1)
+
+    def test_shortest_path(self, projection):
+        """Test minimum-hop path on the projection."""
+        path = shortest_path(projection, *projection.index_of([10, 50]).tolist())
+        assert projection.node_ids[path].tolist() == [10, 30, 50]
+        assert shortest_path(projection, *projection.index_of([10, 80]).tolist()) is None
+
+    def test_degree_centrality(self, projection, nx_graph):
+        """Test degree centrality."""
+        expected = nx.degree_centrality(nx_graph)
+        scores = degree_centrality(projection)
+        for node_id, score in zip(projection.node_ids.tolist(), scores):
+            assert score == pytest.approx(expected[node_id])
+
+    def test_triangle_count_matches_networkx(self):
+        """Test triangle counts on a denser random graph with small chunks."""
+        G = nx.gnm_random_graph(60, 400, seed=7)
+        src, dst = zip(*G.edges())
+        proj = GraphProjection.from_edges(list(G.nodes()), src, dst)
+        counts = triangle_count(proj, chunk_wedges=50)
+        expected = nx.triangles(G)
+        assert counts.tolist() == [expected[n] for n in proj.node_ids.tolist()]
+
+    def test_empty_graph(self):
+        """Test algorithms on a graph without nodes."""
+        proj = GraphProjection.from_edges([], [], [])
+        assert pagerank(proj).size == 0
+        assert connected_components(proj).size == 0
+        assert triangle_count(proj).size == 0
+
+
+class TestGraphAnalyticsService:
+    """Tests for GraphAnalyticsService."""
+
+    def test_unknown_algorithm_raises(self, projection):
+        """Test that an unknown algorithm is rejected."""
+        service = GraphAnalyticsService(driver=None)
+        with pytest.raises(ValueError):
+            service.compute(projection, "closeness", {})
+
+    def test_bfs_requires_known_source(self, projection):
+        """Test that bfs validates its source node."""
+        service = GraphAnalyticsService(driver=None)
+        with pytest.raises(ValueError):
+            service.compute(projection, "bfs", {"source_node_id": 999})
+
+    async def test_run_computes_off_the_event_loop(self, projection):
+        """Test that algorithms run in a worker thread, not on the event loop's thread."""
+        service = GraphAnalyticsService(driver=None)
+        threads = []
+        compute = service.compute
+
+        def recording_compute(*args):
+            threads.append(threading.get_ident())
+            return compute(*args)
+
+        with patch.object(service, "load_projection", AsyncMock(return_value=projection)), \
+                patch.object(service, "compute", recording_compute):
+            result = await service.run("ds", "pagerank", {})
+        assert result["node_count"] == projection.node_count
+        assert threads and threads[0] != threading.get_ident()
+
+
+class TestProjectionCache:
+    """Tests for the per-dataset projection cache."""
+
+    @staticmethod
+    def _projection(node_count):
+        return GraphProjection.from_edges(range(node_count), [0], [1])
+
+    async def test_get_or_load_caches(self):
+        """Test that a second lookup does not call the loader."""
+        cache = ProjectionCache(max_bytes=10**6)
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            return self._projection(4)
+
+        first = await cache.get_or_load("ds", loader)
+        second = await cache.get_or_load("ds", loader)
+        assert first is second
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_lru_eviction_by_bytes(self):
+        """Test that least recently used entries are evicted over budget."""
+        size = self._projection(100).nbytes
+        cache = ProjectionCache(max_bytes=2 * size)
+        cache.put("a", self._projection(100))
+        cache.put("b", self._projection(100))
+        cache.get("a")
+        cache.put("c", self._projection(100))
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.total_bytes <= 2 * size
+
+    def test_entries_are_tied_to_write_version(self):
+        """Test that an entry is only served for the write_version it was loaded at."""
+        cache = ProjectionCache(max_bytes=10**6)
+        cache.put("ds", self._projection(3), version=1)
+        assert cache.get("ds", 1) is not None
+        assert cache.get("ds", 2) is None
+        assert cache.get("ds", 1) is None
+
+    def test_entries_expire(self):
+        """Test that entries older than the TTL are reloaded."""
+        cache = ProjectionCache(max_bytes=10**6, ttl_seconds=60)
+        cache.put("ds", self._projection(3))
+        with patch("app.services.projection_cache.time.monotonic", return_value=time.monotonic() + 61):
+            assert cache.get("ds") is None
+
+    async def test_write_during_load_is_not_cached(self):
+        """Test that a projection loaded while a write invalidates the dataset is not cached."""
+        cache = ProjectionCache(max_bytes=10**6)
+
+        async def loader():
+            cache.invalidate("ds")
+            return self._projection(3)
+
+        await cache.get_or_load("ds", loader, version=1)
+        assert cache.get("ds", 1) is None
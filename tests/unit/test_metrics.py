@@ -0,0 +1,107 @@
+"""
+Unit tests for Prometheus metrics helpers.
+"""
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.metrics import instrument_engine, route_template, scrape_registry, timed_calls, _sql_operation
+
+
+pytestmark = pytest.mark.unit
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestRouteTemplate:
+    """Tests for route_template."""
+
+    def test_matched_route_path(self):
+        """Test that the label is the route's template even when parameter values repeat path segments."""
+        from fastapi import APIRouter, FastAPI, Request
+        from fastapi.testclient import TestClient
+
+        records = APIRouter()
+
+        @records.get("/{session_id}/datasets/tabular/{dataset_id}/records")
+        def read_records(request: Request, session_id: str, dataset_id: str):
+            return {"route": route_template(request.scope)}
+
+        api = APIRouter()
+        api.include_router(records, prefix="/sessions")
+        app = FastAPI()
+        app.include_router(api, prefix="/api/v1")
+
+        response = TestClient(app).get("/api/v1/sessions/records/datasets/tabular/tabular/records")
+
+        assert response.json() == {"route": "/api/v1/sessions/{session_id}/datasets/tabular/{dataset_id}/records"}
+
+    def test_unmatched(self):
+        """Test that requests no route matched share one label."""
+        assert route_template({"path": "/nope/123"}) == "<unmatched>"
+
+
+class TestSqlMetrics:
+    """Tests for SQL statement instrumentation."""
+
+    def test_operation_labels_are_bounded(self):
+        """Test that the operation label is the leading keyword or 'other'."""
+        assert _sql_operation("  SELECT * FROM t") == "select"
+        assert _sql_operation("(select 1)") == "select"
+        assert _sql_operation("VACUUM t") == "other"
+
+    async def test_statements_are_timed(self, tmp_path):
+        """Test that executed statements are observed per database and operation."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'metrics.db'}")
+        instrument_engine(engine, "unit-test")
+        before = sample("diaas_sql_statement_duration_seconds_count", database="unit-test", operation="select")
+
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        await engine.dispose()
+
+        assert sample("diaas_sql_statement_duration_seconds_count", database="unit-test", operation="select") == before + 1
+
+
+class TestTimedCalls:
+    """Tests for the timed_calls class decorator."""
+
+    async def test_public_coroutines_are_timed(self):
+        """Test that public coroutine methods are observed and their errors counted."""
+        @timed_calls
+        class Service:
+            async def unit_test_ok(self):
+                return 1
+
+            async def unit_test_fails(self):
+                raise ValueError("boom")
+
+            async def _private(self):
+                return 2
+
+        assert await Service().unit_test_ok() == 1
+        with pytest.raises(ValueError):
+            await Service().unit_test_fails()
+
+        assert sample("diaas_neo4j_call_duration_seconds_count", operation="unit_test_ok") == 1
+        assert sample("diaas_neo4j_call_errors_total", operation="unit_test_fails") == 1
+        assert not hasattr(Service._private, "__wrapped__")
+
+
+class TestScrapeRegistry:
+    """Tests for scrape_registry."""
+
+    def test_single_process_uses_default_registry(self, monkeypatch):
+        """Test that a single process reports its own registry."""
+        monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+        assert scrape_registry() is REGISTRY
+
+    def test_multiprocess_merges_worker_files(self, tmp_path, monkeypatch):
+        """Test that with a multiprocess directory the samples written there are reported."""
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+        registry = scrape_registry()
+        assert registry is not REGISTRY
+        assert registry.get_sample_value("diaas_pool_utilization_ratio", {"pool": "postgres"}) is not None
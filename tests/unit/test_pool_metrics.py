@@ -0,0 +1,70 @@
+"""
+Unit tests for connection pool instrumentation.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.pool_metrics import InstrumentedAsyncPool, neo4j_pool_snapshot, sql_pool_snapshot
+
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+async def small_pool_engine(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedAsyncPool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.2,
+    )
+    yield engine
+    await engine.dispose()
+
+
+class TestInstrumentedAsyncPool:
+    """Tests for InstrumentedAsyncPool."""
+
+    async def test_waits_are_counted(self, small_pool_engine):
+        """Test that a checkout blocked on an exhausted pool counts as a wait."""
+        async with small_pool_engine.connect() as first:
+            await first.execute(text("SELECT 1"))
+            snapshot = sql_pool_snapshot(small_pool_engine)
+            assert snapshot["checked_out"] == 1
+            assert snapshot["utilization"] == 1.0
+
+            async def second_checkout():
+                async with small_pool_engine.connect() as second:
+                    await second.execute(text("SELECT 1"))
+
+            waiter = asyncio.ensure_future(second_checkout())
+            await asyncio.sleep(0.05)
+        await waiter
+
+        snapshot = sql_pool_snapshot(small_pool_engine)
+        assert snapshot["acquisitions"] == 2
+        assert snapshot["waits"] == 1
+        assert snapshot["wait_seconds_total"] > 0
+
+    async def test_timeouts_are_counted(self, small_pool_engine):
+        """Test that checkouts giving up after pool_timeout are counted."""
+        async with small_pool_engine.connect() as first:
+            await first.execute(text("SELECT 1"))
+            with pytest.raises(PoolTimeoutError):
+                async with small_pool_engine.connect() as second:
+                    await second.execute(text("SELECT 1"))
+        assert sql_pool_snapshot(small_pool_engine)["timeouts"] == 1
+
+
+class TestSnapshots:
+    """Tests for pool snapshots of unconfigured or mocked backends."""
+
+    def test_missing_pools(self):
+        """Test that absent or non-driver objects report no pool."""
+        assert sql_pool_snapshot(None) is None
+        assert neo4j_pool_snapshot(object()) is None
@@ -0,0 +1,100 @@
+"""
+Unit tests for read-only detection and query normalization.
+"""
+import pytest
+
+from app.services.query_analysis import is_read_only_sql, is_read_only_cypher, may_write, normalize_query
+
+
+pytestmark = pytest.mark.unit
+
+
+class TestReadOnlySQL:
+    """Tests for is_read_only_sql."""
+
+    @pytest.mark.parametrize("query", [
+        "SELECT * FROM \"dataset_1\" WHERE age > :age",
+        "select count(*), avg(price) from t group by name;",
+        "WITH recent AS (SELECT * FROM t) SELECT * FROM recent",
+        "SELECT 'DROP TABLE t' AS text, \"update\" FROM t -- delete everything",
+        "(SELECT 1) UNION ALL (SELECT 2)",
+    ])
+    def test_read_only(self, query):
+        """Test statements that are provably read-only."""
+        assert is_read_only_sql(query)
+
+    @pytest.mark.parametrize("query", [
+        "INSERT INTO t VALUES (1)",
+        "SELECT * INTO backup FROM t",
+        "SELECT * FROM t FOR UPDATE",
+        "SELECT 1; DELETE FROM t",
+        "WITH d AS (DELETE FROM t RETURNING *) SELECT * FROM d",
+        "SELECT now()",
+        "SELECT * FROM t WHERE created_at > current_date",
+        "SELECT current_timestamp",
+        "SELECT age(created_at) FROM t",
+        "SELECT nextval('seq')",
+        "SELECT my_function(id) FROM t",
+        "EXPLAIN ANALYZE DELETE FROM t",
+    ])
+    def test_not_read_only(self, query):
+        """Test writes, locking, multiple statements and volatile functions."""
+        assert not is_read_only_sql(query)
+
+
+class TestMayWrite:
+    """Tests for may_write."""
+
+    @pytest.mark.parametrize("query_type,query", [
+        ("sql", "SELECT now()"),
+        ("sql", "SELECT md5(name), date(created_at) FROM t WHERE created_at > current_date"),
+        ("sql", "SELECT random() AS r, age(created_at) FROM t"),
+        ("cypher", "RETURN rand(), datetime()"),
+    ])
+    def test_reads_that_are_not_cacheable(self, query_type, query):
+        """Test that volatile reads are not mistaken for writes."""
+        assert not may_write(query_type, query)
+
+    @pytest.mark.parametrize("query_type,query", [
+        ("sql", "INSERT INTO t VALUES (1)"),
+        ("sql", "SELECT * INTO backup FROM t"),
+        ("sql", "WITH d AS (DELETE FROM t RETURNING *) SELECT * FROM d"),
+        ("sql", "SELECT 1; DELETE FROM t"),
+        ("sql", "EXPLAIN ANALYZE DELETE FROM t"),
+        ("cypher", "MATCH (n) SET n.x = 1"),
+        ("cypher", "CALL apoc.periodic.iterate('MATCH (n) RETURN n', 'DELETE n', {})"),
+    ])
+    def test_writes(self, query_type, query):
+        """Test writes, multiple statements and procedure calls."""
+        assert may_write(query_type, query)
+
+
+class TestReadOnlyCypher:
+    """Tests for is_read_only_cypher."""
+
+    @pytest.mark.parametrize("query", [
+        "MATCH (n:Person) WHERE n.name = 'SET' RETURN n LIMIT 10",
+        "MATCH (n) RETURN count(n) AS `create`",
+        "MATCH (n) CALL { WITH n MATCH (n)--(m) RETURN count(m) AS c } RETURN n, c",
+        "RETURN datetime('2024-01-01')",
+    ])
+    def test_read_only(self, query):
+        """Test statements that are provably read-only."""
+        assert is_read_only_cypher(query)
+
+    @pytest.mark.parametrize("query", [
+        "CREATE (n:Person)",
+        "MATCH (n) DETACH DELETE n",
+        "MATCH (n) SET n.x = 1",
+        "CALL db.labels()",
+        "RETURN rand()",
+        "RETURN datetime()",
+    ])
+    def test_not_read_only(self, query):
+        """Test writes, procedure calls and non-deterministic functions."""
+        assert not is_read_only_cypher(query)
+
+
+def test_normalize_query_preserves_literals():
+    """Test that whitespace is collapsed outside literals only."""
+    assert normalize_query("SELECT  *\n FROM t WHERE a = 'x  y' ;") == "SELECT * FROM t WHERE a = 'x  y'"
@@ -0,0 +1,158 @@
+"""
+Unit tests for the query service: streamed result encoding, limits and cancellation.
+"""
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.config import settings
+from app.services.query_service import (
+    QueryCancelled, QueryService, encode_rows, resolve_row_limit, resolve_timeout
+)
+
+
+pytestmark = pytest.mark.unit
+
+
+class Rows:
+    """Async row iterator that records whether it was closed."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._rows)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def aclose(self):
+        self.closed = True
+
+
+async def collect(stream):
+    return b"".join([chunk async for chunk in stream]).decode()
+
+
+class TestEncodeRows:
+    """Tests for encode_rows."""
+
+    async def test_ndjson_serializes_unknown_types_as_strings(self):
+        """Test NDJSON output for values json cannot encode natively."""
+        from decimal import Decimal
+        rows = Rows([{"price": Decimal("1.50"), "tags": ["a"]}])
+        output = await collect(encode_rows(["price", "tags"], rows, "ndjson", 10, 10**6))
+        assert json.loads(output) == {"price": "1.50", "tags": ["a"]}
+        assert rows.closed
+
+    async def test_csv_flattens_nested_values(self):
+        """Test CSV output with nulls and nested values."""
+        rows = Rows([{"a": None, "b": {"x": 1}}])
+        output = await collect(encode_rows(["a", "b"], rows, "csv", 10, 10**6))
+        assert output.splitlines() == ["a,b", ',"{""x"":1}"']
+
+    async def test_byte_cap_stops_before_overflow(self):
+        """Test that output never exceeds the byte cap and the stream is closed."""
+        rows = Rows([{"n": i} for i in range(1000)])
+        output = await collect(encode_rows(["n"], rows, "csv", 10**6, 30))
+        assert len(output) <= 30
+        assert rows.closed
+
+
+class TestLimits:
+    """Tests for timeout and row limit resolution."""
+
+    def test_timeout_is_capped_by_key_override(self):
+        """Test that a per-key override replaces the default cap."""
+        with patch.object(settings, "QUERY_TIMEOUT_SECONDS", 30.0), \
+             patch.object(settings, "QUERY_TIMEOUT_OVERRIDES", {"batch-key": 600.0}):
+            assert resolve_timeout(None, "some-key") == 30.0
+            assert resolve_timeout(120.0, "some-key") == 30.0
+            assert resolve_timeout(120.0, "batch-key") == 120.0
+            assert resolve_timeout(None, "batch-key") == 600.0
+
+    def test_job_timeout_is_not_capped_by_interactive_override(self):
+        """Test that async jobs use the job cap and overrides, and never fall below the key's interactive cap."""
+        with patch.object(settings, "QUERY_TIMEOUT_SECONDS", 30.0), \
+             patch.object(settings, "QUERY_TIMEOUT_OVERRIDES", {"batch-key": 600.0, "long-key": 7200.0}), \
+             patch.object(settings, "QUERY_JOB_TIMEOUT_SECONDS", 3600.0), \
+             patch.object(settings, "QUERY_JOB_TIMEOUT_OVERRIDES", {"etl-key": 86400.0}):
+            assert resolve_timeout(None, "batch-key", job=True) == 3600.0
+            assert resolve_timeout(None, "long-key", job=True) == 7200.0
+            assert resolve_timeout(None, "etl-key", job=True) == 86400.0
+            assert resolve_timeout(120.0, "etl-key", job=True) == 120.0
+
+    def test_row_limit_uses_endpoint_cap(self):
+        """Test that JSON and streamed results have separate row caps."""
+        with patch.object(settings, "QUERY_MAX_ROWS", 10), patch.object(settings, "QUERY_STREAM_MAX_ROWS", 100):
+            assert resolve_row_limit(None, stream=False) == 10
+            assert resolve_row_limit(50, stream=False) == 10
+            assert resolve_row_limit(50, stream=True) == 50
+
+
+class TestQueryService:
+    """Tests for QueryService execution."""
+
+    async def test_sql_rows_are_truncated(self, test_db):
+        """Test that SQL results stop at max_rows and are flagged."""
+        service = QueryService(test_db, MagicMock())
+        payload = await service.execute_sql("SELECT 1 AS n UNION ALL SELECT 2 UNION ALL SELECT 3", {}, 2, 5.0)
+        assert payload["data"] == [{"n": 1}, {"n": 2}]
+        assert payload["truncated"] is True
+
+    async def test_disconnect_cancels_statement(self):
+        """Test that a client disconnect cancels the running statement."""
+        service = QueryService(MagicMock(), MagicMock())
+        service.cancel = AsyncMock()
+        started = asyncio.Event()
+
+        async def slow_query():
+            started.set()
+            await asyncio.sleep(60)
+
+        async def is_disconnected():
+            return started.is_set()
+
+        with patch.object(settings, "QUERY_DISCONNECT_POLL_SECONDS", 0.01):
+            with pytest.raises(QueryCancelled):
+                await service.run_until_disconnected(slow_query(), is_disconnected)
+        service.cancel.assert_awaited_once()
+
+    async def test_completed_work_is_returned(self):
+        """Test that work finishing before a disconnect returns its result."""
+        service = QueryService(MagicMock(), MagicMock())
+        service.cancel = AsyncMock()
+
+        async def quick_query():
+            return {"status": "success"}
+
+        result = await service.run_until_disconnected(quick_query(), AsyncMock(return_value=False))
+        assert result == {"status": "success"}
+        service.cancel.assert_not_awaited()
+
+    async def test_postgres_profile_executes_once(self):
+        """Test that a PostgreSQL profile runs only EXPLAIN ANALYZE and reports no network time."""
+        db = MagicMock()
+        db.bind.dialect.name = "postgresql"
+        db.rollback = AsyncMock()
+        backend = MagicMock()
+        backend.first.return_value = (42, "5000")
+        explain = MagicMock()
+        explain.scalar.return_value = [{"Plan": {"Actual Rows": 3}, "Planning Time": 0.5, "Execution Time": 2.0}]
+        db.execute = AsyncMock(side_effect=[backend, explain])
+
+        payload = await QueryService(db, MagicMock()).profile_sql("SELECT n FROM t", {}, 2, 5.0)
+
+        assert db.execute.await_count == 2
+        assert str(db.execute.await_args_list[1].args[0]).startswith("EXPLAIN (ANALYZE")
+        assert payload["count"] == 2
+        assert payload["truncated"] is True
+        assert payload["timings_ms"]["execution"] == 2.5
+        assert payload["timings_ms"]["network"] is None
+        db.rollback.assert_awaited_once()
@@ -0,0 +1,84 @@
+"""
+Unit tests for statement fingerprints and the slow query log.
+"""
+import logging
+
+import pytest
+
+from app.core.query_stats import QueryStats, fingerprint, key_id
+
+
+pytestmark = pytest.mark.unit
+
+
+class TestFingerprint:
+    """Tests for fingerprint."""
+
+    def test_dataset_tables_and_literals(self):
+        """Test that statements on different dataset tables with different literals share a fingerprint."""
+        first = fingerprint("sql", 'SELECT * FROM "dataset_0a1b2c3d_1111_2222_3333_444455556666" WHERE x = 5 AND y IN (1, 2)')
+        second = fingerprint("sql", "select *  from \"dataset_9f8e7d6c_aaaa_bbbb_cccc_ddddeeeeffff\" where x = 7 and y in (3, 4, 5) -- note")
+
+        assert first == second
+        assert first[1] == 'select * from "dataset_?" where x = ? and y in (?)'
+
+    def test_multi_row_values(self):
+        """Test that VALUES lists of any length collapse to one row."""
+        _, text = fingerprint("sql", "INSERT INTO t (a, b) VALUES ('x', 1.5), ('y', 2), ('z', -3)")
+        assert text == "insert into t (a, b) values (?)"
+
+    def test_cypher_labels_and_parameters(self):
+        """Test that dataset labels and literals are stripped while parameters stay."""
+        _, text = fingerprint(
+            "cypher",
+            "MATCH (n:Graph_0a1b2c3d_1111_2222_3333_444455556666 {name: 'Bob'}) WHERE n.id IN [1, 2] RETURN n LIMIT $limit"
+        )
+        assert text == "match (n:graph_? {name: ?}) where n.id in [?] return n limit $limit"
+
+    def test_sql_and_cypher_are_distinct(self):
+        """Test that the same text in both languages gets different ids."""
+        assert fingerprint("sql", "RETURN 1")[0] != fingerprint("cypher", "RETURN 1")[0]
+
+
+class TestQueryStats:
+    """Tests for QueryStats."""
+
+    def test_aggregates_and_orders(self):
+        """Test that calls are aggregated per fingerprint and ordered by the requested statistic."""
+        stats = QueryStats(max_fingerprints=10, slow_threshold_seconds=None)
+        stats.observe("sql", "SELECT 1", 0.5, rows=1)
+        stats.observe("sql", "SELECT 2", 0.25, rows=1)
+        stats.observe("cypher", "MATCH (n) RETURN n", 0.1, rows=40)
+
+        top = stats.top(10)
+        assert [entry["query"] for entry in top] == ["select ?", "match (n) return n"]
+        assert top[0]["calls"] == 2
+        assert top[0]["mean_seconds"] == 0.375
+        assert stats.top(10, order_by="rows")[0]["query_type"] == "cypher"
+        assert [entry["query_type"] for entry in stats.top(10, query_type="cypher")] == ["cypher"]
+
+    def test_bounded(self):
+        """Test that the least recently seen fingerprints are dropped first."""
+        stats = QueryStats(max_fingerprints=2, slow_threshold_seconds=None)
+        for table in ("a", "b", "a", "c"):
+            stats.observe("sql", f"SELECT * FROM {table}", 0.01)
+
+        assert sorted(entry["query"] for entry in stats.top(10)) == ["select * from a", "select * from c"]
+
+    def test_slow_statements_are_logged(self, caplog):
+        """Test that statements over the threshold are logged without literals or the raw key."""
+        stats = QueryStats(max_fingerprints=10, slow_threshold_seconds=0.2)
+        with caplog.at_level(logging.WARNING, logger="diaas.slow_queries"):
+            stats.observe("sql", "SELECT * FROM users WHERE email = 'a@b.c'", 0.1, rows=1)
+            stats.observe("sql", "SELECT * FROM users WHERE email = 'a@b.c'", 0.3, rows=1)
+
+        assert len(caplog.records) == 1
+        message = caplog.records[0].getMessage()
+        assert "300.0 ms" in message and "email = ?" in message and "a@b.c" not in message
+        assert stats.top(1)[0]["slow_calls"] == 1
+
+    def test_key_id(self):
+        """Test that API keys are reduced to a short stable hash."""
+        assert key_id("secret-key-123") == key_id("secret-key-123")
+        assert "secret" not in key_id("secret-key-123")
+        assert key_id(None) is None
@@ -0,0 +1,106 @@
+"""
+Unit tests for per-key rate limits.
+"""
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.rate_limit import RateLimiter, TokenBucket
+
+
+pytestmark = pytest.mark.unit
+
+
+def limiter(**tiers):
+    return RateLimiter(tiers=tiers, key_tiers={"etl-key-1": "bulk"}, max_keys=100)
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket."""
+
+    def test_burst_then_wait(self):
+        """Test that the capacity is available at once and then refills at the rate."""
+        bucket = TokenBucket(rate=10, capacity=2)
+        assert bucket.take() == 0
+        assert bucket.take() == 0
+        assert bucket.take() == pytest.approx(0.1, abs=0.01)
+
+    def test_oversized_amount_goes_into_debt(self):
+        """Test that an amount above the capacity passes once and delays what follows."""
+        bucket = TokenBucket(rate=100, capacity=100)
+        assert bucket.take(250) == 0
+        assert bucket.take(10) == pytest.approx(1.6, abs=0.01)
+
+
+class TestRateLimiter:
+    """Tests for RateLimiter."""
+
+    def test_tier_falls_back_to_default(self):
+        """Test that tiers inherit the default tier's limits they do not set."""
+        limits = limiter(default={"burst": 5, "concurrent_queries": 2}, bulk={"concurrent_queries": 8})
+        assert limits.limits("etl-key-1") == {"burst": 5, "concurrent_queries": 8}
+        assert limits.limits("other-key")["concurrent_queries"] == 2
+
+    def test_request_rate(self):
+        """Test that requests over the burst get 429 with Retry-After."""
+        limits = limiter(default={"requests_per_second": 1, "burst": 2})
+        limits.check_request("some-key-1")
+        limits.check_request("some-key-1")
+
+        with pytest.raises(HTTPException) as exc_info:
+            limits.check_request("some-key-1")
+
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.headers["Retry-After"] == "1"
+        limits.check_request("some-key-2")
+
+    def test_unlimited(self):
+        """Test that unset and null limits do not restrict anything."""
+        limits = limiter(default={"requests_per_second": None})
+        for _ in range(1000):
+            limits.check_request("some-key-1")
+            limits.acquire("some-key-1", "query")
+        limits.check_ingest("some-key-1", 10 ** 12)
+
+    def test_slots(self):
+        """Test that concurrency slots are refused when taken and reusable when released."""
+        limits = limiter(default={"concurrent_bulk_loads": 1})
+        limits.acquire("some-key-1", "bulk_load")
+        with pytest.raises(HTTPException) as exc_info:
+            limits.acquire("some-key-1", "bulk_load")
+        assert exc_info.value.status_code == 429
+
+        limits.release("some-key-1", "bulk_load")
+        limits.acquire("some-key-1", "bulk_load")
+        assert limits.in_use("some-key-1", "bulk_load") == 1
+
+    def test_query_jobs_have_their_own_slots(self):
+        """Test that async query jobs are limited separately from interactive queries."""
+        limits = limiter(default={"concurrent_queries": 1, "concurrent_query_jobs": 1})
+        limits.acquire("some-key-1", "query")
+        limits.acquire("some-key-1", "query_job")
+
+        with pytest.raises(HTTPException) as exc_info:
+            limits.acquire("some-key-1", "query_job")
+
+        assert exc_info.value.status_code == 429
+        assert limits.in_use("some-key-1", "query") == 1
+
+    def test_ingest_budget(self):
+        """Test that bytes over the per-second budget are refused until it refills."""
+        limits = limiter(default={"ingest_bytes_per_second": 1000})
+        limits.check_ingest("some-key-1", 1500)
+
+        with pytest.raises(HTTPException) as exc_info:
+            limits.check_ingest("some-key-1", 10)
+
+        assert exc_info.value.status_code == 429
+        assert int(exc_info.value.headers["Retry-After"]) >= 1
+
+    def test_key_state_is_bounded(self):
+        """Test that rate state is kept for at most max_keys keys."""
+        limits = RateLimiter(tiers={"default": {"requests_per_second": 1}}, key_tiers={}, max_keys=3)
+        for index in range(10):
+            limits.check_request(f"some-key-{index}")
+        assert len(limits._buckets) == 3
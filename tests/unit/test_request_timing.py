@@ -0,0 +1,53 @@
+"""
+Unit tests for per-request timings.
+"""
+import asyncio
+
+import pytest
+
+from app.core.request_timing import RequestTimings, _current, measure, record
+
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def timings():
+    timings = RequestTimings()
+    token = _current.set(timings)
+    yield timings
+    _current.reset(token)
+
+
+class TestRequestTimings:
+    """Tests for RequestTimings, measure and record."""
+
+    async def test_overlapping_spans_count_once(self, timings):
+        """Test that nested and concurrent spans of a phase add their wall time once."""
+        async def call():
+            with measure("cypher"):
+                with measure("cypher"):
+                    await asyncio.sleep(0.05)
+
+        await asyncio.gather(call(), call())
+
+        assert 0.05 <= timings.durations["cypher"] < 0.09
+
+    def test_record_adds_up(self, timings):
+        """Test that recorded durations accumulate per phase."""
+        record("sql", 0.002)
+        record("sql", 0.003)
+
+        assert timings.durations["sql"] == pytest.approx(0.005)
+
+    def test_header_value(self, timings):
+        """Test the Server-Timing header format in milliseconds."""
+        record("sql", 0.0125)
+        record("auth", 0.001)
+
+        assert timings.header_value(0.02) == "auth;dur=1.000, sql;dur=12.500, total;dur=20.000"
+
+    def test_no_request(self):
+        """Test that timing outside a request is a no-op."""
+        with measure("sql"):
+            record("sql", 1.0)
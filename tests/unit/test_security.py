@@ -1,11 +1,14 @@
 """
 Unit tests for security module.
 """
+from unittest.mock import patch
+
 import pytest
 from fastapi import HTTPException
 
 from app.core.security import get_current_user_id, KEY_PATTERN
 from app.core.config import settings
+from app.core.rate_limit import RateLimiter
 
 
 pytestmark = pytest.mark.unit
@@ -81,3 +84,18 @@ class TestGetCurrentUserId:
         """Test various valid key formats."""
         result = await get_current_user_id(key)
         assert result == key
+
+
+class TestRequestRate:
+    """Tests for the request rate enforced by get_current_user_id."""
+
+    async def test_rate_limited_key_gets_429(self):
+        """Test that a key over its tier's request rate is refused."""
+        limiter = RateLimiter(tiers={"default": {"requests_per_second": 1, "burst": 1}}, key_tiers={}, max_keys=10)
+        with patch("app.core.security.rate_limiter", limiter):
+            assert await get_current_user_id("rate-limited-key") == "rate-limited-key"
+            with pytest.raises(HTTPException) as exc_info:
+                await get_current_user_id("rate-limited-key")
+
+        assert exc_info.value.status_code == 429
+        assert "Retry-After" in exc_info.value.headers
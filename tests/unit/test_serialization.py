@@ -0,0 +1,63 @@
+"""
+Unit tests for result serialization.
+"""
+import base64
+import uuid
+from decimal import Decimal
+
+import orjson
+import pytest
+from neo4j.graph import Graph, Node
+from neo4j.spatial import WGS84Point
+from neo4j.time import DateTime, Duration
+
+from app.core.serialization import ResultJSONResponse, dumps
+
+
+pytestmark = pytest.mark.unit
+
+
+def graph_fixture():
+    """Build two nodes and a relationship between them as the driver would."""
+    graph = Graph()
+    alice = Node(graph, "4:db:1", 1, ["Person"], {"name": "Alice"})
+    bob = Node(graph, "4:db:2", 2, ["Person"], {"name": "Bob"})
+    knows = graph.relationship_type("KNOWS")(graph, "5:db:10", 10, {"since": 2020})
+    knows._start_node, knows._end_node = alice, bob
+    return alice, knows
+
+
+class TestDumps:
+    """Tests for dumps."""
+
+    def test_graph_objects_keep_identity(self):
+        """Test that nodes and relationships keep element ids, labels and types."""
+        alice, knows = graph_fixture()
+        data = orjson.loads(dumps({"n": alice, "r": knows}))
+        assert data["n"] == {"element_id": "4:db:1", "labels": ["Person"], "properties": {"name": "Alice"}}
+        assert data["r"]["type"] == "KNOWS"
+        assert (data["r"]["start"], data["r"]["end"]) == ("4:db:1", "4:db:2")
+
+    def test_driver_values_are_lossless(self):
+        """Test temporal, spatial, Decimal, UUID and bytes values."""
+        value = {
+            "at": DateTime(2024, 1, 2, 3, 4, 5, 123456789),
+            "took": Duration(days=1, seconds=3),
+            "where": WGS84Point((13.4, 52.5)),
+            "price": Decimal("10.000000000000000001"),
+            "id": uuid.UUID(int=1),
+            "blob": b"\x00\xff",
+        }
+        data = orjson.loads(dumps(value))
+        assert data["at"] == "2024-01-02T03:04:05.123456789"
+        assert data["took"] == "P1DT3S"
+        assert data["where"] == {"srid": 4326, "coordinates": [13.4, 52.5]}
+        assert data["price"] == "10.000000000000000001"
+        assert data["id"] == "00000000-0000-0000-0000-000000000001"
+        assert base64.b64decode(data["blob"]) == b"\x00\xff"
+
+    def test_response_renders_with_dumps(self):
+        """Test that the response class encodes driver values."""
+        response = ResultJSONResponse({"price": Decimal("1.50")})
+        assert response.body == b'{"price":"1.50"}'
+        assert response.media_type == "application/json"
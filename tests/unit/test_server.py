@@ -0,0 +1,82 @@
+"""
+Unit tests for the multi-worker production server.
+"""
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app import server
+from app.core import database, neo4j_db
+from app.core.config import settings
+
+
+pytestmark = pytest.mark.unit
+
+
+class TestWorkerCount:
+    """Tests for worker_count."""
+
+    def test_configured_concurrency_wins(self):
+        """Test that WEB_CONCURRENCY overrides the CPU count."""
+        with patch.object(settings, "WEB_CONCURRENCY", 3):
+            assert server.worker_count() == 3
+
+    def test_sized_to_container_cpu_quota(self):
+        """Test that a CPU quota below the visible CPUs caps the worker count."""
+        with patch.object(settings, "WEB_CONCURRENCY", None), \
+                patch.object(server.os, "sched_getaffinity", return_value=set(range(16))), \
+                patch.object(server, "_cgroup_cpu_limit", return_value=2.5):
+            assert server.worker_count() == 3
+
+    def test_sized_to_cpus_without_quota(self):
+        """Test that every available CPU gets a worker when no quota is set."""
+        with patch.object(settings, "WEB_CONCURRENCY", None), \
+                patch.object(server.os, "sched_getaffinity", return_value={0, 1}), \
+                patch.object(server, "_cgroup_cpu_limit", return_value=None):
+            assert server.worker_count() == 2
+
+
+class TestServerLifecycle:
+    """Tests for the gunicorn configuration and hooks."""
+
+    def test_options_preload_and_drain(self):
+        """Test that the app is preloaded and gunicorn waits for draining plus the lifespan shutdown."""
+        options = server.options(4)
+        assert options["workers"] == 4
+        assert options["preload_app"] is True
+        assert options["worker_class"] is server.DrainingUvicornWorker
+        assert options["graceful_timeout"] > settings.SERVER_DRAIN_SECONDS
+
+    def test_schema_created_once_before_forking(self):
+        """Test that the master creates the schema, drops its connections and turns off the per-worker init."""
+        assert server.options(4)["on_starting"] is server.on_starting
+        with patch.object(settings, "DB_INIT_ON_STARTUP", True), \
+                patch.object(database, "init_db", AsyncMock()) as init_db, \
+                patch.object(database, "close_db", AsyncMock()) as close_db:
+            server.on_starting(MagicMock())
+            assert settings.DB_INIT_ON_STARTUP is False
+        init_db.assert_awaited_once()
+        close_db.assert_awaited_once()
+
+    def test_post_fork_gives_worker_its_own_backends(self):
+        """Test that a forked worker gets a fresh SQL pool and no inherited Neo4j driver."""
+        pool = database.engine.pool
+        with patch.object(neo4j_db, "driver", MagicMock()):
+            server.post_fork(MagicMock(), MagicMock())
+            assert neo4j_db.driver is None
+        assert database.engine.pool is not pool
+        assert isinstance(database.engine.pool, type(pool))
+
+    def test_metrics_dir_prepared_for_several_workers(self, tmp_path, monkeypatch):
+        """Test that multiple workers share a cleared metrics directory and a single worker does not."""
+        directory = tmp_path / "metrics"
+        directory.mkdir()
+        (directory / "counter_1.db").write_bytes(b"stale")
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(directory))
+        server.prepare_metrics_dir(2)
+        assert os.listdir(directory) == []
+
+        monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR")
+        server.prepare_metrics_dir(1)
+        assert "PROMETHEUS_MULTIPROC_DIR" not in os.environ
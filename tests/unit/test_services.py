@@ -6,13 +6,42 @@ from unittest.mock import AsyncMock, MagicMock, patch
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.services.tabular_service import TabularService
-from app.services.graph_service import GraphService
+from app.services.graph_service import GraphService, stats_cache, _degree_summary
 from app.services.export_service import ExportService
 
 
 pytestmark = pytest.mark.unit
 
 
+def use_session_as_transaction(mock_session):
+    """Run managed transaction functions against the session mock itself, so tx.run is session.run."""
+    async def execute(work, *args, **kwargs):
+        return await work(mock_session, *args, **kwargs)
+    mock_session.execute_read.side_effect = execute
+    mock_session.execute_write.side_effect = execute
+
+
+class FakeResult:
+    """Minimal stand-in for a Neo4j result over a list of record dicts."""
+
+    def __init__(self, rows, counters=None):
+        self.rows = rows
+        self.counters = counters
+
+    async def single(self):
+        return self.rows[0]
+
+    async def consume(self):
+        return MagicMock(counters=MagicMock(**(self.counters or {})))
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for row in self.rows:
+            yield MagicMock(data=lambda row=row: row, **{"__getitem__": lambda _, key, row=row: row[key]})
+
+
 class TestTabularService:
     """Tests for TabularService."""
     
@@ -80,6 +109,7 @@ class TestGraphService:
         mock_result.single.return_value = mock_record
         mock_session.run.return_value = mock_result
         mock_driver.session.return_value.__aenter__.return_value = mock_session
+        use_session_as_transaction(mock_session)
         
         service = GraphService(mock_driver)
         
@@ -92,6 +122,253 @@ class TestGraphService:
         assert mock_session.run.called
         assert result == mock_record["n"]
 
+    async def test_create_node_assigns_key(self):
+        """Test that create_node passes a client key or generates one."""
+        mock_driver = MagicMock()
+        mock_session = AsyncMock()
+        mock_result = AsyncMock()
+        mock_result.single.return_value = {"n": {"_key": "alice"}}
+        mock_session.run.return_value = mock_result
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
+        use_session_as_transaction(mock_session)
+
+        service = GraphService(mock_driver)
+        await service.create_node("dataset-123", "Person", {}, key="alice")
+        assert mock_session.run.call_args.kwargs["key"] == "alice"
+
+        await service.create_node("dataset-123", "Person", {})
+        assert len(mock_session.run.call_args.kwargs["key"]) == 36
+
+    def test_node_condition_by_key_or_id(self):
+        """Test that string refs use the key property and ints use id()."""
+        service = GraphService(MagicMock())
+        assert service._node_condition("n", "alice", "ref") == "n._key = $ref"
+        assert service._node_condition("n", 42, "ref") == "id(n) = $ref"
+
+    def test_invalid_storage_mode_raises(self):
+        """Test that an unknown storage mode is rejected."""
+        with pytest.raises(ValueError):
+            GraphService(MagicMock(), storage_mode="schema")
+
+    async def test_property_mode_query_text_shared_across_datasets(self):
+        """Test that property mode emits identical Cypher for every dataset."""
+        mock_driver = MagicMock()
+        mock_session = AsyncMock()
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
+        use_session_as_transaction(mock_session)
+        mock_result = MagicMock()
+        mock_result.__aiter__.return_value = []
+        mock_session.run.return_value = mock_result
+
+        service = GraphService(mock_driver, storage_mode="property")
+        await service.get_neighbors("abc-1", "alice")
+        await service.get_neighbors("def-2", "alice")
+
+        first, second = mock_session.run.call_args_list
+        assert first.args[0] == second.args[0]
+        assert ":GraphNode {dataset_id: $dataset_id}" in first.args[0]
+        assert first.kwargs["dataset_id"] == "abc-1"
+        assert second.kwargs["dataset_id"] == "def-2"
+
+    async def test_property_mode_create_node_sets_dataset_id(self):
+        """Test that nodes created in property mode carry the dataset id."""
+        mock_driver = MagicMock()
+        mock_session = AsyncMock()
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
+        use_session_as_transaction(mock_session)
+        mock_result = AsyncMock()
+        mock_result.single.return_value = {"n": {"name": "Alice", "_key": "k", "_id": 1}}
+        mock_session.run.return_value = mock_result
+
+        service = GraphService(mock_driver, storage_mode="property")
+        await service.create_node("abc-1", "Person", {"name": "Alice"})
+
+        call = mock_session.run.call_args
+        assert "GraphNode:Person" in call.args[0]
+        assert call.kwargs["dataset_id"] == "abc-1"
+
+    async def test_property_mode_drop_schema_keeps_indexes_in_use(self):
+        """Test that shared-label indexes are only dropped once no node carries their property."""
+        service = GraphService(MagicMock(), storage_mode="property")
+        schema = {
+            "constraints": [{"name": "graphnode__key_unique", "properties": ["dataset_id", "_key"]}],
+            "indexes": [
+                {"name": "graphnode_dataset_id_range", "properties": ["dataset_id"], "owningConstraint": None},
+                {"name": "graphnode_age_range", "properties": ["dataset_id", "age"], "owningConstraint": None},
+                {"name": "graphnode_name_text", "properties": ["name"], "owningConstraint": None},
+            ],
+        }
+        in_use = {"age": [{"1": 1}], "name": []}
+
+        async def read(query, params=None, single=False):
+            return next(rows for prop, rows in in_use.items() if f"n.`{prop}` IS NOT NULL" in query)
+
+        with patch.object(service, "get_schema", AsyncMock(return_value=schema)), \
+                patch.object(service, "_read", side_effect=read), \
+                patch.object(service, "_write", AsyncMock()) as write:
+            await service.drop_schema("abc-1")
+        write.assert_awaited_once_with("DROP INDEX `graphnode_name_text` IF EXISTS")
+
+    async def test_property_mode_rejects_key_properties(self):
+        """Test that per-dataset uniqueness cannot be declared on the shared label."""
+        mock_driver = MagicMock()
+        service = GraphService(mock_driver, storage_mode="property")
+        with pytest.raises(ValueError, match="property storage mode"):
+            await service.create_schema("abc-1", ["email"], [], [])
+        mock_driver.session.assert_not_called()
+
+    async def test_create_schema_statements(self):
+        """Test constraints and indexes generated for declared properties."""
+        mock_driver = MagicMock()
+        mock_session = AsyncMock()
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
+        use_session_as_transaction(mock_session)
+
+        service = GraphService(mock_driver)
+        await service.create_schema("abc-1", ["email"], ["email", "age"], ["name"])
+
+        statements = [call.args[0] for call in mock_session.run.call_args_list]
+        assert len(statements) == 4
+        assert "REQUIRE n._key IS UNIQUE" in statements[0]
+        assert "CONSTRAINT graph_abc_1_email_unique" in statements[1]
+        assert "REQUIRE n.`email` IS UNIQUE" in statements[1]
+        assert statements[2].startswith("CREATE RANGE INDEX graph_abc_1_age_range")
+        assert statements[3].startswith("CREATE TEXT INDEX graph_abc_1_name_text")
+
+    async def test_backfill_node_keys(self):
+        """Test that keyless nodes get a UUID key before the key constraint is added."""
+        mock_driver = MagicMock()
+        mock_session = AsyncMock()
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
+        use_session_as_transaction(mock_session)
+
+        await GraphService(mock_driver).backfill_node_keys("abc-1", batch_size=500)
+
+        statements = [call.args[0] for call in mock_session.run.call_args_list]
+        assert "WHERE n._key IS NULL" in statements[0]
+        assert "SET n._key = randomUUID()" in statements[0]
+        assert "IN TRANSACTIONS OF 500 ROWS" in statements[0]
+        assert "REQUIRE n._key IS UNIQUE" in statements[1]
+
+    async def test_create_schema_rejects_invalid_property(self):
+        """Test that property names are validated before interpolation."""
+        service = GraphService(MagicMock())
+        with pytest.raises(ValueError):
+            await service.create_schema("abc-1", ["email`) DETACH DELETE n //"], [], [])
+
+
+    async def test_get_stats_uses_count_queries_and_sample(self):
+        """Test stats aggregation from count queries and a node sample, then caching."""
+        def run(query, **params):
+            if "LIMIT $sample_size" in query:
+                return FakeResult([
+                    {"labels": ["Graph_ds_1", "Person"], "keys": ["_key", "name"], "degree": 1},
+                    {"labels": ["Graph_ds_1", "Person"], "keys": ["_key"], "degree": 3},
+                ])
+            if "db.relationshipTypes" in query:
+                return FakeResult([{"relationshipType": "KNOWS"}, {"relationshipType": "OTHER"}])
+            if "[r:`KNOWS`]" in query:
+                return FakeResult([{"count": 5}])
+            if "[r:" in query:
+                return FakeResult([{"count": 0}])
+            if ":`Person`" in query:
+                return FakeResult([{"count": 40}])
+            return FakeResult([{"count": 42}])
+
+        mock_driver = MagicMock()
+        mock_session = AsyncMock()
+        mock_session.run.side_effect = run
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
+        use_session_as_transaction(mock_session)
+
+        stats_cache.clear()
+        service = GraphService(mock_driver)
+        stats = await service.get_stats("ds-1")
+
+        assert stats["node_count"] == 42
+        assert stats["labels"] == {"Person": 40}
+        assert stats["relationship_types"] == {"KNOWS": 5}
+        assert stats["relationship_count"] == 5
+        assert stats["property_coverage"] == {"_key": 1.0, "name": 0.5}
+        assert stats["degree"]["max"] == 3
+
+        calls = mock_session.run.call_count
+        assert await service.get_stats("ds-1") is stats
+        assert mock_session.run.call_count == calls
+        # A write served by another worker bumped the dataset's write_version
+        assert await service.get_stats("ds-1", version=1) is not stats
+        assert mock_session.run.call_count > calls
+        stats_cache.clear()
+
+    async def test_reads_and_writes_use_managed_transactions(self):
+        """Test reads run via execute_read on a read session and writes via execute_write."""
+        mock_driver = MagicMock()
+        mock_session = AsyncMock()
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
+        use_session_as_transaction(mock_session)
+        mock_session.run.return_value = FakeResult([{"n": {"_key": "k", "_id": 1}, "node_id": 1}])
+
+        service = GraphService(mock_driver)
+        await service.get_nodes("ds-1")
+        assert mock_session.execute_read.call_count == 1
+        assert mock_driver.session.call_args.kwargs["default_access_mode"] == "READ"
+
+        await service.create_node("ds-1", "Person", {})
+        assert mock_session.execute_write.call_count == 1
+        assert mock_driver.session.call_args.kwargs["default_access_mode"] == "WRITE"
+
+    def test_subgraph_selection_modes(self):
+        """Test node selection clauses for filter, key list and seed expansion."""
+        service = GraphService(MagicMock())
+        by_filter = service._subgraph_selection("ds-1", node_filter={"city": "Paris"}, label="Person")
+        assert by_filter == "MATCH (n:Graph_ds_1:Person {`city`: $node_filter.`city`}) "
+        assert "n._key IN $node_keys" in service._subgraph_selection("ds-1", node_keys=["a"])
+        by_seed = service._subgraph_selection("ds-1", seed_keys=["a"], radius=2)
+        assert "[*0..2]" in by_seed and "WITH DISTINCT n" in by_seed
+        with pytest.raises(ValueError):
+            service._subgraph_selection("ds-1", node_filter={"bad name": 1})
+
+    async def test_extract_subgraph_batches_per_label_set_and_type(self):
+        """Test that nodes and relationships are copied in batched Cypher statements."""
+        def run(query, **params):
+            if query.startswith("SHOW"):
+                return FakeResult([])
+            if "RETURN DISTINCT labels(n)" in query:
+                return FakeResult([{"labels": ["Graph_src", "Person"]}, {"labels": ["Person", "Graph_src"]}])
+            if "RETURN DISTINCT type(r)" in query:
+                return FakeResult([{"rel_type": "KNOWS"}])
+            if "CREATE (m:" in query:
+                return FakeResult([], {"nodes_created": 3})
+            if "CREATE (a2)" in query:
+                return FakeResult([], {"relationships_created": 2})
+            return FakeResult([])
+
+        mock_driver = MagicMock()
+        mock_session = AsyncMock()
+        mock_session.run.side_effect = run
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
+        use_session_as_transaction(mock_session)
+
+        service = GraphService(mock_driver)
+        counts = await service.extract_subgraph("src", "dst", node_keys=["a", "b"], batch_size=500)
+
+        assert counts == {"node_count": 3, "relationship_count": 2}
+        statements = [call.args[0] for call in mock_session.run.call_args_list]
+        node_copies = [q for q in statements if "CREATE (m:" in q]
+        assert len(node_copies) == 1
+        assert "CREATE (m:Graph_dst:`Person`)" in node_copies[0]
+        assert "IN TRANSACTIONS OF 500 ROWS" in node_copies[0]
+        rel_copy = next(q for q in statements if "CREATE (a2)" in q)
+        assert "[r2:`KNOWS`]" in rel_copy
+        assert "(a2:Graph_dst {_key: n._key})" in rel_copy
+
+    def test_degree_summary_histogram(self):
+        """Test power-of-two degree buckets and percentiles."""
+        summary = _degree_summary([0, 1, 2, 3, 4, 9])
+        assert summary["histogram"] == {"0": 1, "1": 1, "2-3": 2, "4-7": 1, "8-15": 1}
+        assert summary["p50"] == 3
+        assert _degree_summary([])["max"] == 0
+
 
 class TestExportService:
     """Tests for ExportService."""
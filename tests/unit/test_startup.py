@@ -0,0 +1,62 @@
+"""
+Unit tests for application startup.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app import main
+
+
+pytestmark = pytest.mark.unit
+
+LAZY_MODULES = ("networkx", "pyinstrument", "app.services.graph_analytics")
+ROOT = Path(__file__).resolve().parents[2]
+
+
+class TestStartup:
+    def test_heavy_modules_not_imported(self):
+        """Test importing the app leaves heavy libraries unimported."""
+        probe = f"import json, sys, app.main; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+        output = subprocess.run([sys.executable, "-c", probe], check=True, capture_output=True, text=True).stdout
+        assert json.loads(output.strip().splitlines()[-1]) == []
+
+    @pytest.mark.slow
+    def test_cold_start_within_budget(self):
+        """Test the startup benchmark passes its import and boot budgets."""
+        env = {**os.environ, "PYTHONPATH": str(ROOT)}
+        result = subprocess.run(
+            [sys.executable, str(ROOT / "benchmarks" / "startup.py"), "--runs", "3"],
+            cwd=ROOT, env=env, capture_output=True, text=True,
+        )
+        assert result.returncode == 0, result.stdout + result.stderr
+
+    async def test_lifespan_opens_and_closes_backends(self):
+        """Test the lifespan handler creates tables, connects Neo4j and closes everything on shutdown."""
+        with patch.object(main.settings, "DB_INIT_ON_STARTUP", True), \
+                patch.object(main, "init_db", AsyncMock()) as init_db, \
+                patch.object(main, "init_neo4j", AsyncMock()) as init_neo4j, \
+                patch.object(main, "close_neo4j", AsyncMock()) as close_neo4j, \
+                patch.object(main.query_jobs, "shutdown", AsyncMock()) as shutdown:
+            async with main.lifespan(main.app):
+                init_db.assert_awaited_once()
+                init_neo4j.assert_awaited_once()
+                close_neo4j.assert_not_awaited()
+            shutdown.assert_awaited_once()
+            close_neo4j.assert_awaited_once()
+
+    async def test_lifespan_skips_schema_when_created_before_forking(self):
+        """Test that workers of the production server leave table creation to the master."""
+        with patch.object(main.settings, "DB_INIT_ON_STARTUP", False), \
+                patch.object(main, "init_db", AsyncMock()) as init_db, \
+                patch.object(main, "init_neo4j", AsyncMock()), \
+                patch.object(main, "close_neo4j", AsyncMock()), \
+                patch.object(main.query_jobs, "shutdown", AsyncMock()):
+            async with main.lifespan(main.app):
+                pass
+        init_db.assert_not_awaited()